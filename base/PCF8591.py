@@ -11,6 +11,7 @@
 # import PCF8591 as ADC
 # ADC.Setup(Address)  # 通过 sudo i2cdetect -y -1 可以获取到IIC的地址
 # ADC.read(channal)	# 通道选择范围为0-3
+# ADC.read_all()	# 一次读取4个通道，返回 [AIN0, AIN1, AIN2, AIN3]
 # ADC.write(Value)	# 值的范围为：0-255
 #####################################################
 import smbus
@@ -19,35 +20,54 @@ import time
 # 对应比较旧的版本如RPI V1 版本，则 "bus = smbus.SMBus(0)"
 bus = smbus.SMBus(1)
 
+# 控制字节：0x40 使能模拟输出，低2位为通道号，0x04 为通道自动递增
+CONTROL = 0x40
+AUTO_INCREMENT = 0x04
+
+# 当前写入芯片的控制字节，None 表示未知（自动递增读取后通道已移动）
+selected = None
+
 #通过 sudo i2cdetect -y -1 可以获取到IIC的地址
 def setup(Addr):
-	global address
+	global address, selected
 	address = Addr
+	selected = None
 
 # 读取模拟量信息
 def read(chn): #通道选择，范围是0-3之间
+	global selected
+	control = CONTROL | (chn & 0x03)
 	try:
-		if chn == 0:
-			bus.write_byte(address,0x40)
-		if chn == 1:
-			bus.write_byte(address,0x41)
-		if chn == 2:
-			bus.write_byte(address,0x42)
-		if chn == 3:
-			bus.write_byte(address,0x43)
-		bus.read_byte(address) # 开始进行读取转换
+		# 通道已选中时不再写控制字节
+		if selected != control:
+			bus.write_byte(address, control)
+			selected = control
+		# 每次读出的字节是上一次读取时启动的转换结果，丢弃第1个字节，返回本次读取时的转换结果
+		bus.read_byte(address)
 	except Exception as e:
+		selected = None
 		print ("Address: %s" % address)
 		print (e)
 	return bus.read_byte(address)
 
+# 一次读取全部4个通道：自动递增模式下在同一次传输中依次读出 AIN0-AIN3
+def read_all():
+	global selected
+	selected = None # 传输失败时控制字节状态未知
+	# 控制字节后的第1个字节是上一次的转换结果，丢弃
+	data = bus.read_i2c_block_data(address, CONTROL | AUTO_INCREMENT, 5)
+	return data[1:5]
+
 # 模块输出模拟量控制，范围为0-255
 def write(val):
+	global selected
 	try:
 		temp = val # 将数值赋给temmp 变量
 		temp = int(temp) # 将字符串转换为整型
 		# 在终端上打印temp以查看，否则将注释掉
-		bus.write_byte_data(address, 0x40, temp)
+		# 写模拟输出的同时选中了AIN0，但数据寄存器中仍是上一通道的转换结果，下次读取须重新选择通道并丢弃旧结果
+		selected = None
+		bus.write_byte_data(address, CONTROL, temp)
 	except Exception as e:
 		print ("Error: Device address: 0x%2X" % address)
 		print (e)
@@ -4,11 +4,15 @@
 适用于Jetson Nano
 """
 
-import Jetson.GPIO as GPIO
 import time
 import os
 import sys
 
+# GPIO 后端与主程序相同（smart_vibrator/utils/gpio_backend.py，可由环境变量 SMART_VIBRATOR_GPIO 指定）
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "smart_vibrator"))
+from utils.gpio_backend import load_backend
+GPIO = load_backend()
+
 def reset_gpio():
     print("=== 紧急重置GPIO状态 ===")
     
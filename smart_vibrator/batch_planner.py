@@ -0,0 +1,210 @@
+"""
+batch_planner.py
+批量振捣策略规划模块
+非交互地为多个浇筑任务（板块）并行生成振捣策略，按完成顺序返回结果并写入 output/ 目录。
+
+浇筑任务描述（pour spec）格式:
+{
+    "name": "B1-slab-03",                       # 可选，用于输出文件名
+    "material_params": {...},                   # 混凝土材料参数
+    "env_params": {...},                        # 可选，环境参数，缺失项使用默认值
+    "board": {"width_m": 20, "length_m": 50, "thickness_cm": 39},
+    "power_kw": 3.0,                            # 可选，振捣棒功率，默认 DEFAULT_POWER_KW
+    "layout": "hex"                             # 可选，点位布局方式 grid/hex，默认 grid
+}
+material_params 和 board（三个尺寸均为正数）必须给出；读取任务文件时逐条检查，
+缺项、未知字段（如拼写错误）或类型不对的任务直接报错并指出是第几条，不会按默认值静默规划。
+
+命令行用法:
+    python batch_planner.py pours.json [-o output/batch] [-j 4]
+其中 pours.json 为任务列表(JSON数组)，或每行一个任务的 JSON Lines 文件。
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from vibration_strategy import (plan_strategy, DEFAULT_POWER_KW, DEFAULT_BOARD_WIDTH_M,
+                                DEFAULT_BOARD_LENGTH_M, DEFAULT_BOARD_THICKNESS_CM, LAYOUT_MODES)
+
+# 默认输出目录
+DEFAULT_OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "output")
+
+# 浇筑任务的字段
+SPEC_KEYS = ("name", "material_params", "env_params", "board", "power_kw", "layout")
+BOARD_KEYS = ("width_m", "length_m", "thickness_cm")
+
+
+def spec_name(spec, index):
+    """返回任务名称，未指定时按序号命名，并去除不能出现在文件名中的字符"""
+    name = str(spec.get("name") or f"pour_{index + 1:04d}")
+    return re.sub(r'[\\/:*?"<>|\s]+', "_", name)
+
+
+def plan_pour(index, spec, output_dir):
+    """
+    为单个浇筑任务生成振捣策略并保存（在工作进程中运行）。
+    :param index: 任务序号
+    :param spec: dict, 浇筑任务描述
+    :param output_dir: 输出目录
+    :return: dict, 任务结果摘要
+    """
+    name = spec_name(spec, index)
+    start = time.perf_counter()
+    board = spec.get("board", {})
+    strategy = plan_strategy(
+        spec.get("material_params", {}),
+        spec.get("env_params", {}),
+        power_kw=spec.get("power_kw", DEFAULT_POWER_KW),
+        board_width=board.get("width_m", DEFAULT_BOARD_WIDTH_M),
+        board_length=board.get("length_m", DEFAULT_BOARD_LENGTH_M),
+        board_thickness=board.get("thickness_cm", DEFAULT_BOARD_THICKNESS_CM),
+        layout=spec.get("layout", "grid"),
+        verbose=False
+    )
+
+    strategy_file = os.path.join(output_dir, f"vibration_strategy_{name}.json")
+    with open(strategy_file, 'w', encoding='utf-8') as f:
+        json.dump(strategy, f, ensure_ascii=False, indent=2)
+
+    return {
+        "index": index,
+        "name": name,
+        "path": strategy_file,
+        "total_points": strategy["total_points"],
+        "estimated_time_min": strategy["estimated_time_min"],
+        "elapsed_s": round(time.perf_counter() - start, 3)
+    }
+
+
+def plan_batch(specs, output_dir=None, max_workers=None):
+    """
+    使用进程池并行生成多个振捣策略，按完成顺序逐个返回结果（生成器）。
+    单个任务失败不会中断整批规划，其结果中包含 error 字段。
+    :param specs: list[dict], 浇筑任务描述列表
+    :param output_dir: 输出目录，默认为 output/
+    :param max_workers: 最大工作进程数，默认为CPU核心数
+    :return: 生成器，每项为任务结果摘要 dict
+    """
+    output_dir = output_dir or DEFAULT_OUTPUT_DIR
+    os.makedirs(output_dir, exist_ok=True)
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(plan_pour, index, spec, output_dir): index
+            for index, spec in enumerate(specs)
+        }
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                yield future.result()
+            except Exception as e:
+                yield {"index": index, "name": spec_name(specs[index], index), "error": str(e)}
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def check_spec(spec, index):
+    """
+    检查一条浇筑任务的字段。
+    :param spec: 浇筑任务描述
+    :param index: 任务序号（从0开始）
+    :raises ValueError: 任务格式错误，信息中指出是第几条任务
+    """
+    def fail(message):
+        name = f"（{spec['name']}）" if isinstance(spec, dict) and spec.get("name") else ""
+        raise ValueError(f"第 {index + 1} 条浇筑任务{name}格式错误: {message}")
+
+    if not isinstance(spec, dict):
+        fail(f"应为 JSON 对象，实际为 {type(spec).__name__}")
+    unknown = sorted(set(spec) - set(SPEC_KEYS))
+    if unknown:
+        fail(f"未知字段 {unknown}，可用字段: {list(SPEC_KEYS)}")
+    for key in ("material_params", "board"):
+        if key not in spec:
+            fail(f"缺少 {key}")
+    for key in ("material_params", "env_params", "board"):
+        if key in spec and not isinstance(spec[key], dict):
+            fail(f"{key} 应为 JSON 对象")
+    board = spec["board"]
+    unknown = sorted(set(board) - set(BOARD_KEYS))
+    if unknown:
+        fail(f"board 中有未知字段 {unknown}，可用字段: {list(BOARD_KEYS)}")
+    for key in BOARD_KEYS:
+        if not _is_number(board.get(key)) or board[key] <= 0:
+            fail(f"board.{key} 应为正数，实际为 {board.get(key)!r}")
+    if "power_kw" in spec and (not _is_number(spec["power_kw"]) or spec["power_kw"] <= 0):
+        fail(f"power_kw 应为正数，实际为 {spec['power_kw']!r}")
+    if "layout" in spec and spec["layout"] not in LAYOUT_MODES:
+        fail(f"未知的点位布局方式 {spec['layout']!r}，可选: {LAYOUT_MODES}")
+
+
+def load_specs(path):
+    """
+    读取浇筑任务文件，支持 JSON 数组或 JSON Lines 格式，并逐条检查任务格式。
+    :param path: 任务文件路径
+    :return: list[dict]
+    :raises ValueError: JSON Lines 中某一行无法解析或某条任务格式错误（信息中指出行号或任务序号）
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    try:
+        specs = json.loads(text)
+    except json.JSONDecodeError:
+        specs = []
+        for number, line in enumerate(text.splitlines(), 1):
+            if not line.strip():
+                continue
+            try:
+                specs.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path} 第 {number} 行不是有效的 JSON: {e}") from None
+    if isinstance(specs, dict):
+        specs = [specs]
+    if not isinstance(specs, list):
+        raise ValueError(f"{path} 应为浇筑任务的 JSON 数组或 JSON Lines")
+    for index, spec in enumerate(specs):
+        check_spec(spec, index)
+    return specs
+
+
+def main(argv=None):
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="批量生成振捣策略（非交互、多进程并行）")
+    parser.add_argument("specs", help="浇筑任务文件（JSON数组或JSON Lines）")
+    parser.add_argument("-o", "--output-dir", default=DEFAULT_OUTPUT_DIR, help="策略输出目录")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="并行进程数，默认为CPU核心数")
+    args = parser.parse_args(argv)
+
+    try:
+        specs = load_specs(args.specs)
+    except ValueError as e:
+        print(f"读取浇筑任务失败: {e}")
+        return 2
+    print(f"共 {len(specs)} 个浇筑任务，开始批量规划...")
+
+    start = time.perf_counter()
+    failed = 0
+    total_points = 0
+    for done, result in enumerate(plan_batch(specs, args.output_dir, args.jobs), 1):
+        if "error" in result:
+            failed += 1
+            print(f"[{done}/{len(specs)}] {result['name']}: 失败 - {result['error']}")
+        else:
+            total_points += result["total_points"]
+            print(f"[{done}/{len(specs)}] {result['name']}: {result['total_points']} 点, "
+                  f"估计 {result['estimated_time_min']} 分钟 -> {result['path']}")
+
+    elapsed = time.perf_counter() - start
+    print(f"\n批量规划完成: 成功 {len(specs) - failed}, 失败 {failed}, "
+          f"共 {total_points} 个点位, 用时 {elapsed:.2f} 秒")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,289 @@
+"""
+coverage_analysis.py
+振捣覆盖分析模块
+将混凝板栅格化，统计每个栅格被多少个振捣半径圆覆盖，
+输出覆盖率、未覆盖区域多边形（含其中已覆盖区域的孔洞）以及过振（重复振捣次数过多）的栅格数、面积和区域多边形。
+"""
+import sys
+import time
+
+import numpy as np
+
+from strategy_store import load_strategy, point_columns, strategy_points
+
+# 默认栅格边长 (m)
+DEFAULT_CELL_SIZE_M = 0.05
+
+# 默认允许的最大重叠次数，超过即视为过振
+DEFAULT_MAX_OVERLAP = 2
+
+# 每批散列的点位数，限制中间数组的内存占用
+SCATTER_CHUNK = 1024
+
+
+def strategy_point_columns(strategy):
+    """
+    从策略中取出点位坐标和半径列，兼容点位字典列表、point_arrays 数组和列式存储的点位视图。
+    :param strategy: dict, 振捣策略
+    :return: tuple (x, y, radius_m)，均为 numpy 数组
+    """
+    x, y, radius_cm = point_columns(strategy_points(strategy), "x", "y", "radius_cm")
+    return x.astype(float), y.astype(float), radius_cm.astype(float) / 100
+
+
+def coverage_counts(x, y, radius_m, board_width, board_length, cell_size=DEFAULT_CELL_SIZE_M):
+    """
+    统计每个栅格被覆盖的次数（栅格中心落在半径圆内即视为覆盖）。
+    点位按半径分组，每个点位只散列到其包围盒内的栅格，再用 bincount 一次性累加。
+    :param x: 点位x坐标数组 (m)
+    :param y: 点位y坐标数组 (m)
+    :param radius_m: 点位有效半径数组 (m)
+    :param board_width: 板宽 (m)
+    :param board_length: 板长 (m)
+    :param cell_size: 栅格边长 (m)
+    :return: 形状为 (ny, nx) 的覆盖次数数组，第 iy 行第 ix 列对应栅格中心 ((ix+0.5)*cell, (iy+0.5)*cell)
+    """
+    nx = max(1, int(np.ceil(board_width / cell_size)))
+    ny = max(1, int(np.ceil(board_length / cell_size)))
+    counts = np.zeros(nx * ny, dtype=np.int32)
+
+    unique_radius, inverse = np.unique(radius_m, return_inverse=True)
+    inverse = inverse.ravel()
+    for k, r in enumerate(unique_radius):
+        idx = np.flatnonzero(inverse == k)
+        # 以点位所在栅格为中心的方形窗口
+        half = int(np.ceil(r / cell_size)) + 1
+        offsets = np.arange(-half, half + 1)
+        for start in range(0, len(idx), SCATTER_CHUNK):
+            sel = idx[start:start + SCATTER_CHUNK]
+            px = x[sel][:, None, None]
+            py = y[sel][:, None, None]
+            ix = np.floor(px / cell_size).astype(np.int64) + offsets[None, None, :]
+            iy = np.floor(py / cell_size).astype(np.int64) + offsets[None, :, None]
+            dx = (ix + 0.5) * cell_size - px
+            dy = (iy + 0.5) * cell_size - py
+            inside = (dx * dx + dy * dy <= r * r) & (ix >= 0) & (ix < nx) & (iy >= 0) & (iy < ny)
+            flat = np.broadcast_to(iy * nx + ix, inside.shape)[inside]
+            counts += np.bincount(flat, minlength=nx * ny).astype(np.int32)
+    return counts.reshape(ny, nx)
+
+
+def _runs(flags):
+    """
+    找出二维布尔数组每一行中连续 True 的区间。
+    :return: tuple (row, start, end)，区间为 [start, end)
+    """
+    padded = np.pad(flags, ((0, 0), (1, 1)), constant_values=False).astype(np.int8)
+    change = np.diff(padded, axis=1)
+    row, start = np.nonzero(change == 1)
+    _, end = np.nonzero(change == -1)
+    return row, start, end
+
+
+def mask_polygons(mask):
+    """
+    提取布尔栅格中 True 区域的边界多边形（栅格角点坐标）。
+    对角相接的栅格视为不同区域；区域内部的孔洞（被区域包围的 False 栅格）作为该区域的孔洞边界返回。
+    :param mask: 形状为 (ny, nx) 的布尔数组
+    :return: list[tuple(外边界, 孔洞列表)]，外边界逆时针、孔洞顺时针，顶点为 tuple(ix, iy)
+    """
+    padded = np.pad(mask, 1, constant_values=False)
+    inner = padded[1:-1, 1:-1]
+    bottom = inner & ~padded[:-2, 1:-1]
+    top = inner & ~padded[2:, 1:-1]
+    left = inner & ~padded[1:-1, :-2]
+    right = inner & ~padded[1:-1, 2:]
+
+    # 同一直线上相连的边界边先合并为一段，按逆时针方向（区域位于左侧）记录起止角点
+    segments = []
+    iy, x0, x1 = _runs(bottom)
+    segments.append((np.c_[x0, iy], np.c_[x1, iy]))          # 下边: 向 +x
+    iy, x0, x1 = _runs(top)
+    segments.append((np.c_[x1, iy + 1], np.c_[x0, iy + 1]))  # 上边: 向 -x
+    ix, y0, y1 = _runs(right.T)
+    segments.append((np.c_[ix + 1, y0], np.c_[ix + 1, y1]))  # 右边: 向 +y
+    ix, y0, y1 = _runs(left.T)
+    segments.append((np.c_[ix, y1], np.c_[ix, y0]))          # 左边: 向 -y
+
+    edges = {}
+    for starts, ends in segments:
+        for start, end in zip(map(tuple, starts.tolist()), map(tuple, ends.tolist())):
+            edges.setdefault(start, []).append(end)
+
+    polygons = []
+    while edges:
+        origin = next(iter(edges))
+        loop = [origin]
+        prev, current = None, origin
+        while True:
+            candidates = edges[current]
+            if len(candidates) > 1 and prev is not None:
+                # 对角接触点：优先左转，保证沿同一区域绕行
+                dx_in = _sign(current[0] - prev[0])
+                dy_in = _sign(current[1] - prev[1])
+                order = {(-dy_in, dx_in): 0, (dx_in, dy_in): 1, (dy_in, -dx_in): 2}
+                candidates.sort(key=lambda p: order.get(
+                    (_sign(p[0] - current[0]), _sign(p[1] - current[1])), 3))
+            nxt = candidates.pop(0)
+            if not candidates:
+                del edges[current]
+            prev, current = current, nxt
+            if current == origin:
+                break
+            loop.append(current)
+        polygons.append(_simplify_loop(loop))
+
+    # 逆时针为外边界（有向面积为正），顺时针为孔洞
+    outers = [p for p in polygons if _signed_area(p) > 0]
+    holes = [p for p in polygons if _signed_area(p) < 0]
+    return list(zip(outers, _assign_holes(outers, holes)))
+
+
+def _assign_holes(outers, holes):
+    """
+    将孔洞分配给直接包含它的外边界：取孔洞内紧贴第一条边的栅格中心，
+    在包含该点的外边界中选面积最小的一个（区域可以嵌套在另一区域的孔洞中）。
+    :return: list，每个外边界的孔洞列表
+    """
+    assigned = [[] for _ in outers]
+    if not holes:
+        return assigned
+    areas = np.array([_signed_area(p) for p in outers])
+    bounds = np.array([np.r_[np.min(p, axis=0), np.max(p, axis=0)] for p in outers])
+    for hole in holes:
+        # 沿边界前进时区域在左侧，孔洞栅格在右侧
+        (ax, ay), (bx, by) = hole[0], hole[1]
+        dx, dy = _sign(bx - ax), _sign(by - ay)
+        px, py = ax + 0.5 * dx + 0.5 * dy, ay + 0.5 * dy - 0.5 * dx
+        candidates = np.flatnonzero((bounds[:, 0] < px) & (px < bounds[:, 2]) &
+                                    (bounds[:, 1] < py) & (py < bounds[:, 3]))
+        containing = [k for k in candidates if _contains(outers[k], px, py)]
+        if containing:
+            assigned[min(containing, key=lambda k: areas[k])].append(hole)
+    return assigned
+
+
+def _contains(polygon, px, py):
+    """点是否在多边形内（射线法；点为栅格中心，不会落在栅格角点构成的边上）"""
+    v = np.asarray(polygon, dtype=float)
+    x0, y0 = v[:, 0], v[:, 1]
+    x1, y1 = np.roll(x0, -1), np.roll(y0, -1)
+    straddle = (y0 > py) != (y1 > py)
+    cross_x = x0 + (py - y0) * (x1 - x0) / np.where(straddle, y1 - y0, 1)
+    return bool(np.count_nonzero(straddle & (px < cross_x)) % 2)
+
+
+def _sign(v):
+    return (v > 0) - (v < 0)
+
+
+def _simplify_loop(loop):
+    """去掉共线的中间顶点"""
+    result = []
+    n = len(loop)
+    for k in range(n):
+        ax, ay = loop[k - 1]
+        bx, by = loop[k]
+        cx, cy = loop[(k + 1) % n]
+        if (bx - ax) * (cy - by) - (by - ay) * (cx - bx) != 0:
+            result.append(loop[k])
+    return result
+
+
+def _signed_area(polygon):
+    """多边形有向面积（鞋带公式），逆时针为正"""
+    area = 0
+    px, py = polygon[-1]
+    for x, y in polygon:
+        area += px * y - x * py
+        px, py = x, y
+    return area / 2
+
+
+def analyze_coverage(strategy, cell_size=DEFAULT_CELL_SIZE_M, max_overlap=DEFAULT_MAX_OVERLAP,
+                     return_counts=False):
+    """
+    分析振捣策略对整块混凝板的覆盖情况。
+    :param strategy: dict, 振捣策略（points、point_arrays 或列式存储的点位视图）
+    :param cell_size: 栅格边长 (m)
+    :param max_overlap: 允许的最大重叠次数，覆盖次数超过该值的栅格记为过振
+    :param return_counts: 是否在结果中附带覆盖次数数组 counts
+    :return: dict, 覆盖分析结果
+    """
+    board_width = strategy["board_info"]["width_m"]
+    board_length = strategy["board_info"]["length_m"]
+    x, y, radius_m = strategy_point_columns(strategy)
+
+    counts = coverage_counts(x, y, radius_m, board_width, board_length, cell_size)
+    cell_area = cell_size * cell_size
+    uncovered = counts == 0
+    over = counts > max_overlap
+
+    def to_metres(loop):
+        # 栅格角点换算为米，并裁剪到板边
+        corners = np.asarray(loop, dtype=float) * cell_size
+        return [tuple(v) for v in np.minimum(corners, (board_width, board_length)).round(3).tolist()]
+
+    def region_polygons(mask):
+        polygons = []
+        for outer, holes in mask_polygons(mask):
+            # 面积按栅格数计并扣除孔洞（其中不属于该区域的栅格），与按栅格统计的面积口径一致
+            area = _signed_area(outer) + sum(_signed_area(hole) for hole in holes)
+            polygons.append({"vertices": to_metres(outer),
+                             "holes": [to_metres(hole) for hole in holes],
+                             "area_m2": round(area * cell_area, 4)})
+        polygons.sort(key=lambda p: p["area_m2"], reverse=True)
+        return polygons
+
+    result = {
+        "cell_size_m": cell_size,
+        "grid_shape": counts.shape,
+        "coverage_pct": round(100.0 * (1 - uncovered.mean()), 2),
+        "uncovered_area_m2": round(float(uncovered.sum()) * cell_area, 4),
+        "uncovered_polygons": region_polygons(uncovered),
+        "max_overlap": max_overlap,
+        "over_vibrated_cells": int(over.sum()),
+        "over_vibrated_area_m2": round(float(over.sum()) * cell_area, 4),
+        "over_vibrated_polygons": region_polygons(over),
+        "max_coverage_count": int(counts.max()) if counts.size else 0
+    }
+    if return_counts:
+        result["counts"] = counts
+    return result
+
+
+def print_coverage_report(report):
+    """打印覆盖分析摘要"""
+    print("\n振捣覆盖分析:")
+    print(f"  - 栅格: {report['grid_shape'][1]} x {report['grid_shape'][0]} (边长 {report['cell_size_m']} m)")
+    print(f"  - 覆盖率: {report['coverage_pct']}%")
+    print(f"  - 未覆盖面积: {report['uncovered_area_m2']} m², 共 {len(report['uncovered_polygons'])} 个区域")
+    print(f"  - 过振栅格(覆盖超过{report['max_overlap']}次): {report['over_vibrated_cells']} 个, "
+          f"面积 {report['over_vibrated_area_m2']} m², 共 {len(report['over_vibrated_polygons'])} 个区域")
+
+
+if __name__ == "__main__":
+    # 用法: python coverage_analysis.py [策略文件] [栅格边长(m)]
+    # 自检：未覆盖的环形区域包围一块已覆盖区域，孔洞中又有一块未覆盖区域
+    ring = np.ones((9, 9), dtype=bool)
+    ring[2:7, 2:7] = False
+    ring[4, 4] = True
+    (outer, holes), (inner, inner_holes) = sorted(mask_polygons(ring), key=lambda p: -_signed_area(p[0]))
+    assert _signed_area(outer) == 81 and [_signed_area(h) for h in holes] == [-25]
+    assert _signed_area(inner) == 1 and not inner_holes
+    assert _signed_area(outer) + _signed_area(holes[0]) + _signed_area(inner) == ring.sum()
+
+    strategy_file = sys.argv[1] if len(sys.argv) > 1 else "output/vibration_strategy.json"
+    cell = float(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_CELL_SIZE_M
+    strategy = load_strategy(strategy_file)
+
+    start = time.perf_counter()
+    report = analyze_coverage(strategy, cell_size=cell)
+    elapsed = time.perf_counter() - start
+
+    print_coverage_report(report)
+    for polygon in report["uncovered_polygons"][:5]:
+        print(f"    未覆盖区域 {polygon['area_m2']} m², 顶点数 {len(polygon['vertices'])}, 孔洞 {len(polygon['holes'])} 个")
+    for polygon in report["over_vibrated_polygons"][:5]:
+        print(f"    过振区域 {polygon['area_m2']} m², 顶点数 {len(polygon['vertices'])}, 孔洞 {len(polygon['holes'])} 个")
+    print(f"  - 分析用时: {elapsed * 1000:.1f} ms ({strategy['total_points']} 个点位)")
@@ -5,25 +5,78 @@ device_control.py
 参照广联达提供的步进电机控制代码实现。
 """
 
+import os
 import time
 import sys
+import numpy as np
+from concurrent.futures import TimeoutError
 # 导入sleep函数，并确保全局可用
 from time import sleep
 
 # 严格按照官方示例导入
-from utils.led_control import green_on, red_on, all_leds_off
-from utils.buzzer_control import buzzer_on, buzzer_off
+from utils.led_control import green_on, red_on, all_leds_off, pin_R, pin_G
+from utils.buzzer_control import buzzer_on, buzzer_off, glodon_Buzzer
+from utils.step_scheduler import run_steps, slots_for_duration
+from utils.stepper_driver import StepperDriver, STEPS_PER_REVOLUTION, DEFAULT_DRIVE_MODE
+from utils.motor_worker import MotorWorker, jitter_stats
+from utils.motion_profile import duration_intervals, rpm_to_rate
+from utils.config import get_config
+from utils.emergency_stop import EmergencyStop
+from utils.gantry import Gantry
+from utils.gpio_trace import start_trace, stop_trace
+from strategy_store import as_point_sequence, is_point_record, point_columns, point_get, strategy_points
+from execution_journal import ExecutionJournal, plan_fingerprint, default_journal_path
 
-# 导入树莓派 GPIO 库用于控制步进电机
-import Jetson.GPIO as GPIO
-print("成功导入 RPi.GPIO 库，使用真实的GPIO控制")
+# 导入 GPIO 库用于控制步进电机（经影子寄存器写入，电平未变化的管脚不重复写入）
+from utils.gpio_shadow import GPIO
+from utils.gpio_backend import backend_name
+glodon_gpioBackend = backend_name()
+if glodon_gpioBackend == "mock":
+    print("GPIO 后端: mock（内存模拟），不驱动实际硬件")
+else:
+    print(f"GPIO 后端: {glodon_gpioBackend}，使用真实的GPIO控制")
 
 # 步进电机控制参数（严格按照StepperMotorSensor.ipynb）
 glodon_motorPin = (18, 23, 24, 25)     # 步进电机管脚对应的GPIO引脚
 glodon_rolePerMinute = 15            # 每分钟转数，可以根据振捣频率调整
-glodon_stepsPerRevolution = 2048    # 每转一圈的步数，取决于电机类型
+
+# 电机驱动参数（见 utils/config.py 中的 motor 配置）
+glodon_motorConfig = get_config()["motor"]
+glodon_driveMode = glodon_motorConfig.get("drive_mode", DEFAULT_DRIVE_MODE)   # 驱动方式 wave/full/half
+
+glodon_stepsPerRevolution = STEPS_PER_REVOLUTION[glodon_driveMode]    # 每转一圈的步数，取决于电机类型和驱动方式
 glodon_stepSpeed = (60/glodon_rolePerMinute)/glodon_stepsPerRevolution  # 每一步所用的时间
 
+# 电机驱动：相序表预先计算，每一相一次写入全部电机管脚
+glodon_driver = StepperDriver(GPIO, glodon_motorPin, glodon_driveMode)
+
+glodon_noRampMaxRpm = 30    # 不使用加减速曲线时的转速上限，更高转速从静止直接起步会失步
+
+# 红灯/蜂鸣器打开前的切换延时 (s)
+glodon_signalSwitchDelay = 0.1
+
+# 电机工作线程（start_motor_worker 启动后，脉冲在独立的实时线程中产生；
+# 配置 motor.realtime_worker 为 True 时 execute_strategy 在执行期间自动启动）
+glodon_worker = None
+
+# XY 龙门（见 utils/config.py 中的 gantry 配置），未启用时点位间移动按时序方案的 move_s 等待
+glodon_gantryConfig = get_config()["gantry"]
+glodon_gantry = None
+if glodon_gantryConfig.get("enabled"):
+    glodon_gantry = Gantry(GPIO, glodon_gantryConfig["axes"], glodon_gantryConfig["max_rate_hz"],
+                           glodon_gantryConfig["accel_hz_per_s"],
+                           glodon_gantryConfig.get("drive_mode", DEFAULT_DRIVE_MODE),
+                           glodon_gantryConfig.get("hold", False))
+
+# 急停：硬件按钮（见 utils/config.py 中的 estop 配置）或 emergency_stop() 触发后，
+# 电机管脚立即置低、红灯和蜂鸣器关闭，步进输出在下一相之前停止
+glodon_estopConfig = get_config()["estop"]
+glodon_estop = EmergencyStop(GPIO, list(glodon_motorPin) + (glodon_gantry.pins if glodon_gantry else []),
+                             {pin_R: GPIO.HIGH, pin_G: GPIO.LOW, glodon_Buzzer: GPIO.HIGH},
+                             pin=glodon_estopConfig.get("pin"),
+                             active_low=glodon_estopConfig.get("active_low", True),
+                             bouncetime_ms=glodon_estopConfig.get("bouncetime_ms"))
+
 # 振捣状态记录
 vibration_status = {
     "running": False,      # 是否正在运行
@@ -39,12 +92,99 @@ def glodon_setup():
     """初始化步进电机控制引脚"""
     GPIO.setmode(GPIO.BCM)  # 将GPIO模式设置为BCM编号，与官方示例一致
     GPIO.setwarnings(False) # 忽略警告
-    for i in glodon_motorPin:
-        GPIO.setup(i, GPIO.OUT) # 设置步进电机的所有管脚为输出模式
+    glodon_driver.setup()   # 设置步进电机的所有管脚为输出模式
+    if glodon_gantry is not None:
+        glodon_gantry.setup()   # 龙门各轴管脚
+    if get_config()["gpio_trace"].get("enabled") and GPIO.tracer is None:
+        tracer = start_trace(GPIO, motors=traced_motors())
+        print(f"GPIO写入跟踪: {tracer.path}")
+    try:
+        if glodon_estop.arm():
+            print(f"急停按钮已启用: BCM-{glodon_estop.pin}")
+    except Exception as e:
+        print(f"警告: 急停按钮启用失败: {e}（仍可使用软件急停）")
     
     print("振捣电机初始化完成")
     return True
 
+def traced_motors():
+    """GPIO跟踪中记录的电机管脚 {名称: 管脚}"""
+    motors = {"vibrator": glodon_motorPin}
+    if glodon_gantry is not None:
+        motors.update({f"gantry_{name}": pins for name, pins in glodon_gantry.axis_pins().items()})
+    return motors
+
+def emergency_stop(reason="software"):
+    """
+    软件急停：电机立即断电，红灯和蜂鸣器关闭，正在进行的振捣在下一相之前停止。
+    可在任意线程中调用。
+    :param reason: 急停原因
+    """
+    latency_ns = glodon_estop.trigger(reason)
+    vibration_status["stop_flag"] = True
+    print(f"[急停] 已触发（{reason}），{latency_ns / 1000:.0f} us 内进入安全状态")
+
+def reset_emergency_stop():
+    """
+    复位急停，之后才能继续执行振捣。
+    :return: bool, 是否复位成功（急停按钮仍按下时失败）
+    """
+    if not glodon_estop.reset():
+        print("[急停] 急停按钮仍处于按下状态，无法复位")
+        return False
+    vibration_status["stop_flag"] = False
+    print("[急停] 已复位")
+    return True
+
+def stop_requested():
+    """
+    是否已请求停止：急停已触发，或 vibration_status["stop_flag"] 被置位（此时同样触发急停）。
+    """
+    if vibration_status["stop_flag"] and not glodon_estop.is_set():
+        glodon_estop.trigger("stop_flag")
+    vibration_status["stop_flag"] = glodon_estop.is_set()
+    return vibration_status["stop_flag"]
+
+def pause(seconds):
+    """
+    等待 seconds 秒，急停时立即返回。
+    :return: bool, 是否完整等待（急停时为 False）
+    """
+    return not glodon_estop.wait(max(0.0, seconds))
+
+def set_drive_mode(mode):
+    """
+    切换电机驱动方式（wave/full/half），每转步数随之改变。
+    :param mode: 驱动方式
+    """
+    global glodon_driveMode, glodon_stepsPerRevolution, glodon_driver
+    glodon_driver = StepperDriver(GPIO, glodon_motorPin, mode)
+    glodon_driveMode = mode
+    glodon_stepsPerRevolution = glodon_driver.steps_per_revolution
+    if glodon_worker is not None:
+        glodon_worker.driver = glodon_driver
+    print(f"电机驱动方式: {mode}, 每转 {glodon_stepsPerRevolution} 步")
+
+def start_motor_worker(cpu=None):
+    """
+    启动电机工作线程，之后 glodon_rotary 的脉冲输出在该线程中进行
+    （权限允许时使用 SCHED_FIFO 实时调度、绑定CPU核心并锁定内存）。
+    :param cpu: 绑定的CPU核心，None 表示自动选择（优先使用 isolcpus 隔离的核心）
+    :return: MotorWorker
+    """
+    global glodon_worker
+    if glodon_worker is None:
+        glodon_worker = MotorWorker(glodon_driver, cpu=cpu).start()
+        print(f"电机工作线程已启动: {glodon_worker.settings}")
+    return glodon_worker
+
+def stop_motor_worker():
+    """停止电机工作线程，恢复在调用线程内输出脉冲"""
+    global glodon_worker
+    if glodon_worker is not None:
+        glodon_worker.stop()
+        glodon_worker = None
+
 # 单独定义LED和蜂鸣器控制函数，避免多次调用导致冲突
 def control_devices(step, idx=0, total=5):
     """
@@ -54,6 +194,9 @@ def control_devices(step, idx=0, total=5):
     :param total: 总循环次数
     """
     try:
+        if step != "off" and stop_requested():
+            print(f"[设备控制] 急停中，忽略'{step}'操作")
+            return
         print(f"[设备控制] 正在执行'{step}'操作...")
         
         if step == "off":
@@ -73,7 +216,8 @@ def control_devices(step, idx=0, total=5):
         elif step == "red_buzzer":
             # 先关闭所有设备，然后打开红灯和蜂鸣器
             all_leds_off()
-            time.sleep(0.1)  # 短暂延时确保状态切换
+            if not pause(glodon_signalSwitchDelay):  # 短暂延时确保状态切换
+                return
             # 打开红灯和蜂鸣器
             red_on()
             buzzer_on()
@@ -82,6 +226,25 @@ def control_devices(step, idx=0, total=5):
     except Exception as e:
         print(f"[错误] 控制设备时发生错误: {e}")
 
+def vibration_plan(freq_hz, duration_s):
+    """
+    振捣的步进计划：按频率确定转速，按绝对截止时间调度每一相，总步数由运行时间确定。
+    :param freq_hz: 振捣频率（Hz）
+    :param duration_s: 持续时间（秒）
+    :return: tuple (转速RPM, 步间隔ns（整数或数组）, 步数)
+    """
+    # 根据频率调整步进电机速度，使用加减速曲线时允许更高的转速上限
+    accel_rpm = glodon_motorConfig.get("accel_rpm_per_s", 0)
+    max_rpm = glodon_motorConfig.get("max_rpm", glodon_noRampMaxRpm) if accel_rpm > 0 else glodon_noRampMaxRpm
+    adjusted_rpm = max(glodon_motorConfig.get("min_rpm", 5), min(max_rpm, freq_hz / 10))  # 限制RPM在安全范围内
+    if accel_rpm > 0:
+        # 梯形加减速：从静止加速到目标转速，结束前减速停止，总时间不变
+        intervals = duration_intervals(duration_s, rpm_to_rate(adjusted_rpm, glodon_stepsPerRevolution),
+                                       rpm_to_rate(accel_rpm, glodon_stepsPerRevolution))
+        return adjusted_rpm, intervals, len(intervals)
+    interval_ns = int(round((60 / adjusted_rpm) / glodon_stepsPerRevolution * 1e9))
+    return adjusted_rpm, interval_ns, slots_for_duration(duration_s, interval_ns)
+
 # 步进电机旋转 - 完全按照官方代码实现
 def glodon_rotary(clb_direction, freq_hz=180, duration_s=1):
     """
@@ -89,56 +252,111 @@ def glodon_rotary(clb_direction, freq_hz=180, duration_s=1):
     :param clb_direction: 旋转方向，'a'为逆时针，'c'为顺时针
     :param freq_hz: 振捣频率（Hz）
     :param duration_s: 持续时间（秒）
+    :return: bool, 是否完整执行（被中断、急停或出错时为 False）
     """
-    # 根据频率调整步进电机速度
-    adjusted_rpm = max(5, min(30, freq_hz / 10))  # 限制RPM在安全范围内
+    if stop_requested():
+        print("\n[急停] 急停未复位，不启动电机")
+        return False
+    adjusted_rpm, intervals, slots = vibration_plan(freq_hz, duration_s)
     global glodon_rolePerMinute, glodon_stepSpeed
     glodon_rolePerMinute = adjusted_rpm
     glodon_stepSpeed = (60/glodon_rolePerMinute)/glodon_stepsPerRevolution
     
-    print(f"\n[电机设置] 频率: {freq_hz}Hz, 转速: {adjusted_rpm}RPM, 步进时间: {glodon_stepSpeed:.6f}s")
+    print(f"\n[电机设置] 频率: {freq_hz}Hz, 转速: {adjusted_rpm}RPM, 驱动方式: {glodon_driveMode}, "
+          f"步进时间: {glodon_stepSpeed:.6f}s")
     
-    # 计算运行时间
-    start_time = time.time()
-    end_time = start_time + duration_s
+    interval_ns = int(round(glodon_stepSpeed * 1e9))
+    report_every = max(1, int(round(1e9 / interval_ns)))  # 约每秒显示一次运行状态
+    start_ns = time.monotonic_ns()
     
     # 显示方向
     direction_text = "逆时针" if clb_direction == 'a' else "顺时针"
     print(f"[电机运行] 方向: {direction_text}, 时间: {duration_s}秒")
     
+    def show_progress(elapsed):
+        progress = min(100, int(elapsed / duration_s * 100))
+        sys.stdout.write(f"\r振捣中: {elapsed:.1f}秒/{duration_s}秒 [进度: {progress}%] [频率: {freq_hz}Hz]")
+        sys.stdout.flush()
+    
     try:
-        # 持续运行指定时间
-        while time.time() < end_time:
-            # 完全按照官方代码实现
-            if clb_direction == 'a':     # 逆时针旋转
-                for j in range(4):
-                    for i in range(4):
-                        GPIO.output(glodon_motorPin[i], 0x99>>j & (0x08>>i))
-                    sleep(glodon_stepSpeed)
-            elif clb_direction == 'c':    # 顺时针旋转
-                for j in range(4):
-                    for i in range(4):
-                        GPIO.output(glodon_motorPin[i], 0x99<<j & (0x80>>i))
-                    sleep(glodon_stepSpeed)
+        if glodon_worker is not None:
+            # 脉冲在电机工作线程中产生，本线程只负责显示进度
+            future = glodon_worker.rotate(clb_direction, intervals, slots, stop=glodon_estop.event)
+            while not future.done():
+                try:
+                    future.result(timeout=1)
+                except TimeoutError:
+                    show_progress((time.monotonic_ns() - start_ns) / 1e9)
+            stats = future.result()
+        else:
+            # 相序与官方代码一致，'a'为逆时针，'c'为顺时针
+            write_phase = glodon_driver.step_function(clb_direction)
+            stamps = [0] * slots
             
-            # 每秒显示一次运行状态
-            elapsed = time.time() - start_time
-            if int(elapsed) != int(elapsed - glodon_stepSpeed * 4):
-                remaining = max(0, end_time - time.time())
-                progress = min(100, int(elapsed / duration_s * 100))
-                sys.stdout.write(f"\r振捣中: {elapsed:.1f}秒/{duration_s}秒 [进度: {progress}%] [频率: {freq_hz}Hz]")
-                sys.stdout.flush()
+            def step(k):
+                write_phase(k)
+                stamps[k] = time.monotonic_ns()
+                # 每秒显示一次运行状态
+                if k % report_every == 0 and k > 0:
+                    show_progress((stamps[k] - start_ns) / 1e9)
+            
+            stats = run_steps(step, slots, intervals, stop=glodon_estop.event)
+            if stats["stopped"]:
+                glodon_driver.release(force=True)  # 急停后再次强制置低
+            stats["jitter"] = jitter_stats(stamps[:stats["steps"]], intervals)
+        
+        jitter = stats["jitter"]
+        print(f"\n[电机统计] 步数: {stats['steps']}, 实际步进速率: {stats['achieved_rate_hz']:.1f}/"
+              f"{stats['target_rate_hz']:.1f} 步/秒, 跳过节拍: {stats['skipped']}, "
+              f"步间隔抖动 p50/p99/max: {jitter['p50_us']}/{jitter['p99_us']}/{jitter['max_us']} us")
+        if stats.get("stopped"):
+            stop_requested()
+            print(f"[急停] 电机已停止（{glodon_estop.reason}），"
+                  f"触发到安全状态 {glodon_estop.latency_ns / 1000:.0f} us")
+            return False
     
     except KeyboardInterrupt:
         print("\n用户中断振捣")
+        return False
     except Exception as e:
         print(f"\n振捣过程出错: {e}")
         import traceback
         traceback.print_exc()  # 打印详细错误信息
+        return False
     
     print("\n振捣完成")
     return True
 
+def glodon_travel(x, y, move_s):
+    """
+    移动到点位 (x, y)：启用龙门时按坐标直线插补移动，否则等待时序方案的移动时间（人工移动振捣头）。
+    梯形加减速只用于 glodon_rotary 的振捣转动和龙门各轴，未启用龙门时点位间移动不驱动任何电机。
+    :param x: 点位 x 坐标 (m)
+    :param y: 点位 y 坐标 (m)
+    :param move_s: 未启用龙门时的移动时间 (s)
+    :return: bool, 是否到达（急停时为 False）
+    """
+    if glodon_gantry is None:
+        return pause(move_s)
+    if stop_requested():
+        return False
+    result = glodon_gantry.move_to((x, y), stop=glodon_estop.event)
+    print(f"  [龙门] {result['steps']} 节拍, 用时 {result['elapsed_s']:.2f} 秒 (规划 {result['duration_s']:.2f} 秒)")
+    if result["stopped"]:
+        stop_requested()
+        return False
+    return True
+
+def point_travel_times_s(points):
+    """
+    从龙门当前位置依次移动到各点位的时间 (s)。
+    :return: 数组；未启用龙门或点位没有坐标时为 None（使用时序方案的 move_s）
+    """
+    if glodon_gantry is None or not len(points) or not is_point_record(points[0]):
+        return None
+    x, y = point_columns(points, "x", "y")
+    return glodon_gantry.travel_times_s(np.column_stack((x, y)))
+
 # 释放资源
 def destroy():
     """释放电机控制资源"""
@@ -151,16 +369,144 @@ def destroy():
             GPIO.output(i, GPIO.LOW) # 设置所有电机管脚为低电平
         except Exception as e:
             print(f"  警告: 关闭电机引脚 {i} 时出错: {e} (可能未初始化或已清理)")
+    if glodon_gantry is not None:
+        try:
+            glodon_gantry.release()
+        except Exception as e:
+            print(f"  警告: 关闭龙门电机引脚时出错: {e}")
             
+    tracer = stop_trace(GPIO)
+    if tracer is not None:
+        print(f"GPIO写入跟踪已保存: {tracer.path}（{tracer.events} 条记录，丢失 {tracer.dropped} 次写入），"
+              f"用 python -m utils.gpio_trace {tracer.path} 分析")
     # GPIO.cleanup(glodon_motorPin) # 不在这里进行cleanup，改由main.py统一处理
     # 或者只清理电机相关的引脚，但全局cleanup更推荐
     print("电机引脚已设置为LOW，等待主程序统一cleanup")
 
-def execute_strategy(strategy):
+def load_timing_profile(name=None):
+    """
+    读取振捣执行的时序方案。
+    :param name: 方案名称（如 demo/production/fast），None 时使用配置中的 timing_profile
+    :return: tuple (方案名称, 方案参数 dict)
+    """
+    config = get_config()
+    profiles = config["timing_profiles"]
+    name = name or config.get("timing_profile", "demo")
+    if name not in profiles:
+        raise ValueError(f"未知的时序方案: {name}，可选: {tuple(profiles)}")
+    return name, profiles[name]
+
+def point_overhead_s(profile, last=False, move_s=None):
+    """
+    单个点位除振捣时间以外的固定耗时 (s)。
+    :param profile: 时序方案参数
+    :param last: 是否为最后一个点位
+    :param move_s: 移动时间 (s)，None 时使用时序方案的 move_s
+    """
+    move_s = profile["move_s"] if move_s is None else move_s
+    overhead = move_s + profile["ready_s"] + glodon_signalSwitchDelay + profile["settle_s"]
+    if last:
+        overhead += profile["finish_s"]
+    elif not profile.get("pipelined"):
+        overhead += profile["next_ready_s"] + profile["gap_s"]
+    elif profile["next_ready_s"] > move_s:
+        # 流水线方式下提示与下一次移动重叠，只有超出移动时间的部分需要额外等待
+        overhead += profile["next_ready_s"] - move_s
+    return overhead
+
+def predict_runtime_s(time_s_values, profile, move_s_values=None):
+    """
+    预测按时序方案执行全部点位的总时间 (s)。
+    :param time_s_values: 各点位的振捣时间 (s)
+    :param profile: 时序方案参数
+    :param move_s_values: 移动到各点位的时间 (s)，None 时均为时序方案的 move_s
+    """
+    count = len(time_s_values)
+    if count == 0:
+        return 0.0
+    if move_s_values is None:
+        moves = np.full(count, float(profile["move_s"]))
+    else:
+        moves = np.asarray(move_s_values, dtype=float)
+    total = float(np.sum(time_s_values)) + float(moves.sum()) + profile["finish_s"]
+    total += (profile["ready_s"] + glodon_signalSwitchDelay + profile["settle_s"]) * count
+    if profile.get("pipelined"):
+        # 流水线方式下提示与下一次移动重叠，只有超出移动时间的部分需要额外等待
+        total += float(np.maximum(0.0, profile["next_ready_s"] - moves[1:]).sum())
+    else:
+        total += (profile["next_ready_s"] + profile["gap_s"]) * (count - 1)
+    return total
+
+def print_runtime_predictions(time_s_values, selected=None, move_s_values=None):
+    """打印各时序方案下的预测总时间"""
+    print(f"\n[时序预测] 共 {len(time_s_values)} 个点位")
+    move_s = None
+    if move_s_values is not None and len(move_s_values):
+        move_s = float(np.mean(move_s_values))
+        print(f"  龙门移动: 平均 {move_s:.2f} 秒, 最长 {float(np.max(move_s_values)):.2f} 秒")
+    for name, profile in get_config()["timing_profiles"].items():
+        total = predict_runtime_s(time_s_values, profile, move_s_values)
+        mark = " <- 当前方案" if name == selected else ""
+        mode = "流水线" if profile.get("pipelined") else "顺序"
+        print(f"  - {name}({mode}): 每点固定开销 {point_overhead_s(profile, move_s=move_s):.1f} 秒, "
+              f"预计总时间 {total / 60:.1f} 分钟 ({total / 3600:.2f} 小时){mark}")
+
+def open_journal(strategy, points, journal_path=None, resume=True, heads=1):
+    """
+    打开策略对应的断点日志。
+    :param strategy: 振捣策略
+    :param points: 点位序列
+    :param journal_path: 日志文件路径，None 时按策略指纹放在 output 目录下
+    :param resume: 是否从上次中断处继续，False 时丢弃已有日志从头开始
+    :param heads: 振捣头数（多振捣头使用单独的默认日志）
+    :return: ExecutionJournal
+    """
+    total = len(points)
+    point_order = None
+    if is_point_record(points[0]):
+        first_id = int(point_get(points[0], "id", 1))
+        last_id = int(point_get(points[total - 1], "id", total))
+        # 指纹包含点位执行顺序：有id时按id，否则按坐标
+        if point_get(points[0], "id") is not None:
+            point_order = point_columns(points, "id")[0]
+        else:
+            point_order = np.column_stack(point_columns(points, "x", "y"))
+    else:
+        first_id, last_id = 1, total
+    fingerprint = plan_fingerprint(strategy, first_id, last_id, total, point_order)
+    journal_path = journal_path or default_journal_path(fingerprint, heads)
+    if not resume and os.path.exists(journal_path):
+        os.remove(journal_path)
+    try:
+        return ExecutionJournal(journal_path, fingerprint, total)
+    except ValueError as e:
+        # 日志属于另一份策略：保留为 .bak 后从头开始
+        print(f"[断点续做] {e}，已备份为 .bak，从头开始执行")
+        os.replace(journal_path, journal_path + ".bak")
+        return ExecutionJournal(journal_path, fingerprint, total)
+
+def execute_strategy(strategy, profile_name=None, journal_path=None, resume=True, heads=None):
     """
     根据策略执行振捣操作，控制步进电机并自动计时断电。
+    每完成一个点位向断点日志追加一条记录，程序中断后再次执行同一策略时从下一个未完成的点位继续。
     :param strategy: dict，包括频率、时间、深度、点位布局
+    :param profile_name: 时序方案名称，None 时使用配置中的 timing_profile
+    :param journal_path: 断点日志路径，None 时按策略指纹放在 output 目录下
+    :param resume: 是否从上次中断处继续
+    :param heads: 振捣头数，None 时使用配置中的 vibrator_heads.count；大于1时按分区并行执行（见 multi_head.py）
     """
+    heads = heads or get_config()["vibrator_heads"].get("count", 1)
+    if heads > 1:
+        from multi_head import execute_zones
+        execute_zones(strategy, heads, profile_name, journal_path, resume)
+        return
+    
+    profile_name, profile = load_timing_profile(profile_name)
+    pipelined = profile.get("pipelined", False)
+    if stop_requested():
+        print("\n[急停] 急停未复位，请先调用 reset_emergency_stop()")
+        return
+    
     print("\n=== 初始化振捣电机 ===")
     # 首先确保所有LED和蜂鸣器处于关闭状态
     control_devices("off")
@@ -168,9 +514,9 @@ def execute_strategy(strategy):
     # 初始化电机
     glodon_setup()
     
-    # 提取振捣策略中的点位信息
-    points = strategy.get("points", [])
-    if not points:
+    # 提取振捣策略中的点位信息（点位字典列表，或列式存储加载的点位视图）
+    points = as_point_sequence(strategy_points(strategy))
+    if not len(points):
         # 兼容旧版策略格式
         points = strategy.get("points_layout", [])
         if not points:
@@ -187,91 +533,161 @@ def execute_strategy(strategy):
     if "recommended_time_s" in strategy:
         base_time = strategy.get("recommended_time_s")
     
-    vibration_status["total_points"] = len(points)
-    print(f"\n=== 开始振捣操作 (总点位数: {len(points)}) ===")
+    total = len(points)
+    vibration_status["total_points"] = total
     
-    # 执行最多5个振捣点位，按照用户要求
-    num_cycles = 5
-    actual_cycles = min(num_cycles, len(points))
+    # 断点续做：只读取日志末尾的最后一条记录
+    journal = open_journal(strategy, points, journal_path, resume)
+    last = journal.last_completed()
+    start_index = 0 if last is None else last["index"] + 1
+    print(f"\n=== 开始振捣操作 (总点位数: {total}, 时序方案: {profile_name}) ===")
+    if last is not None:
+        print(f"[断点续做] 已完成 {start_index}/{total} 个点位（最后完成 P{last['point_id']}，"
+              f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(last['timestamp']))}），"
+              f"从第 {start_index + 1} 个点位继续")
     
-    for idx, point in enumerate(points[:actual_cycles]):
-        vibration_status["current_point"] = idx
-        
-        # 获取点位信息
-        if isinstance(point, dict) and "x" in point and "y" in point:
-            point_id = point.get("id", idx + 1)
-            x, y = point.get("x", 0), point.get("y", 0)
-            freq_hz = point.get("freq_hz", base_freq)
-            time_s = point.get("time_s", base_time)
-            depth_cm = point.get("depth_cm", 40)
-            pos = f"P{point_id}"
+    # 开始前打印各时序方案下剩余点位的预测总时间
+    if is_point_record(points[0]):
+        time_values = point_columns(points[start_index:], "time_s")[0].tolist()
+    else:
+        time_values = [base_time] * (total - start_index)
+    move_values = point_travel_times_s(points[start_index:])
+    print_runtime_predictions(time_values, profile_name, move_values)
+    # 执行期间在电机工作线程中输出脉冲（已由调用方启动时沿用，不在结束时停止）
+    own_worker = glodon_motorConfig.get("realtime_worker", False) and glodon_worker is None
+    if own_worker:
+        start_motor_worker(glodon_motorConfig.get("worker_cpu"))
+    start_time = time.monotonic()
+    completed = False
+    
+    try:
+        for idx in range(start_index, total):
+            point = points[idx]
+            vibration_status["current_point"] = idx
+            
+            # 获取点位信息
+            if is_point_record(point):
+                point_id = point_get(point, "id", idx + 1)
+                x, y = point_get(point, "x", 0), point_get(point, "y", 0)
+                freq_hz = point_get(point, "freq_hz", base_freq)
+                time_s = point_get(point, "time_s", base_time)
+                depth_cm = point_get(point, "depth_cm", 40)
+                pos = f"P{point_id}"
+            else:
+                point_id = idx + 1
+                pos = chr(ord('A') + idx) if idx < 26 else f"P{idx + 1}"
+                freq_hz = base_freq
+                time_s = base_time
+                depth_cm = strategy.get("recommended_depth_cm", 40)
+                x, y = idx * 10, 0
+            
+            print(f"\n[循环 {idx + 1}/{total}]")
+            if glodon_gantry is not None:
+                print(f"  龙门移动到点位 {pos} 坐标({x}, {y})...")
+            else:
+                print(f"  正在模拟步进电机移动到点位 {pos} 坐标({x}, {y})...")
+            
+            if pipelined and idx > start_index:
+                # 1. 流水线方式：上一点位结束后的绿灯提示与本次移动同时进行
+                move_start = time.monotonic()
+                control_devices("green", idx - 1, total)
+                if not glodon_travel(x, y, profile["move_s"]):
+                    break
+                if not pause(profile["next_ready_s"] - (time.monotonic() - move_start)):
+                    break
+                control_devices("off")
+            else:
+                # 1. 确保所有LED和蜂鸣器关闭
+                control_devices("off")
+                
+                # 移动到点位（未启用龙门时模拟移动时间）
+                if not glodon_travel(x, y, profile["move_s"]):
+                    break
+            
+            # 2. 到达位置后，打开绿灯
+            print(f"  步进电机已到达点位 {pos}.")
+            control_devices("green", idx, total)
+            
+            # 绿灯保持一段时间(表示已就位)
+            if not pause(profile["ready_s"]):
+                break
+    
+            print(f"\n[开始振捣] 点位 {pos}")
+            print(f"  - 振捣频率: {freq_hz} Hz")
+            print(f"  - 振捣时间: {time_s} 秒")
+            print(f"  - 振捣深度: {depth_cm} cm")
+            
+            # 根据奇偶数确定旋转方向
+            direction = 'c' if idx % 2 == 0 else 'a'
+            vibration_status["direction"] = direction
+            vibration_status["frequency"] = freq_hz
+            
+            # 3. 开始振捣，红灯亮，蜂鸣器响
+            vibration_status["running"] = True
+            dir_text = "顺时针" if direction == 'c' else "逆时针"
+            print(f"  电机转向: {dir_text}.")
+            control_devices("red_buzzer", idx, total)
+            
+            # 执行振捣
+            vibrate_start = time.monotonic()
+            finished = glodon_rotary(direction, freq_hz, time_s)
+            duration = time.monotonic() - vibrate_start
+            
+            # 4. 振捣结束，关闭红灯和蜂鸣器
+            vibration_status["running"] = False
+            control_devices("off")
+            if not finished:
+                print(f"\n[未完成] 点位 {pos} 振捣未完成，停止执行，下次从该点位继续")
+                break
+            
+            # 记录断点：该点位已完成
+            journal.append(idx, int(point_id), duration)
+            print(f"\n[完成振捣] 点位 {pos}.")
+            
+            # 添加短暂暂停，让所有设备都保持关闭状态一小段时间
+            if not pause(profile["settle_s"]):
+                break
+            
+            if idx < total - 1:
+                print(f"  准备下一个循环...")
+                if not pipelined:
+                    # 在下一循环开始前，先让绿灯亮一段时间，表示准备就绪
+                    control_devices("green", idx, total)
+                    if not pause(profile["next_ready_s"]):
+                        break
+                    control_devices("off")  # 然后再次关闭所有设备
+                    if not pause(profile["gap_s"]):  # 短暂暂停
+                        break
+            else:
+                print(f"  全部 {total} 个循环已完成.")
+                # 最后一个循环结束后，绿灯亮起表示全部完成
+                control_devices("green", idx, total)
+                pause(profile["finish_s"])
+                control_devices("off")
         else:
-            pos = chr(ord('A') + idx) if idx < 26 else f"P{idx + 1}"
-            freq_hz = base_freq
-            time_s = base_time
-            depth_cm = strategy.get("recommended_depth_cm", 40)
-            x, y = idx * 10, 0
-        
-        print(f"\n[循环 {idx + 1}/{actual_cycles}]")
-        print(f"  正在模拟步进电机移动到点位 {pos} 坐标({x}, {y})...")
-        
-        # 1. 确保所有LED和蜂鸣器关闭
-        control_devices("off")
-        
-        # 模拟电机移动时间
-        time.sleep(3)
-        
-        # 2. 到达位置后，打开绿灯
-        print(f"  步进电机已到达点位 {pos}.")
-        control_devices("green", idx, actual_cycles)
-        
-        # 给较长时间观察绿灯(表示已就位)
-        time.sleep(3)  # 延长到3秒，让绿灯亮的时间更长
-
-        print(f"\n[开始振捣] 点位 {pos}")
-        print(f"  - 振捣频率: {freq_hz} Hz")
-        print(f"  - 振捣时间: {time_s} 秒")
-        print(f"  - 振捣深度: {depth_cm} cm")
-        
-        # 根据奇偶数确定旋转方向
-        direction = 'c' if idx % 2 == 0 else 'a'
-        vibration_status["direction"] = direction
-        vibration_status["frequency"] = freq_hz
-        
-        # 3. 开始振捣，红灯亮，蜂鸣器响
-        vibration_status["running"] = True
-        dir_text = "顺时针" if direction == 'c' else "逆时针"
-        print(f"  电机转向: {dir_text}.")
-        control_devices("red_buzzer", idx, actual_cycles)
-        
-        # 执行振捣
-        glodon_rotary(direction, freq_hz, time_s)
-        
-        # 4. 振捣结束，关闭红灯和蜂鸣器
-        vibration_status["running"] = False
-        print(f"\n[完成振捣] 点位 {pos}.")
-        control_devices("off")
-        
-        # 添加短暂暂停，让所有设备都保持关闭状态一小段时间
-        time.sleep(1)
-        
-        if idx < actual_cycles - 1:
-            print(f"  准备下一个循环...")
-            # 在下一循环开始前，先让绿灯亮一段时间，表示准备就绪
-            control_devices("green", idx, actual_cycles)
-            time.sleep(2)  # 绿灯亮2秒表示准备就绪
-            control_devices("off")  # 然后再次关闭所有设备
-            time.sleep(0.5)  # 短暂暂停
+            completed = True
+    finally:
+        if glodon_estop.is_set():
+            # 急停后再次确认安全状态（防止与急停同时发生的输出）
+            glodon_estop.make_safe()
+            print(f"\n[急停] 振捣已停止（{glodon_estop.reason}），未完成的点位不记录，复位后从下一个未完成的点位继续")
+        if completed:
+            # 全部完成：日志改名为 .done，再次执行同一策略时从头开始
+            journal.finish()
         else:
-            print(f"  全部 {actual_cycles} 个循环已完成.")
-            # 最后一个循环结束后，绿灯亮起3秒表示全部完成
-            control_devices("green", idx, actual_cycles)
-            time.sleep(3)
-            control_devices("off")
+            journal.close()
+        if own_worker:
+            stop_motor_worker()
+        # 释放资源
+        destroy()
     
-    # 释放资源
-    destroy()
-    print("=== 振捣操作完成 ===")
+    elapsed = time.monotonic() - start_time
+    predicted = predict_runtime_s(time_values, profile, move_values)
+    state = "完成" if completed else "中断"
+    gpio_stats = GPIO.stats()
+    print(f"[GPIO统计] 实际写入 {gpio_stats['real_writes']} 次, 跳过重复写入 {gpio_stats['elided_writes']} 次 "
+          f"({gpio_stats['elided_ratio'] * 100:.1f}%)")
+    print(f"=== 振捣操作{state} (用时 {elapsed:.1f} 秒, 预测 {predicted:.1f} 秒) ===")
 
 if __name__ == "__main__":
     # 测试用例
@@ -0,0 +1,179 @@
+"""
+execution_journal.py
+振捣执行断点日志模块
+每完成一个点位，向只追加的二进制日志写入一条定长记录（点位序号、点位id、实际用时、完成时间）并 fsync，
+断电或程序崩溃后重新启动时，只需读取文件末尾的最后一条完整记录即可从下一个点位继续（O(1)，无需扫描策略）。
+
+文件格式:
+    文件头 (HEADER, 32字节): 魔数 b"SVJ1", 记录长度, 总点位数, 策略指纹(20字节)
+    记录   (RECORD, 24字节): 点位序号 uint32, 点位id uint32, 用时(s) float64, 完成时间(unix s) float64
+"""
+import hashlib
+import json
+import os
+import struct
+import time
+
+import numpy as np
+
+MAGIC = b"SVJ1"
+HEADER = struct.Struct("<4sII20s")
+RECORD = struct.Struct("<IIdd")
+
+# 默认日志目录
+DEFAULT_JOURNAL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "output")
+
+
+def plan_fingerprint(strategy, first_id, last_id, total_points, point_order=None):
+    """
+    策略指纹，用于确认断点日志属于同一份策略。
+    使用板信息、材料信息、点位数、首末点位id和点位执行顺序，不包含振捣参数，增量重新规划改变振捣参数后仍可续做；
+    路线优化在时间限制内停止，重新规划后中间的点位顺序可能不同，此时指纹随之改变，不会按序号跳过未振捣的点位。
+    :param point_order: 按执行顺序排列的点位id（或坐标）数组，None 表示不校验顺序
+    :return: bytes, 20字节 SHA-1 摘要
+    """
+    payload = {
+        "board_info": strategy.get("board_info"),
+        "material_info": strategy.get("material_info"),
+        "total_points": total_points,
+        "first_id": first_id,
+        "last_id": last_id
+    }
+    if point_order is not None:
+        order = np.ascontiguousarray(point_order, dtype=np.float64)
+        payload["order"] = hashlib.sha1(order.tobytes()).hexdigest()
+    payload = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).digest()
+
+
+def default_journal_path(fingerprint, heads=1):
+    """
+    按策略指纹生成默认日志路径 output/execution_<指纹前12位>.journal。
+    多振捣头执行时记录不按点位顺序，使用单独的日志 execution_<指纹前12位>_<N>heads.journal。
+    """
+    suffix = "" if heads == 1 else f"_{heads}heads"
+    return os.path.join(DEFAULT_JOURNAL_DIR, f"execution_{fingerprint.hex()[:12]}{suffix}.journal")
+
+
+def read_journal(path):
+    """
+    离线读取断点日志（包括已完成的 .done 日志）。
+    :return: tuple (总点位数, 策略指纹, 记录列表)，记录为 (index, point_id, duration_s, timestamp)
+    """
+    with open(path, "rb") as f:
+        magic, record_size, total, fingerprint = HEADER.unpack(f.read(HEADER.size))
+        data = f.read()
+    if magic != MAGIC or record_size != RECORD.size:
+        raise ValueError(f"不是有效的振捣断点日志: {path}")
+    return total, fingerprint, list(RECORD.iter_unpack(data[:len(data) // RECORD.size * RECORD.size]))
+
+
+def fsync_dir(path):
+    """将目录项写入磁盘（fsync 目录），新建或重命名的文件在断电后仍存在"""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class ExecutionJournal:
+    """
+    只追加的断点日志。
+    :param path: 日志文件路径
+    :param fingerprint: plan_fingerprint 的结果
+    :param total_points: 总点位数
+    """
+
+    def __init__(self, path, fingerprint, total_points):
+        self.path = path
+        self._dir = os.path.dirname(os.path.abspath(path))
+        os.makedirs(self._dir, exist_ok=True)
+        self._file = open(path, "a+b")
+        size = self._file.seek(0, os.SEEK_END)
+        if size < HEADER.size:
+            # 新日志（或只写了半个文件头）：重写文件头，并 fsync 所在目录使新文件的目录项落盘
+            self._file.truncate(0)
+            self._file.write(HEADER.pack(MAGIC, RECORD.size, total_points, fingerprint))
+            self._sync()
+            fsync_dir(self._dir)
+            return
+
+        self._file.seek(0)
+        magic, record_size, saved_total, saved_fingerprint = HEADER.unpack(self._file.read(HEADER.size))
+        if magic != MAGIC or record_size != RECORD.size:
+            self._file.close()
+            raise ValueError(f"不是有效的振捣断点日志: {path}")
+        if saved_total != total_points or saved_fingerprint != fingerprint:
+            self._file.close()
+            raise ValueError(f"断点日志与当前策略不匹配: {path}")
+        # 丢弃崩溃时写了一半的记录
+        whole = HEADER.size + (size - HEADER.size) // RECORD.size * RECORD.size
+        if whole != size:
+            self._file.truncate(whole)
+            self._sync()
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def last_completed(self):
+        """
+        最后一个已完成的点位。
+        :return: dict (index/point_id/duration_s/timestamp) 或 None
+        """
+        size = self._file.seek(0, os.SEEK_END)
+        if size < HEADER.size + RECORD.size:
+            return None
+        self._file.seek(size - RECORD.size)
+        index, point_id, duration_s, timestamp = RECORD.unpack(self._file.read(RECORD.size))
+        return {"index": index, "point_id": point_id, "duration_s": duration_s, "timestamp": timestamp}
+
+    def completed_count(self):
+        """已完成的点位数"""
+        size = self._file.seek(0, os.SEEK_END)
+        return max(0, (size - HEADER.size) // RECORD.size)
+
+    def append(self, index, point_id, duration_s, timestamp=None):
+        """
+        追加一条点位完成记录并写入磁盘（fsync）。
+        :param index: 点位在策略中的序号
+        :param point_id: 点位id
+        :param duration_s: 实际用时 (s)
+        :param timestamp: 完成时间 (unix s)，默认为当前时间
+        """
+        self._file.seek(0, os.SEEK_END)
+        self._file.write(RECORD.pack(index, point_id, duration_s, time.time() if timestamp is None else timestamp))
+        self._sync()
+
+    def records(self):
+        """读取全部记录（用于离线分析）"""
+        self._file.seek(HEADER.size)
+        data = self._file.read()
+        return [
+            dict(zip(("index", "point_id", "duration_s", "timestamp"), values))
+            for values in RECORD.iter_unpack(data[:len(data) // RECORD.size * RECORD.size])
+        ]
+
+    def close(self):
+        self._file.close()
+
+    def finish(self):
+        """全部点位完成：关闭日志并重命名为 .done，下次执行同一策略时从头开始"""
+        self.close()
+        os.replace(self.path, self.path + ".done")
+        fsync_dir(self._dir)
+
+
+if __name__ == "__main__":
+    # 用法: python execution_journal.py <日志文件>   打印日志中的执行记录
+    import sys
+
+    if len(sys.argv) < 2:
+        print("用法: python execution_journal.py <日志文件>")
+        sys.exit(1)
+    total, fingerprint, records = read_journal(sys.argv[1])
+    print(f"策略指纹 {fingerprint.hex()[:12]}, 已完成 {len(records)}/{total} 个点位")
+    for index, point_id, duration_s, timestamp in records[-10:]:
+        print(f"  #{index} P{point_id}: {duration_s:.1f} 秒, "
+              f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp))}")
@@ -6,14 +6,17 @@ import time
 import os
 import json
 
-import Jetson.GPIO as GPIO # Added for global GPIO cleanup if needed, and initial mode setting
+from utils.gpio_shadow import GPIO # 与各模块共用影子寄存器，用于初始模式设置和全局cleanup
 from vibration_strategy import generate_strategy
 from device_control import execute_strategy, control_devices # 导入control_devices函数以便直接使用
 from cloud_upload import upload_data
 from utils.config import get_config
-from utils.sensor_interface import read_temperature, read_humidity, read_slump, read_rebar_density
+from utils.sensor_interface import SensorSampler, read_temperature, read_humidity, read_slump, read_rebar_density
 from utils.camera_ocr import ocr_extract_material_info
 from visualize_points import visualize_vibration_points, generate_vibration_excel
+from coverage_analysis import analyze_coverage, print_coverage_report
+from route_planner import optimize_route
+from strategy_store import save_strategy
 from utils.led_control import setup_led, cleanup_led, all_leds_off # cleanup_led might not be needed if global cleanup is used
 from utils.buzzer_control import setup_buzzer, cleanup_buzzer, buzzer_off # cleanup_buzzer might not be needed
 
@@ -69,6 +72,10 @@ def main():
         led_initialized = False
         buzzer_initialized = False
 
+    # 传感器在后台持续采样：启动时先连续采样10次，识别材料参数期间继续按 sensor_refresh_interval 更新
+    sensor_sampler = SensorSampler(interval_s=config.get("sensor_refresh_interval", 2))
+    sensor_sampler.start(prime=10)
+
     try:
         print("\n=== [1] 混凝土材料参数识别 ===")
         material_params = ocr_extract_material_info()
@@ -76,26 +83,20 @@ def main():
 
         print("\n=== [2] 环境参数采集 ===")
         
-        # 多次读取温度并取平均值
-        print("温度数据采集中...")
-        temp_readings = []
-        for i in range(10):
-            temp = read_temperature()
-            temp_readings.append(temp)
-            print(f"  温度读数 #{i+1}: {temp:.1f}°C")
-            time.sleep(0.5)  # 短暂延时
-        
-        # 计算平均温度
-        avg_temp = sum(temp_readings) / len(temp_readings)
-        print(f"  平均温度: {avg_temp:.1f}°C")
+        # 取采样器中最近10次采样的平均值，不再逐次读取等待
+        sensor_data = sensor_sampler.mean(10)
+        if sensor_data is None:
+            # 采样器尚无有效采样（每次采样均失败），直接读取一次
+            print(f"  采样器无有效采样（失败 {sensor_sampler.errors} 次），直接读取传感器")
+            sensor_data = {
+                "temperature": read_temperature(),
+                "humidity": read_humidity(),
+                "slump": read_slump(),
+                "rebar_density": read_rebar_density()
+            }
+        else:
+            print(f"  最近 {min(sensor_sampler.count, 10)} 次采样平均温度: {sensor_data['temperature']:.1f}°C")
         
-        # 采集其他传感器数据
-        sensor_data = {
-            "temperature": round(avg_temp, 1),
-            "humidity": read_humidity(),
-            "slump": read_slump(),
-            "rebar_density": read_rebar_density()
-        }
         print("传感器数据:", sensor_data)
 
         # 兼容原env_monitor采集格式
@@ -105,6 +106,9 @@ def main():
         strategy = generate_strategy(material_params, env_params)
         print("振捣策略:", strategy)
         
+        # 优化点位执行顺序，缩短设备移动路程
+        optimize_route(strategy)
+        
         # 保存策略到文件
         output_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "output")
         os.makedirs(output_dir, exist_ok=True)
@@ -113,6 +117,20 @@ def main():
         with open(strategy_file, 'w', encoding='utf-8') as f:
             json.dump(strategy, f, ensure_ascii=False, indent=2)
         print(f"策略已保存至: {strategy_file}")
+        # 同时保存列式格式，供可视化、覆盖分析等按列快速读取
+        header_file, _ = save_strategy(strategy, os.path.join(output_dir, "vibration_strategy"))
+        print(f"列式策略已保存至: {header_file}")
+        
+        # 检查振捣半径圆是否覆盖整块板
+        try:
+            coverage = analyze_coverage(strategy)
+            print_coverage_report(coverage)
+            if coverage["over_vibrated_cells"]:
+                print(f"警告: {coverage['over_vibrated_cells']} 个栅格过振（覆盖超过{coverage['max_overlap']}次），"
+                      f"面积 {coverage['over_vibrated_area_m2']} m²，最大区域 "
+                      f"{coverage['over_vibrated_polygons'][0]['area_m2']} m²")
+        except Exception as e:
+            print(f"覆盖分析失败: {e}")
         
         # 询问用户是否需要可视化
         visualize = input("\n是否需要可视化振捣点位布局? (y/n): ").strip().lower()
@@ -169,6 +187,7 @@ def main():
         upload_data(report_data)
     finally:
         print("\n=== [系统清理] 清理外设资源 ===")
+        sensor_sampler.stop()
         try:
             print("正在关闭所有LED和蜂鸣器...")
             if led_initialized: # 确保只在初始化成功时尝试关闭
@@ -195,6 +214,7 @@ def main():
             # 如果 execute_strategy 被调用，其内部的 destroy() 也会被执行
             # 我们需要确保 device_control.destroy() 不再调用 GPIO.cleanup() 或者只清理它自己的引脚
             
+            print(f"[GPIO统计] {GPIO.stats()}")
             print("准备执行全局 GPIO.cleanup()...")
             GPIO.cleanup() # 清理所有已使用的GPIO通道
             print("[清理] 所有GPIO资源已通过全局cleanup释放")
@@ -0,0 +1,605 @@
+"""
+multi_head.py
+多振捣头并行执行模块
+N 个振捣头各有一组电机管脚（启用龙门时还有各自的龙门），策略点位按 zone_partition 划分为 N 个条带分区，
+每个振捣头在独立的工作线程中按与单头相同的时序方案执行自己的分区:
+    移动 -> 就位 -> 振捣 -> 停顿 -> 准备下一点位
+各头共用急停、断点日志（加锁追加）和指示灯/蜂鸣器：任一头振捣时红灯亮、蜂鸣器响，否则有头在移动或就位时绿灯亮。
+防碰撞互锁：移动前检查目标点与其余每个振捣头的当前位置、已放行的目标点和等待中的目标点的距离，
+小于最小间距时等待对方离开；两个头等待中的目标点互相冲突时编号小的先走。
+对方的位置本身挡住目标点而对方又在等待（或已完成、不再移动）时等待不会结束，此时报错并急停。
+各头的进度和状态汇总在 ZoneBoard 中（同时挂在 device_control.vibration_status["heads"]），主线程定期打印。
+"""
+import threading
+import time
+import traceback
+
+import numpy as np
+
+import device_control
+from device_control import (control_devices, destroy, emergency_stop, glodon_estop, glodon_setup,
+                            glodon_signalSwitchDelay, load_timing_profile, open_journal, predict_runtime_s,
+                            stop_requested, vibration_plan, vibration_status)
+from strategy_store import as_point_sequence, is_point_record, point_columns, point_get, strategy_points
+from zone_partition import partition_zones, sweep_order, zone_summary
+from utils.buzzer_control import buzzer_on, buzzer_off
+from utils.config import get_config
+from utils.gantry import Gantry
+from utils.gpio_backend import backend_name
+from utils.gpio_shadow import GPIO
+from utils.led_control import green_on, red_on, all_leds_off
+from utils.step_scheduler import run_steps
+from utils.stepper_driver import StepperDriver, DEFAULT_DRIVE_MODE
+
+# 主线程打印进度的间隔 (s)
+PROGRESS_INTERVAL_S = 10
+
+# 互锁等待时检查急停的间隔 (s)
+INTERLOCK_POLL_S = 0.1
+
+STATE_TEXT = {"idle": "空闲", "travel": "移动", "waiting": "互锁等待", "ready": "就位",
+              "vibrating": "振捣", "settle": "停顿", "done": "完成"}
+
+# 主板上 BCM 编号的上限，更大的编号为扩展GPIO的占位编号
+MAX_BCM_PIN = 27
+
+# 已创建的振捣头（重复执行时使用同一组对象，保留各龙门的位置）
+_heads = []
+
+
+def pause(seconds, stop):
+    """
+    等待指定时间，急停时立即返回。
+    :return: bool, 是否等待完成（急停时为 False）
+    """
+    if seconds > 0:
+        return not stop.wait(seconds)
+    return not stop.is_set()
+
+
+class VibratorHead:
+    """
+    振捣头：一组振捣电机管脚和（启用龙门时）各自的龙门。
+    :param index: 振捣头编号（从0开始）
+    :param driver: StepperDriver
+    :param gantry: Gantry，None 表示未启用龙门（按时序方案的 move_s 等待）
+    :param home_m: 上电时的停放坐标 (m)
+    """
+
+    def __init__(self, index, driver, gantry=None, home_m=None):
+        self.index = index
+        self.name = f"H{index + 1}"
+        self.driver = driver
+        self.gantry = gantry
+        self.home_m = tuple(home_m) if home_m is not None else (0.0, 0.0)
+        self.position = self.home_m     # 未启用龙门时记录最后到达的点位
+
+    @property
+    def pins(self):
+        """振捣电机和龙门的全部管脚"""
+        return list(self.driver.pins) + (self.gantry.pins if self.gantry is not None else [])
+
+    def setup(self):
+        self.driver.setup()
+        if self.gantry is not None:
+            self.gantry.setup()
+
+    def home(self):
+        """将当前位置设为停放坐标（不移动）"""
+        self.position = self.home_m
+        if self.gantry is not None:
+            self.gantry.home(self.home_m)
+
+    def coordinates(self):
+        """当前位置 (m)"""
+        if self.gantry is not None:
+            return tuple(float(v) for v in self.gantry.coordinates()[:2])
+        return self.position
+
+    def travel_times_s(self, xy, move_s):
+        """从当前位置依次移动到各点位的时间 (s)"""
+        if self.gantry is None:
+            return np.full(len(xy), float(move_s))
+        return self.gantry.travel_times_s(xy)
+
+    def travel(self, target, move_s, stop):
+        """
+        移动到目标点位。
+        :return: bool, 是否到达（急停时为 False）
+        """
+        if self.gantry is None:
+            arrived = pause(move_s, stop)
+        else:
+            arrived = not self.gantry.move_to(target, stop=stop)["stopped"]
+        if arrived:
+            self.position = target
+        return arrived
+
+    def release(self):
+        self.driver.release()
+        if self.gantry is not None:
+            self.gantry.release()
+
+
+def check_pins(head):
+    """
+    检查振捣头的管脚：mock 以外的后端下，超出 BCM 0-27 的占位编号须在 gpiod.line_offsets 中映射到实际的 line。
+    :raises ValueError: 存在未映射的占位编号
+    """
+    name = backend_name()
+    if name == "mock":
+        return
+    offsets = get_config()["gpiod"].get("line_offsets", {}) if name == "gpiod" else {}
+    unmapped = [pin for pin in head.pins if not 0 <= pin <= MAX_BCM_PIN and pin not in offsets]
+    if unmapped:
+        raise ValueError(f"振捣头 {head.name} 的管脚 {unmapped} 为配置中的占位编号，"
+                         f"请在 gpiod.line_offsets 中映射到扩展GPIO或改为实际管脚")
+
+
+def get_heads(count=None):
+    """
+    前 count 个振捣头：第1个为 device_control 中的主振捣头，其余按配置 vibrator_heads 创建。
+    :param count: 振捣头数，None 时使用配置中的 count
+    :return: VibratorHead 列表
+    """
+    config = get_config()
+    specs = config["vibrator_heads"]["heads"]
+    count = int(count or config["vibrator_heads"].get("count", 1))
+    if not 1 <= count <= len(specs):
+        raise ValueError(f"振捣头数 {count} 超出配置范围（配置了 {len(specs)} 个振捣头）")
+    if not _heads:
+        _heads.append(VibratorHead(0, device_control.glodon_driver, device_control.glodon_gantry,
+                                   specs[0].get("home_m")))
+    gantry_config = config["gantry"]
+    for index in range(len(_heads), count):
+        spec = specs[index]
+        gantry = None
+        if device_control.glodon_gantry is not None:
+            gantry = Gantry(GPIO, spec["gantry_axes"], gantry_config["max_rate_hz"],
+                            gantry_config["accel_hz_per_s"],
+                            gantry_config.get("drive_mode", DEFAULT_DRIVE_MODE), gantry_config.get("hold", False))
+        head = VibratorHead(index, StepperDriver(GPIO, spec["motor_pins"], device_control.glodon_driveMode),
+                            gantry, spec.get("home_m"))
+        check_pins(head)
+        head.home()
+        _heads.append(head)
+    return _heads[:count]
+
+
+class ZoneBoard:
+    """
+    各振捣头共享的进度和状态，方法可在任意线程中调用。
+    :param heads: VibratorHead 列表
+    :param min_separation_m: 振捣头之间的最小间距 (m)
+    :param interlock: 是否启用移动互锁
+    :param signals: 是否按各头状态切换指示灯和蜂鸣器
+    """
+
+    def __init__(self, heads, min_separation_m=0.0, interlock=True, signals=True):
+        self.min_separation_m = float(min_separation_m)
+        self.interlock = interlock
+        self.signals = signals
+        self._cond = threading.Condition()
+        self._signal = None
+        self.status = [{"head": head.name, "state": "idle", "zone_points": 0, "completed": 0,
+                        "current_point": None, "position": head.coordinates(), "target": None,
+                        "request": None, "waits": 0, "wait_s": 0.0} for head in heads]
+
+    def start(self, index, zone_points):
+        with self._cond:
+            self.status[index].update(zone_points=zone_points, completed=0)
+
+    def _near(self, target, other):
+        return other is not None and np.hypot(target[0] - other[0], target[1] - other[1]) < self.min_separation_m
+
+    def _blocking_head(self, index, target):
+        """
+        挡住目标点的振捣头编号：当前位置或已放行的目标点与目标点的距离小于最小间距，
+        或编号更小的头等待中的目标点与之冲突；没有时为 None
+        """
+        for other, status in enumerate(self.status):
+            if other == index:
+                continue
+            if (self._near(target, status["position"]) or self._near(target, status["target"])
+                    or (other < index and self._near(target, status["request"]))):
+                return other
+        return None
+
+    def _deadlock(self, index, target):
+        """
+        沿等待关系查找不会结束的等待：挡住目标点的头已完成，或等待关系回到自身。
+        :return: 等待链上的振捣头名称列表，没有死锁时为 None
+        """
+        chain = [index]
+        blocker = self._blocking_head(index, target)
+        while blocker is not None:
+            status = self.status[blocker]
+            if blocker in chain or status["state"] == "done":
+                return [self.status[k]["head"] for k in chain + [blocker]]
+            if status["request"] is None:
+                return None
+            chain.append(blocker)
+            blocker = self._blocking_head(blocker, status["request"])
+        return None
+
+    def reserve(self, index, target, point_id, stop):
+        """
+        登记下一个目标点；启用互锁时先等待挡住目标点的振捣头离开。
+        :return: bool, 是否可以移动（急停时为 False）
+        :raises RuntimeError: 等待不会结束（互相等待或被已完成的头挡住）
+        """
+        with self._cond:
+            status = self.status[index]
+            status["current_point"] = point_id
+            if self.interlock and self.min_separation_m > 0 and self._blocking_head(index, target) is not None:
+                status["waits"] += 1
+                status["request"] = target
+                self._set_state(index, "waiting")
+                start = time.monotonic()
+                try:
+                    while self._blocking_head(index, target) is not None and not stop.is_set():
+                        chain = self._deadlock(index, target)
+                        if chain is not None:
+                            raise RuntimeError(f"互锁等待不会结束: {' -> '.join(chain)}")
+                        self._cond.wait(INTERLOCK_POLL_S)
+                finally:
+                    status["request"] = None
+                    status["wait_s"] += time.monotonic() - start
+                    self._cond.notify_all()
+            status["target"] = target
+            return not stop.is_set()
+
+    def arrive(self, index, position):
+        with self._cond:
+            self.status[index].update(position=position, target=None)
+            self._cond.notify_all()
+
+    def complete(self, index):
+        with self._cond:
+            self.status[index]["completed"] += 1
+
+    def set_state(self, index, state):
+        with self._cond:
+            self._set_state(index, state)
+            if state == "done":
+                self._cond.notify_all()
+
+    def _set_state(self, index, state):
+        self.status[index]["state"] = state
+        if self.signals:
+            self._update_signals()
+
+    def _update_signals(self):
+        """任一头振捣时红灯+蜂鸣器，有头在移动/就位时绿灯，否则全部关闭"""
+        states = {status["state"] for status in self.status}
+        if "vibrating" in states:
+            signal = "red_buzzer"
+        elif states & {"travel", "waiting", "ready"}:
+            signal = "green"
+        else:
+            signal = "off"
+        if signal == self._signal or (signal != "off" and glodon_estop.is_set()):
+            return
+        self._signal = signal
+        if signal == "red_buzzer":
+            red_on()
+            buzzer_on()
+        elif signal == "green":
+            buzzer_off()
+            green_on()
+        else:
+            all_leds_off()
+            buzzer_off()
+
+    def snapshot(self):
+        """各振捣头状态的副本"""
+        with self._cond:
+            return [dict(status) for status in self.status]
+
+
+def point_settings(point, idx, defaults):
+    """点位的 (id, x, y, 频率, 振捣时间)"""
+    return (int(point_get(point, "id", idx + 1)), float(point_get(point, "x", 0)), float(point_get(point, "y", 0)),
+            point_get(point, "freq_hz", defaults["freq_hz"]), point_get(point, "time_s", defaults["time_s"]))
+
+
+def run_zone(head, zone, points, profile, board, stop, on_complete, defaults):
+    """
+    在一个振捣头上按顺序执行分区内的点位（在该头的工作线程中调用），时序与单头执行相同。
+    :param head: VibratorHead
+    :param zone: 点位序号数组（执行顺序）
+    :param points: 点位序列
+    :param profile: 时序方案参数
+    :param board: ZoneBoard
+    :param stop: 停止事件（急停）
+    :param on_complete: 点位完成回调 (序号, 点位id, 振捣用时)
+    :param defaults: dict, 点位缺省的 freq_hz/time_s
+    :return: dict, completed/stopped/elapsed_s/dwell（各次停留的 (到达s, 离开s, x, y) 数组）
+    """
+    pipelined = profile.get("pipelined", False)
+    index = head.index
+    phases = {direction: head.driver.step_function(direction) for direction in ('c', 'a')}
+    start = time.monotonic()
+    dwell = []
+    completed = 0
+    board.start(index, len(zone))
+    for k, idx in enumerate(zone):
+        point_id, x, y, freq_hz, time_s = point_settings(points[idx], idx, defaults)
+        target = (x, y)
+        if not board.reserve(index, target, point_id, stop):
+            break
+        board.set_state(index, "travel")
+        move_start = time.monotonic()
+        if dwell:
+            dwell[-1][1] = move_start - start
+        if not head.travel(target, profile["move_s"], stop):
+            break
+        board.arrive(index, target)
+        dwell.append([time.monotonic() - start, None, x, y])
+        # 流水线方式：上一点位结束后的准备提示与本次移动重叠
+        if pipelined and k > 0 and not pause(profile["next_ready_s"] - (time.monotonic() - move_start), stop):
+            break
+        board.set_state(index, "ready")
+        if not pause(profile["ready_s"] + glodon_signalSwitchDelay, stop):
+            break
+
+        _, intervals, slots = vibration_plan(freq_hz, time_s)
+        board.set_state(index, "vibrating")
+        vibrate_start = time.monotonic()
+        stats = run_steps(phases['c' if k % 2 == 0 else 'a'], slots, intervals, stop=stop)
+        duration = time.monotonic() - vibrate_start
+        board.set_state(index, "settle")
+        if stats["stopped"]:
+            head.driver.release(force=True)  # 急停后再次强制置低
+            break
+        on_complete(idx, point_id, duration)
+        board.complete(index)
+        completed += 1
+        if not pause(profile["settle_s"], stop):
+            break
+
+        if k < len(zone) - 1:
+            if not pipelined:
+                board.set_state(index, "ready")
+                if not pause(profile["next_ready_s"], stop):
+                    break
+                board.set_state(index, "idle")
+                if not pause(profile["gap_s"], stop):
+                    break
+        else:
+            board.set_state(index, "ready")
+            pause(profile["finish_s"], stop)
+    elapsed = time.monotonic() - start
+    if dwell and dwell[-1][1] is None:
+        dwell[-1][1] = elapsed
+    board.set_state(index, "done")
+    return {"head": head.name, "completed": completed, "stopped": stop.is_set(), "elapsed_s": elapsed,
+            "dwell": np.array(dwell, dtype=float).reshape(-1, 4)}
+
+
+def plan_zones(points, heads, profile, min_separation_m=0.0, indices=None):
+    """
+    规划各振捣头的分区及用时。
+    点位权重为振捣时间、固定开销和（按分区推进顺序估算的）移动时间之和。
+    :param points: 点位序列（须带坐标）
+    :param heads: VibratorHead 列表（移动时间从各头当前位置算起）
+    :param profile: 时序方案参数
+    :param min_separation_m: 振捣头之间的最小间距 (m)
+    :param indices: 待执行的点位序号，None 表示全部
+    :return: dict, zones（各头的点位序号数组）/summary/predicted_s（各头预测用时）/
+             single_order（单头执行时的点位顺序，与各分区相同的推进顺序）/single_s（单头按该顺序执行的预测用时）；
+             单头与多头使用相同的推进顺序，缩短的时间只来自增加的振捣头，不包括路线变化
+    """
+    x, y, time_s = (np.asarray(column, dtype=float) for column in point_columns(points, "x", "y", "time_s"))
+    indices = np.arange(len(x)) if indices is None else np.asarray(indices, dtype=np.int64)
+    x, y, time_s = x[indices], y[indices], time_s[indices]
+    xy = np.column_stack((x, y))
+    move_s = profile["move_s"]
+
+    order = sweep_order(x, y)
+    moves = np.empty(len(x))
+    moves[order] = heads[0].travel_times_s(xy[order], move_s)
+    weights = time_s + moves + profile["ready_s"] + glodon_signalSwitchDelay + profile["settle_s"]
+    if profile.get("pipelined"):
+        weights += np.maximum(0.0, profile["next_ready_s"] - moves)
+    else:
+        weights += profile["next_ready_s"] + profile["gap_s"]
+
+    local_zones = partition_zones(x, y, weights, len(heads), min_separation_m)
+    predicted = [predict_runtime_s(time_s[zone], profile, head.travel_times_s(xy[zone], move_s))
+                 for head, zone in zip(heads, local_zones)]
+    return {
+        "zones": [indices[zone] for zone in local_zones],
+        "summary": zone_summary(local_zones, x, y, weights),
+        "predicted_s": predicted,
+        "single_order": indices[order],
+        "single_s": predict_runtime_s(time_s[order], profile, moves[order])
+    }
+
+
+def print_zone_plan(plan, heads):
+    """打印分区规划和预测用时"""
+    print(f"\n[分区规划] {len(heads)} 个振捣头")
+    for head, info, predicted in zip(heads, plan["summary"], plan["predicted_s"]):
+        print(f"  - {head.name}: {info['points']} 个点位, 主轴 {info['start_m']:.2f} ~ {info['end_m']:.2f} m, "
+              f"预计 {predicted / 3600:.2f} 小时")
+    makespan = max(plan["predicted_s"])
+    print(f"  预计总时间 {makespan / 3600:.2f} 小时，单头执行 {plan['single_s'] / 3600:.2f} 小时，"
+          f"缩短 {(1 - makespan / plan['single_s']) * 100:.1f}%")
+
+
+def print_progress(board, total):
+    """打印各振捣头的进度"""
+    heads = board.snapshot()
+    done = sum(status["completed"] for status in heads)
+    parts = [f"{s['head']} {STATE_TEXT.get(s['state'], s['state'])} P{s['current_point']} "
+             f"({s['completed']}/{s['zone_points']})" for s in heads]
+    print(f"[进度] {done}/{total} | " + " | ".join(parts))
+
+
+def execute_zones(strategy, heads=None, profile_name=None, journal_path=None, resume=True):
+    """
+    多振捣头并行执行振捣策略。
+    每完成一个点位向断点日志（多振捣头专用）追加一条记录，中断后再次执行时只对未完成的点位重新分区。
+    :param strategy: 振捣策略（点位须带坐标）
+    :param heads: 振捣头数，None 时使用配置中的 vibrator_heads.count
+    :param profile_name: 时序方案名称，None 时使用配置中的 timing_profile
+    :param journal_path: 断点日志路径，None 时按策略指纹和振捣头数放在 output 目录下
+    :param resume: 是否从上次中断处继续
+    :return: list, 各振捣头 run_zone 的结果
+    """
+    profile_name, profile = load_timing_profile(profile_name)
+    if stop_requested():
+        print("\n[急停] 急停未复位，请先调用 reset_emergency_stop()")
+        return []
+    points = as_point_sequence(strategy_points(strategy))
+    if not len(points) or not is_point_record(points[0]):
+        print("错误：多振捣头执行需要带坐标的点位")
+        return []
+    head_list = get_heads(heads)
+    min_separation_m = get_config()["vibrator_heads"].get("min_separation_m", 0.0)
+
+    print("\n=== 初始化振捣电机 ===")
+    control_devices("off")
+    glodon_setup()
+    for head in head_list:
+        head.setup()
+        glodon_estop.add_motor_pins(head.pins)
+        if GPIO.tracer is not None:
+            motors = {f"{head.name}_vibrator": head.driver.pins}
+            if head.gantry is not None:
+                motors.update({f"{head.name}_gantry_{name}": pins for name, pins in head.gantry.axis_pins().items()})
+            GPIO.tracer.add_motors(motors)
+
+    params = strategy.get("vibration_params", {})
+    defaults = {"freq_hz": params.get("base_freq_hz", 180), "time_s": params.get("base_time_s", 10)}
+    total = len(points)
+    vibration_status["total_points"] = total
+
+    # 断点续做：多振捣头的记录不按点位顺序，读取全部已完成的点位
+    journal = open_journal(strategy, points, journal_path, resume, heads=len(head_list))
+    done = np.array([record["index"] for record in journal.records()], dtype=np.int64)
+    remaining = np.setdiff1d(np.arange(total), done)
+    print(f"\n=== 开始多头振捣 (总点位数: {total}, 振捣头: {len(head_list)}, 时序方案: {profile_name}) ===")
+    if done.size:
+        print(f"[断点续做] 已完成 {done.size}/{total} 个点位，剩余点位重新分区")
+    if not remaining.size:
+        journal.finish()
+        return []
+    plan = plan_zones(points, head_list, profile, min_separation_m, remaining)
+    print_zone_plan(plan, head_list)
+
+    board = ZoneBoard(head_list, min_separation_m)
+    vibration_status["heads"] = board.status
+    journal_lock = threading.Lock()
+    results = [None] * len(head_list)
+
+    def on_complete(idx, point_id, duration):
+        with journal_lock:
+            journal.append(int(idx), point_id, duration)
+
+    def worker(head, zone):
+        try:
+            results[head.index] = run_zone(head, zone, points, profile, board, glodon_estop.event,
+                                           on_complete, defaults)
+        except Exception as e:
+            # 任一振捣头出错时全部停止
+            traceback.print_exc()
+            emergency_stop(f"{head.name} 出错: {e}")
+
+    threads = [threading.Thread(target=worker, args=(head, zone), name=f"vibrator-{head.name}", daemon=True)
+               for head, zone in zip(head_list, plan["zones"])]
+    start_time = time.monotonic()
+    completed = False
+    try:
+        for thread in threads:
+            thread.start()
+        try:
+            while any(thread.is_alive() for thread in threads):
+                if glodon_estop.wait(PROGRESS_INTERVAL_S):
+                    break
+                stop_requested()
+                print_progress(board, total)
+        except KeyboardInterrupt:
+            emergency_stop("用户中断")
+        for thread in threads:
+            thread.join()
+        completed = all(result is not None and result["completed"] == len(zone)
+                        for result, zone in zip(results, plan["zones"]))
+    finally:
+        if glodon_estop.is_set():
+            glodon_estop.make_safe()
+            print(f"\n[急停] 振捣已停止（{glodon_estop.reason}），复位后对未完成的点位重新分区继续")
+        if completed:
+            journal.finish()
+        else:
+            journal.close()
+        for head in head_list[1:]:
+            head.release()
+        destroy()
+
+    elapsed = time.monotonic() - start_time
+    print_progress(board, total)
+    state = "完成" if completed else "中断"
+    print(f"=== 多头振捣{state} (用时 {elapsed:.1f} 秒, 预测 {max(plan['predicted_s']):.1f} 秒, "
+          f"单头预测 {plan['single_s']:.1f} 秒) ===")
+    return results
+
+
+
+if __name__ == "__main__":
+    # 模拟GPIO上两个振捣头的互锁检查：H1 停放在 H2 分区的第一个点位上，H2 须等 H1 离开后才放行；
+    # 执行期间定期检查两个头的位置和已放行的目标点之间始终不小于最小间距
+    # 用法（在 smart_vibrator 目录下）: SMART_VIBRATOR_GPIO=mock python multi_head.py
+    import sys
+
+    if backend_name() != "mock":
+        sys.exit("请使用模拟GPIO运行: SMART_VIBRATOR_GPIO=mock python multi_head.py")
+    separation = 2.0
+    _, profile = load_timing_profile("fast")
+    defaults = {"freq_hz": 180, "time_s": 0.2}
+    points = [{"id": k + 1, "x": float(k // 2), "y": float(k % 2), "time_s": 0.2} for k in range(12)]
+    GPIO.setmode(GPIO.BCM)
+    head_list = [
+        VibratorHead(0, StepperDriver(GPIO, (18, 23, 24, 25))),
+        VibratorHead(1, StepperDriver(GPIO, (4, 22, 26, 27)), home_m=(10.0, 0.0))]
+    plan = plan_zones(points, head_list, profile, separation)
+    head_list[0].home_m = point_settings(points[plan["zones"][1][0]], 0, defaults)[1:3]
+    for head in head_list:
+        head.setup()
+        head.home()
+
+    board = ZoneBoard(head_list, separation, signals=False)
+    stop = threading.Event()
+    violations = []
+    results = [None] * len(head_list)
+
+    def check_separation():
+        while not stop.wait(0.005):
+            spots = [[s[key] for key in ("position", "target") if s[key] is not None] for s in board.snapshot()]
+            violations.extend((a, b) for a in spots[0] for b in spots[1]
+                              if np.hypot(a[0] - b[0], a[1] - b[1]) < separation)
+
+    def worker(head, zone):
+        results[head.index] = run_zone(head, zone, points, profile, board, threading.Event(),
+                                       lambda idx, point_id, duration: None, defaults)
+
+    checker = threading.Thread(target=check_separation, daemon=True)
+    checker.start()
+    threads = [threading.Thread(target=worker, args=(head, zone)) for head, zone in zip(head_list, plan["zones"])]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stop.set()
+    checker.join()
+    for head in head_list:
+        head.release()
+
+    status = board.snapshot()
+    for s in status:
+        print(f"{s['head']}: 完成 {s['completed']}/{s['zone_points']}, 互锁等待 {s['waits']} 次, {s['wait_s']:.2f} 秒")
+    assert all(result["completed"] == len(zone) for result, zone in zip(results, plan["zones"]))
+    assert status[1]["waits"] >= 1, "H2 未等待 H1 离开"
+    assert not violations, f"振捣头间距小于 {separation} m: {violations[:3]}"
+    print(f"互锁检查通过：两个振捣头之间始终不小于 {separation} m")
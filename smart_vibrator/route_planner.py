@@ -0,0 +1,203 @@
+"""
+route_planner.py
+振捣点位路径规划模块
+重新排列 strategy["points"] 的执行顺序，使振捣设备在点位间移动的总路程尽量短：
+先用最近邻法构造初始路径，再用基于近邻候选表的 2-opt 迭代改进（距离计算均为NumPy向量化）。
+"""
+import sys
+import time
+
+import numpy as np
+
+from strategy_store import PointView, export_json, load_strategy, point_columns, strategy_points
+
+# 2-opt 每个点位考察的近邻候选数
+NEIGHBOR_COUNT = 8
+
+# 计算近邻候选表时每批处理的点位数，限制距离矩阵的内存占用
+KNN_CHUNK = 512
+
+# 2-opt 的默认时间上限 (s)
+DEFAULT_TIME_LIMIT_S = 3.0
+
+
+def path_length(x, y, order):
+    """按给定顺序依次访问点位的总路程 (m)（开放路径，不返回起点）"""
+    if len(order) < 2:
+        return 0.0
+    return float(np.hypot(np.diff(x[order]), np.diff(y[order])).sum())
+
+
+def nearest_neighbor_order(x, y, start=0):
+    """
+    最近邻法构造初始访问顺序。
+    :param x: 点位x坐标数组 (m)
+    :param y: 点位y坐标数组 (m)
+    :param start: 起始点位下标
+    :return: 点位下标数组
+    """
+    n = len(x)
+    order = np.empty(n, dtype=np.int64)
+    visited = np.zeros(n, dtype=bool)
+    current = start
+    for k in range(n):
+        order[k] = current
+        visited[current] = True
+        if k == n - 1:
+            break
+        dist = (x - x[current]) ** 2 + (y - y[current]) ** 2
+        dist[visited] = np.inf
+        current = int(np.argmin(dist))
+    return order
+
+
+def neighbor_lists(x, y, k=NEIGHBOR_COUNT):
+    """
+    每个点位最近的 k 个其他点位（分批计算距离矩阵）。
+    :return: 形状为 (n, k) 的下标数组
+    """
+    n = len(x)
+    k = min(k, n - 1)
+    result = np.empty((n, k), dtype=np.int64)
+    for start in range(0, n, KNN_CHUNK):
+        stop = min(n, start + KNN_CHUNK)
+        dist = (x[start:stop, None] - x[None, :]) ** 2 + (y[start:stop, None] - y[None, :]) ** 2
+        dist[np.arange(stop - start), np.arange(start, stop)] = np.inf
+        nearest = np.argpartition(dist, k - 1, axis=1)[:, :k]
+        rows = np.arange(stop - start)[:, None]
+        result[start:stop] = nearest[rows, np.argsort(dist[rows, nearest], axis=1)]
+    return result
+
+
+def two_opt(x, y, order, neighbors, time_limit=DEFAULT_TIME_LIMIT_S):
+    """
+    基于近邻候选表的 2-opt 改进（开放路径，起点固定）。
+    每一轮先向量化计算所有 (边, 近邻) 组合的路程变化量，再按改进量从大到小逐个复核并执行翻转。
+    :param order: 初始访问顺序（下标数组）
+    :param neighbors: neighbor_lists 的结果
+    :param time_limit: 时间上限 (s)
+    :return: tuple (改进后的访问顺序, 执行的翻转次数)
+    """
+    tour = order.copy()
+    n = len(tour)
+    if n < 4:
+        return tour, 0
+    pos = np.empty(n, dtype=np.int64)
+    pos[tour] = np.arange(n)
+    deadline = time.perf_counter() + time_limit
+    moves = 0
+
+    def dist(p, q):
+        return np.hypot(x[p] - x[q], y[p] - y[q])
+
+    while time.perf_counter() < deadline:
+        # 边 (a, b) = (tour[i], tour[i+1])，候选点 c 为 a 的近邻，c 的后继为 d
+        i = np.arange(n - 1)
+        a = tour[i]
+        b = tour[i + 1]
+        c = neighbors[a]
+        j = pos[c]
+        valid = j > i[:, None] + 1
+        has_next = j < n - 1
+        d = tour[np.minimum(j + 1, n - 1)]
+        delta = dist(a[:, None], c) - dist(a, b)[:, None]
+        delta += np.where(has_next, dist(b[:, None], d) - dist(c, d), 0.0)
+        improving = valid & (delta < -1e-9)
+        if not improving.any():
+            break
+
+        rows, cols = np.nonzero(improving)
+        candidates = sorted(zip(delta[rows, cols].tolist(), a[rows].tolist(), c[rows, cols].tolist()))
+        applied = 0
+        for _, pa, pc in candidates:
+            # 之前的翻转可能已改变路径，需按当前路径复核
+            pi, pj = pos[pa], pos[pc]
+            if pj <= pi + 1:
+                continue
+            pb = tour[pi + 1]
+            gain = dist(pa, pc) - dist(pa, pb)
+            if pj < n - 1:
+                pd = tour[pj + 1]
+                gain += dist(pb, pd) - dist(pc, pd)
+            if gain >= -1e-9:
+                continue
+            tour[pi + 1:pj + 1] = tour[pi + 1:pj + 1][::-1].copy()
+            pos[tour[pi + 1:pj + 1]] = np.arange(pi + 1, pj + 1)
+            applied += 1
+            if time.perf_counter() >= deadline:
+                break
+        moves += applied
+        if applied == 0:
+            break
+    return tour, moves
+
+
+def plan_route(x, y, start=0, time_limit=DEFAULT_TIME_LIMIT_S):
+    """
+    规划点位访问顺序：最近邻构造 + 2-opt 改进。
+    :param x: 点位x坐标数组 (m)
+    :param y: 点位y坐标数组 (m)
+    :param start: 起始点位下标
+    :param time_limit: 2-opt 的时间上限 (s)
+    :return: tuple (访问顺序下标数组, 2-opt翻转次数)
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if len(x) < 3:
+        return np.arange(len(x)), 0
+    order = nearest_neighbor_order(x, y, start)
+    return two_opt(x, y, order, neighbor_lists(x, y), time_limit)
+
+
+def optimize_route(strategy, time_limit=DEFAULT_TIME_LIMIT_S, verbose=True):
+    """
+    按优化后的访问顺序重新排列策略中的点位，并把顺序和预测移动路程写入 strategy["route"]。
+    点位保留原有 id，起点为当前顺序中的第一个点位。
+    :param strategy: dict, 振捣策略（points、point_arrays 或列式存储的点位视图），原地修改
+    :param time_limit: 2-opt 的时间上限 (s)
+    :param verbose: 是否打印优化结果
+    :return: dict, 路径信息 strategy["route"]
+    """
+    start_time = time.perf_counter()
+    points = strategy_points(strategy)
+    x, y, ids = point_columns(points, "x", "y", "id")
+    x = x.astype(float)
+    y = y.astype(float)
+
+    baseline = path_length(x, y, np.arange(len(x)))
+    order, moves = plan_route(x, y, time_limit=time_limit)
+    travel = path_length(x, y, order)
+
+    if isinstance(points, dict):
+        strategy["point_arrays"] = {key: np.asarray(value)[order] for key, value in points.items()}
+    elif isinstance(points, PointView):
+        strategy["points"] = PointView(np.asarray(points.records)[order])
+    else:
+        strategy["points"] = [points[k] for k in order.tolist()]
+
+    route = {
+        "method": "nearest_neighbor+2opt",
+        "order": ids[order].tolist(),
+        "travel_length_m": round(travel, 3),
+        "baseline_travel_length_m": round(baseline, 3),
+        "two_opt_moves": moves
+    }
+    strategy["route"] = route
+
+    if verbose:
+        saved = (1 - travel / baseline) * 100 if baseline > 0 else 0.0
+        print(f"\n路径优化: {len(order)} 个点位, 移动路程 {baseline:.1f} m -> {travel:.1f} m "
+              f"(减少 {saved:.1f}%), 用时 {time.perf_counter() - start_time:.2f} 秒")
+    return route
+
+
+if __name__ == "__main__":
+    # 用法: python route_planner.py [策略文件] [输出文件]
+    strategy_file = sys.argv[1] if len(sys.argv) > 1 else "output/vibration_strategy.json"
+    strategy = load_strategy(strategy_file)
+
+    optimize_route(strategy)
+
+    if len(sys.argv) > 2:
+        export_json(strategy, sys.argv[2])
+        print(f"优化后的策略已保存至: {sys.argv[2]}")
@@ -0,0 +1,428 @@
+"""
+simulator.py
+振捣执行虚拟时钟模拟器
+以虚拟时钟替换 device_control 中的 time/sleep，GPIO 使用内存模拟后端（utils/mock_gpio.py）并记录每次写入，
+整份策略（数千个点位、十几个小时的实际执行时间）可在数秒内跑完，用于执行流程的快速回归和性能分析。
+步进脉冲不逐步模拟：虚拟时钟直接前进整段运行时间，只写入最后一相，步数按调度计划统计（虚拟时钟下没有延迟和抖动）。
+启用龙门时龙门各轴的移动同样按规划时间推进虚拟时钟，单独统计移动节拍数。
+结束后给出时序报告：每个点位的模拟用时、振捣时间、步数、龙门移动节拍数和信号（LED/蜂鸣器）切换次数。
+多振捣头时各头的分区分别在各自的虚拟时钟上执行（不启用互锁），总时间取最长的分区，与单头按相同推进顺序执行比较，
+并按各头的停留记录检查同一时刻振捣头之间的最小距离。
+
+用法（在 smart_vibrator 目录下）: python simulator.py [策略文件] [时序方案] [振捣头数]
+"""
+import contextlib
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from utils.gpio_backend import GPIO_BACKEND_ENV
+
+# 未指定GPIO后端时使用内存模拟后端（须在导入 device_control 之前设置）
+os.environ.setdefault(GPIO_BACKEND_ENV, "mock")
+
+import device_control
+import execution_journal
+import multi_head
+from execution_journal import read_journal
+from strategy_store import PointView, as_point_sequence, load_strategy, point_columns, points_to_records, strategy_points
+from utils import gantry, mock_gpio
+from utils.buzzer_control import setup_buzzer, glodon_Buzzer
+from utils.led_control import setup_led, pin_R, pin_G
+
+# 计入信号切换的管脚（红灯/蜂鸣器、绿灯）
+SIGNAL_PINS = (pin_R, pin_G, glodon_Buzzer)
+
+# 时序报告中每个点位的记录
+REPORT_DTYPE = np.dtype([
+    ("index", "i4"),
+    ("id", "i4"),
+    ("cycle_s", "f8"),        # 上一点位完成到本点位完成的模拟用时
+    ("vibrate_s", "f8"),      # 振捣时间
+    ("steps", "i8"),          # 步进电机步数
+    ("travel_steps", "i8"),   # 龙门移动节拍数
+    ("transitions", "i4")     # 信号管脚电平切换次数
+])
+
+DEFAULT_STRATEGY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "output", "vibration_strategy.json")
+
+
+class VirtualClock:
+    """
+    虚拟时钟，提供与 time 模块相同的常用函数；sleep 只推进虚拟时间，不实际等待。
+    其余属性透传给 time 模块。
+    :param epoch: 虚拟时间零点对应的 unix 时间，默认为当前时间
+    """
+
+    def __init__(self, epoch=None):
+        self.epoch = time.time() if epoch is None else epoch
+        self.now_ns = 0
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+    def sleep(self, seconds):
+        if seconds < 0:
+            raise ValueError("sleep length must be non-negative")
+        self.now_ns += int(round(seconds * 1e9))
+
+    def advance_ns(self, ns):
+        self.now_ns += int(ns)
+
+    def monotonic_ns(self):
+        return self.now_ns
+
+    def monotonic(self):
+        return self.now_ns / 1e9
+
+    def perf_counter(self):
+        return self.now_ns / 1e9
+
+    def time(self):
+        return self.epoch + self.now_ns / 1e9
+
+    def localtime(self, secs=None):
+        return time.localtime(self.time() if secs is None else secs)
+
+    def strftime(self, fmt, t=None):
+        return time.strftime(fmt, self.localtime() if t is None else t)
+
+
+def virtual_run_steps(clock, step_log):
+    """
+    生成替换 step_scheduler.run_steps 的函数：按计划推进虚拟时钟，只写入最后一相。
+    :param clock: VirtualClock
+    :param step_log: 列表，每次调用追加 (开始时刻ns, 步数)
+    """
+    def run_steps(step, slots, interval_ns, *args, stop=None, **kwargs):
+        if stop is not None and stop.is_set():
+            return {"steps": 0, "skipped": 0, "late_steps": 0, "max_late_ns": 0, "elapsed_ns": 0,
+                    "target_rate_hz": 0.0, "achieved_rate_hz": 0.0, "stopped": True}
+        if hasattr(interval_ns, "__len__"):
+            slots = min(int(slots), len(interval_ns))
+            planned_ns = int(np.sum(interval_ns[:slots]))
+        else:
+            planned_ns = int(interval_ns) * slots
+        step_log.append((clock.now_ns, slots))
+        if slots > 0:
+            # 电机管脚的最后一相照常写入，但不计入信号切换记录
+            trace, mock_gpio.trace = mock_gpio.trace, None
+            try:
+                step(slots - 1)
+            finally:
+                mock_gpio.trace = trace
+        clock.advance_ns(planned_ns)
+        rate = slots * 1e9 / planned_ns if planned_ns > 0 else 0.0
+        return {"steps": slots, "skipped": 0, "late_steps": 0, "max_late_ns": 0, "elapsed_ns": planned_ns,
+                "target_rate_hz": rate, "achieved_rate_hz": rate, "stopped": False}
+    return run_steps
+
+
+def virtual_pause(clock):
+    """生成替换 device_control.pause 的函数：推进虚拟时钟，急停时返回 False"""
+    def pause(seconds):
+        clock.sleep(max(0.0, seconds))
+        return not device_control.glodon_estop.is_set()
+    return pause
+
+
+def _no_jitter(timestamps_ns, interval_ns):
+    return {"p50_us": 0.0, "p99_us": 0.0, "max_us": 0.0}
+
+
+@contextlib.contextmanager
+def _patched(patches):
+    """在上下文内替换 (对象, 属性名, 新值) 列表中的各属性，退出时恢复"""
+    saved = [(owner, name, getattr(owner, name)) for owner, name, _ in patches]
+    for owner, name, value in patches:
+        setattr(owner, name, value)
+    try:
+        yield
+    finally:
+        for owner, name, value in saved:
+            setattr(owner, name, value)
+
+
+@contextlib.contextmanager
+def virtual_hardware(clock, step_log, trace, travel_log=None):
+    """
+    在上下文内以虚拟时钟和模拟GPIO运行 device_control。
+    :param clock: VirtualClock
+    :param step_log: 步进调用记录列表
+    :param trace: GPIO 写入记录列表
+    :param travel_log: 龙门移动调用记录列表，None 时不单独记录
+    """
+    if device_control.GPIO.backend is not mock_gpio:
+        raise RuntimeError(f"模拟器需要内存模拟GPIO后端，请设置环境变量 {GPIO_BACKEND_ENV}=mock")
+    patches = [
+        (device_control, "time", clock),
+        (device_control, "sleep", clock.sleep),
+        (device_control, "run_steps", virtual_run_steps(clock, step_log)),
+        (device_control, "pause", virtual_pause(clock)),
+        (device_control, "jitter_stats", _no_jitter),
+        (device_control, "glodon_worker", None),
+        (device_control, "start_motor_worker", lambda cpu=None: None),
+        (gantry, "run_steps", virtual_run_steps(clock, step_log if travel_log is None else travel_log)),
+        (execution_journal, "time", clock),
+        (mock_gpio, "clock", clock.monotonic_ns),
+        (mock_gpio, "trace", trace),
+    ]
+    with _patched(patches):
+        yield clock
+
+
+def virtual_zone_pause(clock):
+    """生成替换 multi_head.pause 的函数：推进虚拟时钟，急停时返回 False"""
+    def pause(seconds, stop):
+        clock.sleep(max(0.0, seconds))
+        return not stop.is_set()
+    return pause
+
+
+@contextlib.contextmanager
+def virtual_head(clock, step_log, travel_log):
+    """
+    在上下文内以虚拟时钟和模拟GPIO运行一个振捣头的分区（multi_head.run_zone）。
+    :param clock: 该振捣头的 VirtualClock
+    :param step_log: 振捣步进调用记录列表
+    :param travel_log: 龙门移动调用记录列表
+    """
+    if device_control.GPIO.backend is not mock_gpio:
+        raise RuntimeError(f"模拟器需要内存模拟GPIO后端，请设置环境变量 {GPIO_BACKEND_ENV}=mock")
+    with _patched([
+        (multi_head, "time", clock),
+        (multi_head, "pause", virtual_zone_pause(clock)),
+        (multi_head, "run_steps", virtual_run_steps(clock, step_log)),
+        (gantry, "run_steps", virtual_run_steps(clock, travel_log)),
+        (mock_gpio, "clock", clock.monotonic_ns),
+    ]):
+        yield clock
+
+
+def count_transitions(trace, pins=SIGNAL_PINS):
+    """
+    统计信号管脚的电平切换。
+    :param trace: GPIO 写入记录 [(时刻ns, 通道, 电平)]
+    :return: 切换时刻 (ns) 的数组
+    """
+    last = {}
+    times = []
+    for t, channel, level in trace:
+        if channel in pins and last.get(channel, level) != level:
+            times.append(t)
+        last[channel] = level
+    return np.array(times, dtype=np.int64)
+
+
+def simulate_strategy(strategy, profile_name=None, quiet=True):
+    """
+    以虚拟时钟执行整份策略。
+    :param strategy: 振捣策略
+    :param profile_name: 时序方案名称，None 时使用配置中的 timing_profile
+    :param quiet: 是否屏蔽执行过程中的输出
+    :return: dict, 时序报告（见 print_timing_report）
+    """
+    clock = VirtualClock()
+    step_log = []
+    travel_log = []
+    trace = []
+    wall_start = time.perf_counter()
+    with tempfile.TemporaryDirectory() as tmp:
+        journal_path = os.path.join(tmp, "simulation.journal")
+        with virtual_hardware(clock, step_log, trace, travel_log), contextlib.ExitStack() as stack:
+            if quiet:
+                stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, "w"))))
+            mock_gpio.reset()
+            mock_gpio.setmode(mock_gpio.BCM)
+            device_control.GPIO.invalidate()
+            setup_led()
+            setup_buzzer()
+            if device_control.glodon_gantry is not None:
+                device_control.glodon_gantry.home()
+            device_control.execute_strategy(strategy, profile_name, journal_path=journal_path, resume=False)
+        done_path = journal_path + ".done"
+        _, _, records = read_journal(done_path if os.path.exists(done_path) else journal_path)
+    wall_s = time.perf_counter() - wall_start
+
+    # 按点位完成时刻划分步进调用和信号切换
+    report = np.zeros(len(records), dtype=REPORT_DTYPE)
+    if records:
+        index, point_id, vibrate_s, finished = (np.array(column) for column in zip(*records))
+        finished_ns = np.round((finished - clock.epoch) * 1e9).astype(np.int64)
+        report["index"] = index
+        report["id"] = point_id
+        report["vibrate_s"] = vibrate_s
+        report["cycle_s"] = np.diff(finished_ns, prepend=0) / 1e9
+        for column, log in (("steps", step_log), ("travel_steps", travel_log)):
+            if not log:
+                continue
+            starts, steps = (np.array(column, dtype=np.int64) for column in zip(*log))
+            owner = np.searchsorted(finished_ns, starts)
+            keep = owner < len(records)
+            np.add.at(report[column], owner[keep], steps[keep])
+        switches = np.searchsorted(finished_ns, count_transitions(trace))
+        np.add.at(report["transitions"], switches[switches < len(records)], 1)
+
+    profile_name, profile = device_control.load_timing_profile(profile_name)
+    points = as_point_sequence(strategy_points(strategy))
+    time_values = point_columns(points, "time_s")[0].tolist()
+    move_values = None
+    if device_control.glodon_gantry is not None:
+        # 与执行时相同，从原点开始计算各段移动时间
+        device_control.glodon_gantry.home()
+        move_values = device_control.point_travel_times_s(points)
+    simulated_s = clock.now_ns / 1e9
+    return {
+        "profile": profile_name,
+        "total_points": len(records),
+        "simulated_s": simulated_s,
+        "predicted_s": device_control.predict_runtime_s(time_values, profile, move_values),
+        "wall_s": wall_s,
+        "speedup": simulated_s / wall_s if wall_s > 0 else 0.0,
+        "motor_steps": int(report["steps"].sum()),
+        "travel_steps": int(report["travel_steps"].sum()),
+        "signal_transitions": int(report["transitions"].sum()),
+        "gpio_writes": len(trace),
+        "points": report
+    }
+
+
+def min_head_distance(dwells):
+    """
+    同一时刻两个振捣头之间的最小距离。
+    :param dwells: 各振捣头的停留记录数组 (到达s, 离开s, x, y)，按时间排列
+    :return: float, 最小距离 (m)；没有同时停留时为 inf
+    """
+    nearest = np.inf
+    for a in range(len(dwells)):
+        for b in range(a + 1, len(dwells)):
+            first, second = dwells[a], dwells[b]
+            if not len(first) or not len(second):
+                continue
+            # first 的每次停留与 second 中时间重叠的停留 [lo, hi)
+            lo = np.searchsorted(second[:, 1], first[:, 0], side="right")
+            hi = np.searchsorted(second[:, 0], first[:, 1], side="left")
+            for row, start, stop in zip(first, lo, hi):
+                if stop > start:
+                    distance = np.hypot(second[start:stop, 2] - row[2], second[start:stop, 3] - row[3])
+                    nearest = min(nearest, float(distance.min()))
+    return nearest
+
+
+def simulate_zones(strategy, heads=2, profile_name=None, quiet=True):
+    """
+    以虚拟时钟模拟多振捣头执行，并与单头执行比较。
+    :param strategy: 振捣策略（点位须带坐标）
+    :param heads: 振捣头数
+    :param profile_name: 时序方案名称
+    :param quiet: 是否屏蔽执行过程中的输出
+    :return: dict, 多头报告（见 print_zone_report）
+    """
+    profile_name, profile = device_control.load_timing_profile(profile_name)
+    points = as_point_sequence(strategy_points(strategy))
+    params = strategy.get("vibration_params", {})
+    defaults = {"freq_hz": params.get("base_freq_hz", 180), "time_s": params.get("base_time_s", 10)}
+    min_separation_m = device_control.get_config()["vibrator_heads"].get("min_separation_m", 0.0)
+    head_list = multi_head.get_heads(heads)
+    for head in head_list:
+        head.home()
+    plan = multi_head.plan_zones(points, head_list, profile, min_separation_m)
+
+    # 单头基准按与各分区相同的推进顺序执行，比较结果只反映增加的振捣头
+    single_strategy = {key: value for key, value in strategy.items() if key not in ("points", "point_arrays")}
+    single_strategy["points"] = PointView(points_to_records(points)[plan["single_order"]])
+    single = simulate_strategy(single_strategy, profile_name, quiet)
+    wall_start = time.perf_counter()
+    board = multi_head.ZoneBoard(head_list, interlock=False, signals=False)
+    results = []
+    for head, zone, predicted in zip(head_list, plan["zones"], plan["predicted_s"]):
+        clock = VirtualClock()
+        step_log, travel_log = [], []
+        with virtual_head(clock, step_log, travel_log), contextlib.ExitStack() as stack:
+            if quiet:
+                stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, "w"))))
+            mock_gpio.reset()
+            mock_gpio.setmode(mock_gpio.BCM)
+            device_control.GPIO.invalidate()
+            head.setup()
+            result = multi_head.run_zone(head, zone, points, profile, board, threading.Event(),
+                                         lambda *args: None, defaults)
+        result.update(predicted_s=predicted, motor_steps=sum(steps for _, steps in step_log),
+                      travel_steps=sum(steps for _, steps in travel_log))
+        results.append(result)
+    for head in head_list:
+        head.home()
+
+    makespan = max(result["elapsed_s"] for result in results)
+    return {
+        "profile": profile_name,
+        "heads": results,
+        "summary": plan["summary"],
+        "makespan_s": makespan,
+        "predicted_s": max(plan["predicted_s"]),
+        "single_s": single["simulated_s"],
+        "reduction": 1 - makespan / single["simulated_s"] if single["simulated_s"] else 0.0,
+        "min_distance_m": min_head_distance([result["dwell"] for result in results]),
+        "min_separation_m": min_separation_m,
+        "wall_s": time.perf_counter() - wall_start
+    }
+
+
+def print_zone_report(report):
+    """
+    打印多振捣头报告。
+    :param report: simulate_zones 的结果
+    """
+    print(f"\n=== 多振捣头模拟报告 ({len(report['heads'])} 个振捣头, 时序方案: {report['profile']}) ===")
+    for result, info in zip(report["heads"], report["summary"]):
+        print(f"  {result['head']}: {result['completed']} 个点位, 主轴 {info['start_m']:.2f} ~ {info['end_m']:.2f} m, "
+              f"模拟 {result['elapsed_s'] / 3600:.2f} 小时 (预测 {result['predicted_s'] / 3600:.2f}), "
+              f"电机 {result['motor_steps']} 步, 龙门 {result['travel_steps']} 节拍")
+    print(f"  总时间 (makespan): {report['makespan_s'] / 3600:.2f} 小时, 单头执行 {report['single_s'] / 3600:.2f} 小时, "
+          f"缩短 {report['reduction'] * 100:.1f}%")
+    print(f"  振捣头同时停留的最小距离: {report['min_distance_m']:.2f} m (最小间距 {report['min_separation_m']} m)")
+    print(f"  实际运行: {report['wall_s']:.2f} 秒")
+
+
+def print_timing_report(report, show=5):
+    """
+    打印时序报告。
+    :param report: simulate_strategy 的结果
+    :param show: 显示用时最长的点位数
+    """
+    points = report["points"]
+    print(f"\n=== 模拟时序报告 (时序方案: {report['profile']}) ===")
+    print(f"  点位数: {report['total_points']}")
+    print(f"  模拟总时间: {report['simulated_s']:.1f} 秒 ({report['simulated_s'] / 3600:.2f} 小时), "
+          f"预测 {report['predicted_s']:.1f} 秒")
+    print(f"  实际运行: {report['wall_s']:.2f} 秒, 加速 {report['speedup']:,.0f} 倍")
+    print(f"  电机总步数: {report['motor_steps']}, 龙门移动节拍: {report['travel_steps']}, 信号切换: {report['signal_transitions']} 次, "
+          f"GPIO写入: {report['gpio_writes']} 次")
+    if len(points):
+        cycle = points["cycle_s"]
+        print(f"  每点用时: 平均 {cycle.mean():.2f} 秒, 最短 {cycle.min():.2f} 秒, 最长 {cycle.max():.2f} 秒")
+        print(f"  用时最长的 {min(show, len(points))} 个点位:")
+        for row in points[np.argsort(cycle)[::-1][:show]]:
+            print(f"    P{row['id']}: 用时 {row['cycle_s']:.2f} 秒, 振捣 {row['vibrate_s']:.2f} 秒, "
+                  f"{row['steps']} 步, 龙门 {row['travel_steps']} 节拍, 信号切换 {row['transitions']} 次")
+
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_STRATEGY_PATH
+    profile_name = sys.argv[2] if len(sys.argv) > 2 else None
+    heads = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+    strategy = load_strategy(path)
+    if heads > 1:
+        zone_report = simulate_zones(strategy, heads, profile_name)
+        print_zone_report(zone_report)
+        assert abs(zone_report["makespan_s"] - zone_report["predicted_s"]) <= 1e-3 * zone_report["predicted_s"] + 1.0
+        assert zone_report["min_distance_m"] >= zone_report["min_separation_m"]
+    else:
+        report = simulate_strategy(strategy, profile_name)
+        print_timing_report(report)
+        # 虚拟时钟下实际执行时间应与预测一致
+        assert abs(report["simulated_s"] - report["predicted_s"]) <= 1e-3 * report["predicted_s"] + 1.0
@@ -0,0 +1,176 @@
+"""
+strategy_cache.py
+振捣策略磁盘缓存模块
+以策略的有效输入（材料信息、按K值分档后的环境参数、功率、板尺寸、布局方式）计算内容哈希，
+在 output/strategy_cache/ 下以列式格式缓存已生成的策略，命中时直接读取而无需重新计算。
+缓存总大小超过上限时按最近使用时间(LRU)淘汰；缓存键包含公式版本号，公式变更后旧条目自动失效。
+"""
+import hashlib
+import json
+import os
+import shutil
+import uuid
+
+import numpy as np
+
+from strategy_store import (HEADER_SUFFIX, POINT_FIELDS, POINTS_SUFFIX, load_strategy, point_columns,
+                            save_strategy, strategy_points)
+
+# 默认缓存目录
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "output", "strategy_cache")
+
+# 缓存总大小上限 (字节)，超出后淘汰最久未使用的条目
+DEFAULT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# 缓存条目中附带的元信息键（读取时移除）
+CACHE_INFO_KEY = "cache_info"
+
+
+def cache_key(inputs, version):
+    """
+    计算缓存键。
+    :param inputs: dict, 可JSON序列化的有效输入
+    :param version: 策略公式版本号
+    :return: str, SHA-256 十六进制摘要
+    """
+    payload = json.dumps({"version": version, "inputs": inputs}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _entry_paths(key, cache_dir):
+    base = os.path.join(cache_dir, key)
+    return base + HEADER_SUFFIX, base + POINTS_SUFFIX
+
+
+def load_cached_strategy(key, version, cache_dir=None, as_arrays=False):
+    """
+    读取缓存的策略，未命中或条目已损坏/版本不符时返回None。
+    :param key: cache_key 的结果
+    :param version: 策略公式版本号
+    :param cache_dir: 缓存目录，默认为 output/strategy_cache/
+    :param as_arrays: bool, 为True时以 point_arrays 返回点位，否则为点位字典列表
+    :return: tuple (strategy, cache_info) 或 None
+    """
+    header_path, _ = _entry_paths(key, cache_dir or DEFAULT_CACHE_DIR)
+    if not os.path.exists(header_path):
+        return None
+    try:
+        cached = load_strategy(header_path, mmap=False)
+    except (OSError, ValueError, KeyError):
+        return None
+    info = cached.pop(CACHE_INFO_KEY, {})
+    if info.get("version") != version:
+        return None
+
+    # 更新访问时间，作为LRU淘汰依据
+    try:
+        os.utime(header_path)
+    except OSError:
+        pass
+
+    # 按写入时各列的数值类型还原（列式存储中深度等列统一为浮点）
+    view = cached.pop("points")
+    kinds = info.get("point_kinds", {})
+    columns = {
+        field: view[field].astype(np.int64 if kinds.get(field, view[field].dtype.kind) == "i" else float)
+        for field in POINT_FIELDS
+    }
+    strategy = {}
+    for name, value in cached.items():
+        strategy[name] = value
+        if name == "vibration_params":
+            # 点位位于 vibration_params 之后，与 plan_strategy 的键顺序一致
+            if as_arrays:
+                strategy["point_arrays"] = columns
+            else:
+                values = [columns[field].tolist() for field in POINT_FIELDS]
+                strategy["points"] = [dict(zip(POINT_FIELDS, row)) for row in zip(*values)]
+    return strategy, info
+
+
+def store_cached_strategy(key, version, strategy, cache_dir=None, max_bytes=DEFAULT_CACHE_MAX_BYTES, **info):
+    """
+    写入缓存条目（先写入临时目录再重命名，多进程并发写入同一条目也不会读到半个文件），
+    随后按LRU淘汰超出大小上限的条目。
+    :param key: cache_key 的结果
+    :param version: 策略公式版本号
+    :param strategy: dict, 振捣策略
+    :param cache_dir: 缓存目录
+    :param max_bytes: 缓存总大小上限 (字节)
+    :param info: 随条目保存的其他元信息
+    :return: str, 条目头文件路径
+    """
+    cache_dir = cache_dir or DEFAULT_CACHE_DIR
+    header_path, points_path = _entry_paths(key, cache_dir)
+    tmp_dir = os.path.join(cache_dir, f".tmp-{os.getpid()}-{uuid.uuid4().hex}")
+    os.makedirs(tmp_dir, exist_ok=True)
+    try:
+        entry = dict(strategy)
+        kinds = {field: column.dtype.kind
+                 for field, column in zip(POINT_FIELDS, point_columns(strategy_points(strategy), *POINT_FIELDS))}
+        entry[CACHE_INFO_KEY] = dict(info, version=version, key=key, point_kinds=kinds)
+        tmp_header, tmp_points = save_strategy(entry, os.path.join(tmp_dir, key))
+        # 头文件最后就位，作为条目完整的标志
+        os.replace(tmp_points, points_path)
+        os.replace(tmp_header, header_path)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    evict(cache_dir, max_bytes)
+    return header_path
+
+
+def cache_entries(cache_dir=None):
+    """
+    列出缓存条目。
+    :return: list[tuple(最近使用时间, 条目大小(字节), 头文件路径, 点位文件路径)]，按最近使用时间升序
+    """
+    cache_dir = cache_dir or DEFAULT_CACHE_DIR
+    if not os.path.isdir(cache_dir):
+        return []
+    entries = []
+    for name in os.listdir(cache_dir):
+        if not name.endswith(HEADER_SUFFIX):
+            continue
+        header_path, points_path = _entry_paths(name[:-len(HEADER_SUFFIX)], cache_dir)
+        try:
+            stat = os.stat(header_path)
+            size = stat.st_size + (os.path.getsize(points_path) if os.path.exists(points_path) else 0)
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, size, header_path, points_path))
+    entries.sort()
+    return entries
+
+
+def evict(cache_dir=None, max_bytes=DEFAULT_CACHE_MAX_BYTES):
+    """
+    淘汰最久未使用的条目，直到缓存总大小不超过上限。
+    :return: int, 淘汰的条目数
+    """
+    entries = cache_entries(cache_dir)
+    total = sum(size for _, size, _, _ in entries)
+    removed = 0
+    for _, size, header_path, points_path in entries:
+        if total <= max_bytes:
+            break
+        for path in (header_path, points_path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        total -= size
+        removed += 1
+    return removed
+
+
+def clear_cache(cache_dir=None):
+    """清空缓存目录"""
+    return evict(cache_dir, max_bytes=-1)
+
+
+if __name__ == "__main__":
+    # 打印缓存状态
+    entries = cache_entries()
+    total = sum(size for _, size, _, _ in entries)
+    print(f"缓存目录: {DEFAULT_CACHE_DIR}")
+    print(f"条目数: {len(entries)}, 总大小: {total / 1024:.1f} KB (上限 {DEFAULT_CACHE_MAX_BYTES // (1024 * 1024)} MB)")
@@ -0,0 +1,233 @@
+"""
+strategy_store.py
+振捣策略列式存储模块
+点位以NumPy结构化数组(.npy)按列紧凑存储，可内存映射按需读取；
+板尺寸、材料、参数等其余信息保存在一个小的JSON头文件中。
+仍可随时导出为原有的JSON格式。
+
+文件布局（以 output/vibration_strategy 为例）:
+    output/vibration_strategy.header.json   # 策略头信息
+    output/vibration_strategy.points.npy    # 点位结构化数组
+"""
+import json
+import os
+import sys
+
+import numpy as np
+
+# 列式格式版本
+STORE_FORMAT = "columnar-v1"
+
+# 点位结构化数组的字段与类型
+POINT_DTYPE = np.dtype([
+    ("id", "<i4"),
+    ("x", "<f8"),
+    ("y", "<f8"),
+    ("freq_hz", "<i2"),
+    ("time_s", "<i2"),
+    ("depth_cm", "<f8"),
+    ("radius_cm", "<f8"),
+])
+POINT_FIELDS = POINT_DTYPE.names
+
+HEADER_SUFFIX = ".header.json"
+POINTS_SUFFIX = ".points.npy"
+
+
+class PointView:
+    """
+    点位结构化数组的惰性只读视图。
+    - view[i] 返回单个点位记录，可用 record["x"] 方式取值
+    - view["x"] 返回整列数组（不复制）
+    - view[a:b] 返回子视图
+    """
+
+    def __init__(self, records):
+        self._records = records
+
+    def __len__(self):
+        return len(self._records)
+
+    def __iter__(self):
+        return iter(self._records)
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self._records[key]
+        if isinstance(key, slice):
+            return PointView(self._records[key])
+        return self._records[key]
+
+    @property
+    def records(self):
+        """底层结构化数组（可能是内存映射）"""
+        return self._records
+
+    def to_dicts(self):
+        """转换为点位字典列表（用于导出JSON）"""
+        columns = [self._records[name].tolist() for name in POINT_FIELDS]
+        return [dict(zip(POINT_FIELDS, values)) for values in zip(*columns)]
+
+
+def points_to_records(points):
+    """
+    将点位转换为结构化数组。
+    :param points: 点位字典列表、point_arrays 数组字典或 PointView
+    :return: POINT_DTYPE 结构化数组
+    """
+    if isinstance(points, PointView):
+        return points.records
+    records = np.empty(len(points["id"]) if isinstance(points, dict) else len(points), dtype=POINT_DTYPE)
+    for name in POINT_FIELDS:
+        if isinstance(points, dict):
+            records[name] = points[name]
+        else:
+            records[name] = [p[name] for p in points]
+    return records
+
+
+def point_columns(points, *names):
+    """
+    按列取出点位字段，兼容点位字典列表、point_arrays 数组字典和 PointView。
+    :param points: 点位集合
+    :param names: 字段名
+    :return: tuple，每个字段一个 numpy 数组
+    """
+    if isinstance(points, (PointView, dict)):
+        return tuple(np.asarray(points[name]) for name in names)
+    return tuple(np.array([p[name] for p in points]) for name in names)
+
+
+def as_point_sequence(points):
+    """将点位集合统一为可按下标/切片访问的序列（point_arrays 数组字典转换为 PointView）"""
+    if isinstance(points, dict):
+        return PointView(points_to_records(points))
+    return points
+
+
+def is_point_record(point):
+    """判断是否为带坐标的点位（dict 或结构化记录）"""
+    if isinstance(point, np.void):
+        return True
+    return isinstance(point, dict) and "x" in point and "y" in point
+
+
+def point_get(point, key, default=None):
+    """从单个点位（dict 或结构化记录）中取值，字段不存在时返回默认值"""
+    if isinstance(point, np.void):
+        return point[key].item() if key in point.dtype.names else default
+    return point.get(key, default)
+
+
+def strategy_points(strategy):
+    """返回策略中的点位集合（points 或 point_arrays）"""
+    if "point_arrays" in strategy:
+        return strategy["point_arrays"]
+    return strategy.get("points", [])
+
+
+def base_path_of(path):
+    """去掉头文件/点位文件后缀，得到存储基础路径"""
+    for suffix in (HEADER_SUFFIX, POINTS_SUFFIX, ".json"):
+        if path.endswith(suffix):
+            return path[:-len(suffix)]
+    return path
+
+
+def save_strategy(strategy, path):
+    """
+    以列式格式保存振捣策略。
+    :param strategy: dict, 振捣策略（points、point_arrays 或已加载的 PointView）
+    :param path: 存储基础路径，如 output/vibration_strategy
+    :return: tuple (头文件路径, 点位文件路径)
+    """
+    base = base_path_of(path)
+    header_path = base + HEADER_SUFFIX
+    points_path = base + POINTS_SUFFIX
+
+    records = points_to_records(strategy_points(strategy))
+    header = {key: value for key, value in strategy.items() if key not in ("points", "point_arrays")}
+    if "route" in header:
+        # 点位已按路径顺序存储，访问顺序可由 id 列还原，不再重复保存
+        header["route"] = {k: v for k, v in header["route"].items() if k != "order"}
+        header["route"]["order_from_points"] = True
+    header["store"] = {
+        "format": STORE_FORMAT,
+        "key_order": ["points" if key == "point_arrays" else key for key in strategy],
+        "points_file": os.path.basename(points_path),
+        "dtype": [[name, POINT_DTYPE[name].str] for name in POINT_FIELDS]
+    }
+
+    os.makedirs(os.path.dirname(os.path.abspath(base)), exist_ok=True)
+    np.save(points_path, records)
+    with open(header_path, 'w', encoding='utf-8') as f:
+        json.dump(header, f, ensure_ascii=False, indent=2)
+    return header_path, points_path
+
+
+def load_strategy(path, mmap=True):
+    """
+    加载振捣策略。列式格式返回的 strategy["points"] 为 PointView（默认内存映射，按需读取）；
+    普通JSON策略文件按原样返回。
+    指定普通JSON文件时，只有同名的列式副本不早于该JSON文件（由同一份策略保存）才改为读取列式副本，
+    否则JSON文件更新过，列式副本已过期，按JSON文件读取。
+    :param path: 头文件路径、存储基础路径或普通JSON策略文件路径
+    :param mmap: 是否以内存映射方式读取点位
+    :return: dict, 振捣策略
+    """
+    base = base_path_of(path)
+    header_path = base + HEADER_SUFFIX
+    plain_json = path.endswith(".json") and not path.endswith(HEADER_SUFFIX) and os.path.isfile(path)
+    if not os.path.exists(header_path) or (plain_json and os.path.getmtime(header_path) < os.path.getmtime(path)):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    with open(header_path, 'r', encoding='utf-8') as f:
+        strategy = json.load(f)
+    store = strategy.pop("store")
+    if store.get("format") != STORE_FORMAT:
+        raise ValueError(f"不支持的策略存储格式: {store.get('format')}")
+    points_path = os.path.join(os.path.dirname(header_path), store["points_file"])
+    records = np.load(points_path, mmap_mode='r' if mmap else None)
+    strategy["points"] = PointView(records)
+    # 按保存时的键顺序还原，使导出的JSON与原文件结构一致
+    order = store.get("key_order", list(strategy))
+    return {key: strategy[key] for key in order if key in strategy}
+
+
+def strategy_to_json_dict(strategy):
+    """将策略转换为原有JSON格式的字典（点位为字典列表）"""
+    result = {}
+    for key, value in strategy.items():
+        if key in ("points", "point_arrays"):
+            points = as_point_sequence(strategy_points(strategy))
+            result["points"] = points.to_dicts() if isinstance(points, PointView) else points
+        else:
+            result[key] = value
+    route = result.get("route")
+    if route and route.get("order_from_points"):
+        route = {k: v for k, v in route.items() if k != "order_from_points"}
+        route["order"] = [p["id"] for p in result["points"]]
+        result["route"] = route
+    return result
+
+
+def export_json(strategy, json_path):
+    """将策略导出为原有的JSON文件格式"""
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(strategy_to_json_dict(strategy), f, ensure_ascii=False, indent=2)
+    return json_path
+
+
+if __name__ == "__main__":
+    # 用法: python strategy_store.py <输入策略> <输出路径>
+    #   输出路径以 .json 结尾时导出为JSON，否则保存为列式格式
+    if len(sys.argv) < 3:
+        print("用法: python strategy_store.py <输入策略> <输出路径>")
+        sys.exit(1)
+    strategy = load_strategy(sys.argv[1])
+    if sys.argv[2].endswith(".json") and not sys.argv[2].endswith(HEADER_SUFFIX):
+        print(f"已导出JSON: {export_json(strategy, sys.argv[2])}")
+    else:
+        header_path, points_path = save_strategy(strategy, sys.argv[2])
+        print(f"已保存列式策略: {header_path}, {points_path}")
@@ -1,6 +1,8 @@
-import Jetson.GPIO as GPIO
 import time
 
+# 经影子寄存器写入：蜂鸣器与红色LED共用 BCM 17，红灯已切换过的电平不会重复写入
+from utils.gpio_shadow import GPIO
+
 # 修改为BCM模式下的引脚编号
 glodon_Buzzer = 17    # 使用BCM 17（与红色LED相同，两者关联, 假设低电平响）
 
@@ -40,6 +42,7 @@ def cleanup_buzzer():
     print(f"蜂鸣器GPIO已设置为关闭状态，等待主程序统一cleanup")
 
 if __name__ == "__main__":
+    # 用法（在 smart_vibrator 目录下）: python -m utils.buzzer_control
     try:
         GPIO.setmode(GPIO.BCM) # __main__ 测试时需要设置模式
         setup_buzzer()
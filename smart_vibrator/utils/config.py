@@ -14,7 +14,110 @@ def get_config():
             "device_index": 0
         },
         "cloud_upload_url": "",  # 可留空，后续补充
-        "sensor_refresh_interval": 2  # 单位：秒
+        "sensor_refresh_interval": 2,  # 单位：秒
+        # PCF8591 模数转换（base/PCF8591.py），一次传输读取 AIN0-AIN3
+        #   address   I2C 地址（sudo i2cdetect -y -1 查看）
+        #   channels  {传感器: AIN通道}，未列出或为 None 的传感器使用模拟数据
+        #   ranges    温度以外各传感器的量程，0-255 线性换算；温度按 NTC 热敏电阻公式换算
+        "pcf8591": {
+            "address": 0x48,
+            "channels": {"temperature": 0, "humidity": 1, "slump": 2, "rebar_density": 3},
+            "ranges": {"humidity": (0, 100), "slump": (0, 300), "rebar_density": (0, 1)}
+        },
+        # GPIO 后端: jetson(Jetson.GPIO)/gpiod(Linux字符设备)/mock(内存模拟)，可由环境变量 SMART_VIBRATOR_GPIO 覆盖
+        "gpio_backend": "jetson",
+        "gpiod": {
+            "chip": "/dev/gpiochip0",     # GPIO 字符设备
+            "consumer": "smart_vibrator",
+            "line_offsets": {}            # {BCM编号: line偏移}，未列出的管脚偏移等于BCM编号
+        },
+        # GPIO 写入跟踪（utils/gpio_trace.py）：启用后每次执行振捣时把全部实际写入记录到
+        # dir（None 表示 output 目录）下的 gpio_trace_<时间>.svt，用 python -m utils.gpio_trace <文件> 离线分析
+        #   capacity          环形缓冲区容量（写入调用次数）
+        #   flush_interval_s  后台线程写文件的间隔 (s)
+        "gpio_trace": {
+            "enabled": False,
+            "dir": None,
+            "capacity": 65536,
+            "flush_interval_s": 0.5
+        },
+        # 急停按钮: pin 为输入管脚（BCM），None 表示只使用软件急停；按钮接地时 active_low 为 True
+        "estop": {
+            "pin": None,
+            "active_low": True,
+            "bouncetime_ms": 20
+        },
+        "motor": {
+            "drive_mode": "full",   # 驱动方式: wave(单相4拍)/full(双相4拍)/half(半步8拍, 每转4096步)
+            # 加减速度 (RPM/秒)，只用于振捣电机（glodon_rotary）；点位间移动由龙门按 gantry.accel_hz_per_s 加减速，
+            # 未启用龙门时按 move_s 等待人工移动。0 表示不使用加减速曲线、直接以目标转速起步
+            "accel_rpm_per_s": 60,
+            "min_rpm": 5,           # 振捣转速下限
+            "max_rpm": 40,          # 振捣转速上限；无加减速曲线时仍限制为30以免起步失步
+            # 单振捣头执行时在独立的电机工作线程中输出脉冲（utils/motor_worker.py：权限允许时使用 SCHED_FIFO 实时调度、
+            # 绑定CPU核心并锁定内存），False 时在执行线程内输出；worker_cpu 为绑定的核心，None 表示自动选择
+            "realtime_worker": True,
+            "worker_cpu": None
+        },
+        # XY 龙门：按点位坐标移动振捣头，enabled 为 False（默认，未安装龙门）时按时序方案的 move_s 等待、由人工移动振捣头；
+        # 接好各轴驱动并标定 steps_per_m 后再启用
+        #   steps_per_m     每米步数（按丝杠/同步带传动比标定）
+        #   max_rate_hz     各轴步进速率上限 (步/秒)
+        #   accel_hz_per_s  各轴加速度上限 (步/秒²)
+        #   hold            移动结束后是否保持线圈通电
+        # 需要Z轴时按相同格式增加 "z" 项
+        "gantry": {
+            "enabled": False,
+            "drive_mode": "full",
+            "max_rate_hz": 1000,
+            "accel_hz_per_s": 2000,
+            "hold": False,
+            "axes": {
+                "x": {"pins": (5, 6, 12, 13), "steps_per_m": 2000, "invert": False},
+                "y": {"pins": (16, 19, 20, 21), "steps_per_m": 2000, "invert": False}
+            }
+        },
+        # 多振捣头并行执行：count 大于1（或 execute_strategy 指定 heads）时点位划分为条带分区，每个头一个工作线程
+        #   min_separation_m  振捣头之间的最小间距 (m)：分区宽度不得小于该值，移动前按该距离互锁
+        #   heads             第1个为主振捣头（device_control 中的电机管脚和上面的 gantry 配置），
+        #                     其余各头的电机管脚 motor_pins、龙门轴 gantry_axes（启用龙门时，格式同 gantry.axes）
+        #                     和上电时的停放坐标 home_m
+        #   其余头的电机管脚使用主板上空闲的 BCM 4/22/26/27 和 7/8/9/10（SPI0，未使用 SPI 时空闲）；
+        #   BCM 只有 0-27，主板上已没有龙门轴需要的16个空闲管脚，gantry_axes 中的 32-47 为占位编号：
+        #   接入扩展GPIO后在 gpiod.line_offsets 中映射到实际的 line，或改为实际管脚；mock 后端下可直接运行，
+        #   其他后端下未映射的占位编号在创建振捣头时报错
+        "vibrator_heads": {
+            "count": 1,
+            "min_separation_m": 2.0,
+            "heads": [
+                {"home_m": (0.0, 0.0)},
+                {"motor_pins": (4, 22, 26, 27), "home_m": (0.0, 17.0),
+                 # 占位编号，见上
+                 "gantry_axes": {"x": {"pins": (32, 33, 34, 35), "steps_per_m": 2000},
+                                 "y": {"pins": (36, 37, 38, 39), "steps_per_m": 2000}}},
+                {"motor_pins": (7, 8, 9, 10), "home_m": (0.0, 33.0),
+                 # 占位编号，见上
+                 "gantry_axes": {"x": {"pins": (40, 41, 42, 43), "steps_per_m": 2000},
+                                 "y": {"pins": (44, 45, 46, 47), "steps_per_m": 2000}}}
+            ]
+        },
+        # 振捣执行的时序方案（单位：秒），由 timing_profile 选择
+        #   move_s        移动到点位的时间（未启用龙门时）
+        #   ready_s       到位后绿灯保持时间
+        #   settle_s      振捣结束后全部关闭的停顿时间
+        #   next_ready_s  下一点位前绿灯提示时间
+        #   gap_s         下一点位前的短暂停顿
+        #   finish_s      全部完成后绿灯保持时间
+        #   pipelined     为 true 时下一点位的绿灯提示与移动同时进行，不再单独等待
+        "timing_profile": "demo",
+        "timing_profiles": {
+            "demo": {"move_s": 3, "ready_s": 3, "settle_s": 1, "next_ready_s": 2, "gap_s": 0.5,
+                     "finish_s": 3, "pipelined": False},
+            "production": {"move_s": 3, "ready_s": 1, "settle_s": 0.5, "next_ready_s": 2, "gap_s": 0,
+                           "finish_s": 3, "pipelined": True},
+            "fast": {"move_s": 1, "ready_s": 0.2, "settle_s": 0.2, "next_ready_s": 0.5, "gap_s": 0,
+                     "finish_s": 0.5, "pipelined": True}
+        }
     }
     return config
 
@@ -0,0 +1,223 @@
+"""
+emergency_stop.py
+急停模块
+硬件急停按钮（GPIO 边沿检测 add_event_detect）和软件急停接口共用同一个停止事件（threading.Event）：
+触发后立即在触发所在的线程中将电机管脚全部置低断电、LED/蜂鸣器切换到安全状态（强制写入，不会因影子电平被跳过），
+步进调度在每一相输出前检查该事件，等待中的 sleep 也会被立即唤醒，不再继续输出。
+电机线程可能已通过检查、相位写入晚于置低到达：经影子寄存器时电机管脚在锁内被锁定为低电平（ShadowGPIO.latch），
+这类迟到的写入直接丢弃，不会重新给线圈通电，reset() 时解除锁定；各调用方在 run_steps 因急停返回后也再次强制置低。
+每次触发记录从触发到进入安全状态的延迟，目标为 STOP_LATENCY_TARGET_NS 以内。
+急停触发后须调用 reset() 复位才能继续运行；硬件按钮仍处于按下状态时不能复位。
+"""
+import threading
+import time
+
+# 急停反应时间目标 (ns)
+STOP_LATENCY_TARGET_NS = 5_000_000
+
+
+class EmergencyStop:
+    """
+    急停。
+    :param gpio: GPIO 模块（通常为共用的影子寄存器实例 utils.gpio_shadow.GPIO）
+    :param motor_pins: 电机管脚，急停时全部置低
+    :param safe_levels: dict {通道: 电平}，急停时 LED/蜂鸣器的安全状态
+    :param pin: 急停按钮输入管脚（BCM），None 表示只使用软件急停
+    :param active_low: 按钮按下时为低电平（按钮接地、输入上拉）
+    :param bouncetime_ms: 边沿检测的消抖时间 (ms)，不影响首个边沿的反应时间
+    """
+
+    def __init__(self, gpio, motor_pins, safe_levels, pin=None, active_low=True, bouncetime_ms=None):
+        self.gpio = gpio
+        self.motor_pins = list(motor_pins)
+        self.safe_channels = list(safe_levels)
+        self.safe_values = list(safe_levels.values())
+        self.pin = pin
+        self.active_low = active_low
+        self.bouncetime_ms = bouncetime_ms
+        self.event = threading.Event()
+        self.armed = False
+        self.reason = None          # 触发原因: hardware/software/...
+        self.triggered_ns = None    # 触发时刻 (time.monotonic_ns)
+        self.safe_ns = None         # 进入安全状态的时刻
+        self._lock = threading.Lock()
+
+    @property
+    def latency_ns(self):
+        """最近一次触发到进入安全状态的延迟 (ns)"""
+        if self.triggered_ns is None or self.safe_ns is None:
+            return None
+        return self.safe_ns - self.triggered_ns
+
+    def arm(self):
+        """
+        启用硬件急停按钮的边沿检测。
+        :return: bool, 是否启用了硬件急停
+        """
+        if self.pin is None or self.armed:
+            return self.armed
+        gpio = self.gpio
+        gpio.setup(self.pin, gpio.IN, pull_up_down=gpio.PUD_UP if self.active_low else gpio.PUD_DOWN)
+        kwargs = {"bouncetime": self.bouncetime_ms} if self.bouncetime_ms else {}
+        gpio.add_event_detect(self.pin, gpio.FALLING if self.active_low else gpio.RISING,
+                              callback=self._on_edge, **kwargs)
+        self.armed = True
+        # 启用时按钮已处于按下状态
+        if self.button_pressed():
+            self.trigger("hardware")
+        return True
+
+    def disarm(self):
+        """停用硬件急停按钮的边沿检测"""
+        if self.armed:
+            self.gpio.remove_event_detect(self.pin)
+            self.armed = False
+
+    def add_motor_pins(self, pins):
+        """增加急停时置低的电机管脚（如多振捣头的其他电机）"""
+        self.motor_pins.extend(pin for pin in pins if pin not in self.motor_pins)
+
+    def button_pressed(self):
+        """急停按钮当前是否处于按下状态"""
+        if not self.armed:
+            return False
+        return self.gpio.input(self.pin) == (self.gpio.LOW if self.active_low else self.gpio.HIGH)
+
+    def _on_edge(self, channel):
+        self.trigger("hardware")
+
+    def trigger(self, reason="software"):
+        """
+        触发急停：置位停止事件，电机断电，LED/蜂鸣器进入安全状态。
+        :param reason: 触发原因
+        :return: 本次触发到进入安全状态的延迟 (ns)
+        """
+        start = time.monotonic_ns()
+        with self._lock:
+            first = not self.event.is_set()
+            self.event.set()
+            self.make_safe()
+            if first:
+                self.reason = reason
+                self.triggered_ns = start
+                self.safe_ns = time.monotonic_ns()
+        return time.monotonic_ns() - start
+
+    def make_safe(self):
+        """电机管脚全部置低（经影子寄存器时锁定为低电平），LED/蜂鸣器切换到安全状态"""
+        if hasattr(self.gpio, "latch"):
+            # 锁定后迟到的相位写入被丢弃；LED/蜂鸣器强制写入，不因影子电平被跳过
+            self.gpio.latch(self.motor_pins, self.gpio.LOW)
+            self.gpio.output(self.safe_channels, self.safe_values, force=True)
+        else:
+            self.gpio.output(self.motor_pins, [self.gpio.LOW] * len(self.motor_pins))
+            self.gpio.output(self.safe_channels, self.safe_values)
+
+    def is_set(self):
+        return self.event.is_set()
+
+    def wait(self, timeout=None):
+        """等待急停触发，返回是否已触发"""
+        return self.event.wait(timeout)
+
+    def reset(self):
+        """
+        复位急停。
+        :return: bool, 是否复位成功（硬件按钮仍按下时失败）
+        """
+        if self.button_pressed():
+            return False
+        if hasattr(self.gpio, "unlatch"):
+            self.gpio.unlatch(self.motor_pins)
+        self.event.clear()
+        self.reason = None
+        return True
+
+
+if __name__ == "__main__":
+    # 模拟GPIO上的急停延迟测试：电机工作线程以 30 RPM 输出脉冲、红灯和蜂鸣器打开时，
+    # 分别以硬件按钮（输入边沿）和软件接口触发急停，测量从触发到进入安全状态的延迟
+    # 用法（在 smart_vibrator 目录下）: python -m utils.emergency_stop
+    import random
+    import numpy as np
+    from utils import mock_gpio
+    from utils.gpio_shadow import ShadowGPIO
+    from utils.motor_worker import MotorWorker
+    from utils.stepper_driver import StepperDriver
+
+    ESTOP_PIN = 27
+    RED_BUZZER, GREEN = 17, 18
+    TRIALS = 50
+
+    mock_gpio.reset()
+    mock_gpio.setmode(mock_gpio.BCM)
+    gpio = ShadowGPIO(mock_gpio)
+    driver = StepperDriver(gpio)
+    driver.setup()
+    gpio.setup([RED_BUZZER, GREEN], gpio.OUT)
+    estop = EmergencyStop(gpio, driver.pins, {RED_BUZZER: gpio.HIGH, GREEN: gpio.LOW}, pin=ESTOP_PIN)
+    estop.arm()
+    worker = MotorWorker(driver).start()
+    interval_ns = int(60 / 30 / driver.steps_per_revolution * 1e9)
+
+    latencies = {"hardware": [], "software": []}
+    motor_stop = []
+    for trial in range(2 * TRIALS):
+        source = "hardware" if trial % 2 == 0 else "software"
+        mock_gpio.set_input(ESTOP_PIN, mock_gpio.HIGH)
+        assert estop.reset()
+        gpio.output(RED_BUZZER, gpio.LOW)       # 红灯亮、蜂鸣器响
+        future = worker.rotate('c', interval_ns, 100_000, stop=estop.event)
+        time.sleep(random.uniform(0.02, 0.06))
+        start = time.monotonic_ns()
+        if source == "hardware":
+            mock_gpio.set_input(ESTOP_PIN, mock_gpio.LOW)
+            estop.wait(1)
+        else:
+            estop.trigger("software")
+        stats = future.result(timeout=1)
+        done = time.monotonic_ns()
+        assert stats["stopped"] and estop.reason == source
+        # 电机线程停止后仍为安全状态（没有在急停之后再输出相位）
+        assert all(mock_gpio.levels[p] == mock_gpio.LOW for p in driver.pins)
+        assert mock_gpio.levels[RED_BUZZER] == mock_gpio.HIGH
+        latencies[source].append(estop.safe_ns - start)
+        motor_stop.append(done - start)
+    worker.stop()
+    estop.disarm()
+
+    # 急停落在 run_steps 的停止检查与相位写入之间：迟到的相位写入被丢弃，管脚保持低电平
+    from utils.step_scheduler import run_steps
+
+    assert estop.reset()
+    write_phase = driver.step_function('c')
+    late_writes = []
+
+    def late_step(k):
+        if k == 100:
+            estop.trigger("software")   # 本步已通过停止检查
+        write_phase(k)
+        if k >= 100:
+            late_writes.append([mock_gpio.levels[p] for p in driver.pins])
+
+    blocked = gpio.blocked_writes
+    stats = run_steps(late_step, 1000, 100_000, stop=estop.event)
+    assert stats["stopped"] and stats["steps"] == 101
+    assert late_writes == [[mock_gpio.LOW] * len(driver.pins)], "急停后迟到的相位写入重新给线圈通电"
+    assert gpio.blocked_writes > blocked
+    # 复位后解除锁定，电机可以重新输出
+    assert estop.reset()
+    write_phase(0)
+    assert any(mock_gpio.levels[p] == mock_gpio.HIGH for p in driver.pins)
+    driver.release()
+    print(f"急停后迟到的相位写入已丢弃（{gpio.blocked_writes - blocked} 个通道），管脚保持低电平")
+
+    print(f"实时设置: {worker.settings}")
+    for source, values in latencies.items():
+        values = np.array(values) / 1000
+        print(f"{source} 急停到安全状态: p50 {np.percentile(values, 50):.0f} us, "
+              f"p99 {np.percentile(values, 99):.0f} us, max {values.max():.0f} us ({len(values)} 次)")
+    print(f"电机线程退出: max {max(motor_stop) / 1000:.0f} us")
+    worst = max(max(values) for values in latencies.values())
+    assert worst < STOP_LATENCY_TARGET_NS, f"急停延迟 {worst / 1e6:.2f} ms 超过目标"
+    print(f"最坏延迟 {worst / 1e6:.3f} ms < 目标 {STOP_LATENCY_TARGET_NS / 1e6:.0f} ms")
@@ -0,0 +1,213 @@
+"""
+gantry.py
+多轴龙门移动模块
+将相邻点位的坐标换算为各轴（X/Y，可选Z）步进电机的协调步进序列:
+    - 直线插补采用 DDA（与 Bresenham 误差累加结果相同）：步数最多的主轴每个节拍走一步，
+      其余轴在累计误差超过半步时走一步，各轴同时到达目标点
+    - 节拍间隔按主轴的梯形加减速曲线（motion_profile.trapezoid_intervals）计算，
+      各轴步进速率和加速度均不超过限值（从动轴速率按比例更低）
+    - 所有轴的管脚在同一个定时循环（step_scheduler.run_steps）中一次写入，每个节拍只调用一次 output
+各轴位置以步为单位保存，目标坐标先换算为绝对步数再求差，连续移动不会累积舍入误差。
+"""
+import numpy as np
+
+from utils.motion_profile import trapezoid_intervals
+from utils.step_scheduler import run_steps
+from utils.stepper_driver import MODE_TABLES, DEFAULT_DRIVE_MODE
+
+# 节拍被跳过导致未到达目标时的补充移动次数上限
+MAX_CORRECTIONS = 3
+
+
+def interpolate_axes(deltas):
+    """
+    多轴直线插补。
+    :param deltas: 各轴步数（可为负）
+    :return: int64 数组 (节拍数, 轴数)，第 k 个节拍之后各轴相对起点的位置
+    """
+    deltas = np.asarray(deltas, dtype=np.int64)
+    ticks = int(np.abs(deltas).max()) if deltas.size else 0
+    if ticks == 0:
+        return np.zeros((0, deltas.size), dtype=np.int64)
+    k = np.arange(1, ticks + 1, dtype=np.int64)[:, None]
+    # 第 k 个节拍后从动轴应走的步数 round(k * |d| / ticks)，整数运算，最后一个节拍恰好为 |d|
+    return (k * np.abs(deltas) + ticks // 2) // ticks * np.sign(deltas)
+
+
+class Gantry:
+    """
+    多轴龙门。
+    :param gpio: GPIO 模块
+    :param axes: dict {轴名: {"pins": 4个管脚, "steps_per_m": 每米步数, "invert": 是否反向}}，按插入顺序为坐标顺序
+    :param max_rate_hz: 各轴步进速率上限 (步/秒)
+    :param accel_hz_per_s: 各轴加速度上限 (步/秒²)
+    :param drive_mode: 驱动方式，见 stepper_driver.DRIVE_MODES
+    :param hold: 移动结束后是否保持线圈通电
+    """
+
+    def __init__(self, gpio, axes, max_rate_hz, accel_hz_per_s, drive_mode=DEFAULT_DRIVE_MODE, hold=False):
+        self.gpio = gpio
+        self.names = list(axes)
+        self.pins = [pin for axis in axes.values() for pin in axis["pins"]]
+        self.steps_per_m = np.array([float(axis["steps_per_m"]) for axis in axes.values()])
+        self._sign = np.array([-1 if axis.get("invert") else 1 for axis in axes.values()], dtype=np.int64)
+        self._table = np.array(MODE_TABLES[drive_mode]['c'], dtype=np.uint8)
+        self.max_rate_hz = float(max_rate_hz)
+        self.accel_hz_per_s = float(accel_hz_per_s)
+        self.hold = hold
+        self.position = np.zeros(len(self.names), dtype=np.int64)   # 各轴当前位置（步）
+        self._duration_cache = {}
+
+    def axis_pins(self):
+        """各轴的管脚 {轴名: 4个管脚}"""
+        return {name: self.pins[4 * i:4 * i + 4] for i, name in enumerate(self.names)}
+
+    def setup(self):
+        """将所有轴的管脚一次设置为输出模式"""
+        self.gpio.setup(self.pins, self.gpio.OUT)
+
+    def home(self, coordinates=None):
+        """
+        设定当前位置（不移动）。
+        :param coordinates: 当前所在坐标 (m)，None 表示原点
+        """
+        self.position[:] = 0
+        if coordinates is not None:
+            self.position[:] = self.target_steps(coordinates)
+
+    def coordinates(self):
+        """当前位置 (m)"""
+        return self.position / self.steps_per_m
+
+    def target_steps(self, target):
+        """
+        目标坐标换算为各轴绝对步数。
+        :param target: 各轴坐标 (m)，按轴顺序；少于轴数时其余轴保持当前位置
+        """
+        steps = self.position.copy()
+        target = np.asarray(target, dtype=float)
+        steps[:target.size] = np.round(target * self.steps_per_m[:target.size])
+        return steps
+
+    def move_duration_s(self, ticks):
+        """主轴走 ticks 步的移动时间 (s)"""
+        ticks = int(ticks)
+        if ticks not in self._duration_cache:
+            intervals = trapezoid_intervals(ticks, self.max_rate_hz, self.accel_hz_per_s)
+            self._duration_cache[ticks] = float(intervals.sum()) / 1e9
+        return self._duration_cache[ticks]
+
+    def plan_move(self, target):
+        """
+        规划到目标坐标的直线移动。
+        :return: dict, path（各节拍后的相对位置）/intervals（节拍间隔 ns）/duration_s
+        """
+        path = interpolate_axes(self.target_steps(target) - self.position)
+        intervals = trapezoid_intervals(len(path), self.max_rate_hz, self.accel_hz_per_s)
+        return {"path": path, "intervals": intervals, "duration_s": float(intervals.sum()) / 1e9}
+
+    def travel_times_s(self, targets):
+        """
+        从当前位置依次移动到各目标点的移动时间（不移动，用于时间预测）。
+        :param targets: 数组 (点数, 坐标数)
+        :return: 各段移动时间 (s) 的数组
+        """
+        targets = np.atleast_2d(np.asarray(targets, dtype=float))
+        if targets.size == 0:
+            return np.zeros(0)
+        columns = targets.shape[1]
+        steps = np.round(targets * self.steps_per_m[:columns]).astype(np.int64)
+        previous = np.vstack((self.position[:columns], steps[:-1]))
+        ticks = np.abs(steps - previous).max(axis=1)
+        return np.array([self.move_duration_s(t) for t in ticks])
+
+    def _phase_rows(self, positions):
+        """各节拍所有轴管脚的电平（按 self.pins 的顺序）"""
+        index = (positions * self._sign) % len(self._table)
+        return self._table[index].reshape(len(positions), -1).tolist()
+
+    def execute(self, plan, stop=None):
+        """
+        执行规划好的移动。
+        :param plan: plan_move 的结果
+        :param stop: 停止事件（threading.Event）
+        :return: dict, run_steps 的统计
+        """
+        path = plan["path"]
+        if len(path) == 0:
+            return {"steps": 0, "skipped": 0, "stopped": False, "elapsed_ns": 0}
+        rows = self._phase_rows(self.position + path)
+        output = self.gpio.output
+        pins = self.pins
+
+        def step(k):
+            output(pins, rows[k])
+
+        stats = run_steps(step, len(rows), plan["intervals"], stop=stop)
+        # 只按实际输出的节拍更新位置（节拍被跳过或急停时未走完全程）
+        if stats["steps"] > 0:
+            self.position = self.position + path[stats["steps"] - 1]
+        if stats["stopped"]:
+            # 急停：即使保持线圈通电也再次强制置低，防止迟到的相位写入
+            self.release(force=True)
+        elif not self.hold:
+            self.release()
+        return stats
+
+    def move_to(self, target, stop=None):
+        """
+        直线移动到目标坐标。
+        :param target: 各轴坐标 (m)
+        :param stop: 停止事件（threading.Event）
+        :return: dict, steps（总节拍数）/skipped/stopped/duration_s（规划移动时间）/elapsed_s
+        """
+        goal = self.target_steps(target)
+        result = {"steps": 0, "skipped": 0, "stopped": False, "duration_s": 0.0, "elapsed_s": 0.0}
+        for _ in range(1 + MAX_CORRECTIONS):
+            if np.array_equal(self.position, goal):
+                break
+            plan = self.plan_move(target)
+            stats = self.execute(plan, stop)
+            result["steps"] += stats["steps"]
+            result["skipped"] += stats["skipped"]
+            result["duration_s"] += plan["duration_s"]
+            result["elapsed_s"] += stats["elapsed_ns"] / 1e9
+            if stats["stopped"]:
+                result["stopped"] = True
+                break
+        return result
+
+    def release(self, force=False):
+        """
+        所有轴线圈断电。
+        :param force: 经影子寄存器时忽略影子电平强制写入（急停后再次置低）
+        """
+        kwargs = {"force": True} if force and hasattr(self.gpio, "invalidate") else {}
+        self.gpio.output(self.pins, [self.gpio.LOW] * len(self.pins), **kwargs)
+
+
+if __name__ == "__main__":
+    # 在模拟GPIO上沿一段点位移动，检查插补结果与移动时间
+    # 用法（在 smart_vibrator 目录下）: python -m utils.gantry
+    from utils import mock_gpio
+
+    # 插补：主轴每节拍一步，从动轴每节拍至多一步，终点准确
+    for deltas in ([7, 3], [-5, 12], [10, 0], [9, -4, 2]):
+        path = interpolate_axes(deltas)
+        steps = np.abs(np.diff(np.vstack((np.zeros(len(deltas), dtype=np.int64), path)), axis=0))
+        assert steps.max() == 1 and (steps.max(axis=1) == 1).all() and (path[-1] == deltas).all()
+
+    mock_gpio.setmode(mock_gpio.BCM)
+    axes = {"x": {"pins": (5, 6, 12, 13), "steps_per_m": 2000},
+            "y": {"pins": (16, 19, 20, 21), "steps_per_m": 2000}}
+    gantry = Gantry(mock_gpio, axes, max_rate_hz=1000, accel_hz_per_s=2000)
+    gantry.setup()
+    route = np.array([[0.25, 0.25], [0.75, 0.25], [0.75, 0.70], [0.30, 0.40]])
+    predicted = gantry.travel_times_s(route)
+    for target, expected in zip(route, predicted):
+        mock_gpio.write_count = 0
+        result = gantry.move_to(target)
+        assert np.allclose(gantry.coordinates(), target)
+        print(f"移动到 ({target[0]:.2f}, {target[1]:.2f}): {result['steps']} 节拍, "
+              f"规划 {result['duration_s']:.3f} 秒, 预测 {expected:.3f} 秒, 实际 {result['elapsed_s']:.3f} 秒, "
+              f"管脚写入 {mock_gpio.write_count} 次")
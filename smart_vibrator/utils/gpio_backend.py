@@ -0,0 +1,252 @@
+"""
+gpio_backend.py
+GPIO 后端选择模块
+各模块不再直接导入 Jetson.GPIO，而是通过 load_backend() 取得接口与 Jetson.GPIO 相同的后端:
+    jetson  Jetson.GPIO（默认）
+    gpiod   Linux GPIO 字符设备（libgpiod v2 的 Python 绑定）：所有已设置的管脚保持在同一个
+            line request 中，一次 output 无论包含多少个管脚都只需一次 ioctl
+    mock    内存模拟GPIO（utils/mock_gpio.py），无硬件环境下运行和测试整个控制流程
+后端由环境变量 SMART_VIBRATOR_GPIO 指定，未设置时使用配置中的 gpio_backend。
+"""
+import os
+import threading
+import time
+from datetime import timedelta
+
+from utils.config import get_config
+
+# 指定后端的环境变量
+GPIO_BACKEND_ENV = "SMART_VIBRATOR_GPIO"
+
+GPIO_BACKENDS = ("jetson", "gpiod", "mock")
+DEFAULT_GPIO_BACKEND = "jetson"
+
+
+def _as_list(items):
+    return list(items) if isinstance(items, (list, tuple)) else [items]
+
+
+class GpiodGPIO:
+    """
+    基于 libgpiod v2 字符设备接口的 GPIO 后端，接口与 Jetson.GPIO 相同。
+    setup 的管脚全部放在同一个 line request 中（管脚集合变化时重新申请），
+    output 对所有通道只调用一次 set_values，即一次 ioctl。
+    边沿检测通过同一个 line request 的边沿事件实现，回调在独立的事件线程中调用（与 Jetson.GPIO 相同）。
+    :param chip: GPIO 字符设备路径
+    :param consumer: 申请管脚时的使用者名称
+    :param line_offsets: dict {BCM编号: 芯片上的 line 偏移}，未列出的管脚偏移等于 BCM 编号
+    """
+    BCM = 11
+    BOARD = 10
+    OUT = 0
+    IN = 1
+    HIGH = 1
+    LOW = 0
+    PUD_OFF = 20
+    PUD_DOWN = 21
+    PUD_UP = 22
+    RISING = 31
+    FALLING = 32
+    BOTH = 33
+
+    def __init__(self, chip="/dev/gpiochip0", consumer="smart_vibrator", line_offsets=None):
+        import gpiod
+        from gpiod.line import Bias, Direction, Edge, Value
+        self._gpiod = gpiod
+        self._direction = {self.OUT: Direction.OUTPUT, self.IN: Direction.INPUT}
+        self._bias = {self.PUD_OFF: Bias.DISABLED, self.PUD_DOWN: Bias.PULL_DOWN, self.PUD_UP: Bias.PULL_UP}
+        self._edge = {self.RISING: Edge.RISING, self.FALLING: Edge.FALLING, self.BOTH: Edge.BOTH}
+        self._value = (Value.INACTIVE, Value.ACTIVE)
+        self._active = Value.ACTIVE
+        self.chip = chip
+        self.consumer = consumer
+        self._offsets = {int(k): int(v) for k, v in (line_offsets or {}).items()}
+        self._mode = None
+        self._directions = {}   # BCM编号 -> OUT/IN
+        self._levels = {}       # BCM编号 -> 输出电平，重新申请时保持
+        self._pulls = {}        # BCM编号 -> 输入上下拉
+        self._events = {}       # BCM编号 -> {"edge", "bouncetime", "callbacks", "detected"}
+        self._event_thread = None
+        self._request = None
+
+    def _offset(self, channel):
+        return self._offsets.get(channel, channel)
+
+    def _reconfigure(self):
+        """按当前管脚集合重新申请一个 line request"""
+        if self._request is not None:
+            self._request.release()
+            self._request = None
+        if not self._directions:
+            return
+        config = {}
+        for channel, direction in self._directions.items():
+            settings = self._gpiod.LineSettings(direction=self._direction[direction])
+            if direction == self.OUT:
+                settings.output_value = self._value[self._levels.get(channel, 0)]
+            else:
+                if channel in self._pulls:
+                    settings.bias = self._bias[self._pulls[channel]]
+                event = self._events.get(channel)
+                if event is not None:
+                    settings.edge_detection = self._edge[event["edge"]]
+                    if event["bouncetime"]:
+                        settings.debounce_period = timedelta(milliseconds=event["bouncetime"])
+            config[self._offset(channel)] = settings
+        self._request = self._gpiod.request_lines(self.chip, consumer=self.consumer, config=config)
+
+    def setmode(self, mode):
+        self._mode = mode
+
+    def getmode(self):
+        return self._mode
+
+    def setwarnings(self, state):
+        pass
+
+    def setup(self, channels, direction, initial=None, pull_up_down=None):
+        for channel in _as_list(channels):
+            self._directions[channel] = direction
+            if direction == self.OUT and initial is not None:
+                self._levels[channel] = 1 if initial else 0
+            if direction == self.IN and pull_up_down is not None:
+                self._pulls[channel] = pull_up_down
+        self._reconfigure()
+
+    def output(self, channels, values):
+        channels = _as_list(channels)
+        if not isinstance(values, (list, tuple)):
+            values = [values] * len(channels)
+        if self._request is None:
+            raise RuntimeError("GPIO 通道未设置为输出模式")
+        settings = {}
+        for channel, value in zip(channels, values):
+            if self._directions.get(channel) != self.OUT:
+                raise RuntimeError(f"通道 {channel} 未设置为输出模式")
+            level = 1 if value else 0
+            self._levels[channel] = level
+            settings[self._offset(channel)] = self._value[level]
+        self._request.set_values(settings)
+
+    def input(self, channel):
+        if channel not in self._directions or self._request is None:
+            raise RuntimeError(f"通道 {channel} 未初始化")
+        return self.HIGH if self._request.get_value(self._offset(channel)) == self._active else self.LOW
+
+    def _watch_events(self):
+        """事件线程：等待 line request 上的边沿事件并调用回调"""
+        channels = {}
+        while self._events:
+            request = self._request
+            if request is None:
+                time.sleep(0.1)
+                continue
+            try:
+                if not request.wait_edge_events(timedelta(milliseconds=100)):
+                    continue
+                events = request.read_edge_events()
+            except (OSError, ValueError, RuntimeError):
+                # line request 正在重新申请
+                continue
+            if len(channels) != len(self._events):
+                channels = {self._offset(channel): channel for channel in self._events}
+            for edge_event in events:
+                channel = channels.get(edge_event.line_offset)
+                event = self._events.get(channel)
+                if event is None:
+                    continue
+                event["detected"] = True
+                for callback in list(event["callbacks"]):
+                    callback(channel)
+        self._event_thread = None
+
+    def add_event_detect(self, channel, edge, callback=None, bouncetime=None):
+        if self._directions.get(channel) != self.IN:
+            raise RuntimeError(f"通道 {channel} 未设置为输入模式")
+        if channel in self._events:
+            raise RuntimeError(f"通道 {channel} 已启用边沿检测")
+        self._events[channel] = {"edge": edge, "bouncetime": bouncetime,
+                                 "callbacks": [callback] if callback else [], "detected": False}
+        self._reconfigure()
+        if self._event_thread is None:
+            self._event_thread = threading.Thread(target=self._watch_events, name="gpiod-events", daemon=True)
+            self._event_thread.start()
+
+    def add_event_callback(self, channel, callback):
+        if channel not in self._events:
+            raise RuntimeError(f"通道 {channel} 未启用边沿检测")
+        self._events[channel]["callbacks"].append(callback)
+
+    def remove_event_detect(self, channel):
+        if self._events.pop(channel, None) is not None:
+            self._reconfigure()
+
+    def event_detected(self, channel):
+        event = self._events.get(channel)
+        if event is None or not event["detected"]:
+            return False
+        event["detected"] = False
+        return True
+
+    def cleanup(self, channels=None):
+        if channels is None:
+            self._directions.clear()
+            self._levels.clear()
+            self._pulls.clear()
+            self._events.clear()
+            self._mode = None
+        else:
+            for channel in _as_list(channels):
+                self._directions.pop(channel, None)
+                self._levels.pop(channel, None)
+                self._pulls.pop(channel, None)
+                self._events.pop(channel, None)
+        self._reconfigure()
+
+
+def backend_name(name=None):
+    """
+    确定使用的后端：参数 > 环境变量 SMART_VIBRATOR_GPIO > 配置 gpio_backend > 默认 jetson。
+    """
+    name = (name or os.environ.get(GPIO_BACKEND_ENV) or get_config().get("gpio_backend")
+            or DEFAULT_GPIO_BACKEND).lower()
+    if name not in GPIO_BACKENDS:
+        raise ValueError(f"未知的GPIO后端: {name}，可选: {GPIO_BACKENDS}")
+    return name
+
+
+def load_backend(name=None):
+    """
+    加载 GPIO 后端。
+    :param name: 后端名称，None 时由 backend_name 决定
+    :return: 接口与 Jetson.GPIO 相同的模块或对象
+    """
+    name = backend_name(name)
+    if name == "jetson":
+        import Jetson.GPIO as gpio
+        return gpio
+    if name == "gpiod":
+        return GpiodGPIO(**get_config().get("gpiod", {}))
+    from utils import mock_gpio
+    return mock_gpio
+
+
+if __name__ == "__main__":
+    # 比较各后端的步进速率上限（不经过影子寄存器）
+    # 用法（在 smart_vibrator 目录下）: python -m utils.gpio_backend [后端 ...]
+    import sys
+    from utils.stepper_driver import StepperDriver, benchmark
+
+    for name in sys.argv[1:] or [backend_name()]:
+        try:
+            gpio = load_backend(name)
+        except (ImportError, OSError) as e:
+            print(f"{name}: 不可用 ({e})")
+            continue
+        gpio.setmode(gpio.BCM)
+        driver = StepperDriver(gpio)
+        driver.setup()
+        rate = benchmark(driver.step_function('c'), steps=20_000)
+        driver.release()
+        gpio.cleanup(driver.pins)
+        print(f"{name}: {rate:,.0f} 步/秒")
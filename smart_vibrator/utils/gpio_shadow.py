@@ -0,0 +1,273 @@
+"""
+gpio_shadow.py
+GPIO 影子寄存器模块
+在 GPIO 模块外包装一层影子寄存器，记录每个通道最后写入的电平：写入电平与影子寄存器相同时直接跳过，
+不再经过 GPIO 后端的系统调用路径。多个通道的变化合并为一次 output 调用，
+并支持命名的多管脚状态（如 green = {17: HIGH, 18: HIGH}），一次原子地切换到位。
+setup/cleanup 后对应通道的影子电平失效，下一次写入必定执行；需要强制写入时使用 force=True。
+LED、蜂鸣器、步进电机、传感器和主程序共用模块级实例 GPIO，用法与 Jetson.GPIO 相同，
+底层后端由 utils/gpio_backend.py 选择。
+设置 tracer（见 utils/gpio_trace.py）后，每次实际写入都记录到跟踪器的环形缓冲区。
+多个振捣头的工作线程和急停线程共用同一个实例：影子电平的比较、底层写入、计数和跟踪记录在同一把锁内完成，
+各线程的写入依次执行，影子电平始终与管脚一致（各头不单独使用影子寄存器，以便急停和指示灯状态覆盖全部管脚）。
+latch() 将通道锁定在指定电平（急停时电机管脚锁定为低电平）：锁定期间改变这些通道电平的写入在锁内直接丢弃，
+已通过急停检查、稍后才到达的相位写入不会重新给线圈通电，unlatch() 后恢复。
+"""
+import threading
+
+from utils.gpio_backend import load_backend
+
+
+def _as_list(channels):
+    return list(channels) if isinstance(channels, (list, tuple)) else [channels]
+
+
+class ShadowGPIO:
+    """
+    带影子寄存器的 GPIO 包装。
+    :param gpio: 被包装的 GPIO 模块（Jetson.GPIO 或接口相同的模块），常量和其他函数直接透传
+    """
+
+    def __init__(self, gpio):
+        self._gpio = gpio
+        self._levels = {}
+        self._states = {}
+        self.real_writes = 0      # 实际写入的通道数
+        self.elided_writes = 0    # 因电平未变化而跳过的通道数
+        self.output_calls = 0     # 对底层 output 的调用次数
+        self.tracer = None        # GPIOTracer，记录每次实际写入
+        self.blocked_writes = 0   # 因通道被锁定而丢弃的通道数
+        self._latched = {}        # 锁定的通道 -> 电平
+        self._lock = threading.Lock()  # 保护影子电平、锁定状态、底层写入和计数
+
+    def __getattr__(self, name):
+        return getattr(self._gpio, name)
+
+    @property
+    def backend(self):
+        """被包装的 GPIO 后端"""
+        return self._gpio
+
+    def setup(self, channels, direction, *args, **kwargs):
+        """同 GPIO.setup；指定 initial 时记录为影子电平，否则影子电平失效"""
+        with self._lock:
+            self._gpio.setup(channels, direction, *args, **kwargs)
+            initial = kwargs.get("initial")
+            for channel in _as_list(channels):
+                if direction == self._gpio.OUT and initial is not None:
+                    self._levels[channel] = 1 if initial else 0
+                else:
+                    self._levels.pop(channel, None)
+
+    def output(self, channels, values, force=False):
+        """
+        写入一个或多个通道，只写入电平与影子寄存器不同的通道（合并为一次底层调用）。
+        :param channels: 通道或通道列表
+        :param values: 电平，单个值（所有通道相同）或与通道一一对应的列表
+        :param force: 忽略影子寄存器，全部写入
+        """
+        with self._lock:
+            self._output(channels, values, force)
+
+    def _output(self, channels, values, force):
+        levels = self._levels
+        latched = self._latched
+        if not isinstance(channels, (list, tuple)):
+            level = 1 if values else 0
+            if latched and latched.get(channels, level) != level:
+                self.blocked_writes += 1
+                return
+            if not force and levels.get(channels) == level:
+                self.elided_writes += 1
+                return
+            self._gpio.output(channels, level)
+            if self.tracer is not None:
+                self.tracer.record((channels,), (level,))
+            levels[channels] = level
+            self.real_writes += 1
+            self.output_calls += 1
+            return
+
+        if not isinstance(values, (list, tuple)):
+            values = [values] * len(channels)
+        changed_channels = []
+        changed_levels = []
+        blocked = 0
+        for channel, value in zip(channels, values):
+            level = 1 if value else 0
+            if latched and latched.get(channel, level) != level:
+                blocked += 1
+            elif force or levels.get(channel) != level:
+                changed_channels.append(channel)
+                changed_levels.append(level)
+        self.blocked_writes += blocked
+        self.elided_writes += len(channels) - len(changed_channels) - blocked
+        if not changed_channels:
+            return
+        if len(changed_channels) == 1:
+            self._gpio.output(changed_channels[0], changed_levels[0])
+        else:
+            self._gpio.output(changed_channels, changed_levels)
+        if self.tracer is not None:
+            self.tracer.record(changed_channels, changed_levels)
+        for channel, level in zip(changed_channels, changed_levels):
+            levels[channel] = level
+        self.real_writes += len(changed_channels)
+        self.output_calls += 1
+
+    def latch(self, channels, level):
+        """
+        强制写入并锁定通道电平：锁定期间写入其他电平的请求被丢弃，直到 unlatch()。
+        :param channels: 通道或通道列表
+        :param level: 锁定的电平
+        """
+        channels = _as_list(channels)
+        level = 1 if level else 0
+        with self._lock:
+            for channel in channels:
+                self._latched[channel] = level
+            self._output(channels, [level] * len(channels), True)
+
+    def unlatch(self, channels=None):
+        """解除通道锁定（None 表示全部通道）"""
+        with self._lock:
+            if channels is None:
+                self._latched.clear()
+            else:
+                for channel in _as_list(channels):
+                    self._latched.pop(channel, None)
+
+    def latched(self):
+        """锁定的通道 {通道: 电平}"""
+        with self._lock:
+            return dict(self._latched)
+
+    def define_state(self, name, levels):
+        """
+        定义命名的多管脚状态。
+        :param name: 状态名称
+        :param levels: dict {通道: 电平}
+        """
+        self._states[name] = (list(levels), [1 if v else 0 for v in levels.values()])
+
+    def set_state(self, name, force=False):
+        """一次切换到命名状态（只写入需要变化的通道）"""
+        if name not in self._states:
+            raise ValueError(f"未定义的GPIO状态: {name}，可选: {tuple(self._states)}")
+        channels, levels = self._states[name]
+        self.output(channels, levels, force)
+
+    def states(self):
+        """已定义的命名状态 {状态名: {通道: 电平}}"""
+        return {name: dict(zip(channels, levels)) for name, (channels, levels) in self._states.items()}
+
+    def levels(self):
+        """影子寄存器中全部已知电平 {通道: 电平}"""
+        with self._lock:
+            return dict(self._levels)
+
+    def level(self, channel):
+        """影子寄存器中的电平，未知时为 None"""
+        return self._levels.get(channel)
+
+    def invalidate(self, channels=None):
+        """使影子电平失效（None 表示全部通道），下一次写入必定执行"""
+        with self._lock:
+            if channels is None:
+                self._levels.clear()
+            else:
+                for channel in _as_list(channels):
+                    self._levels.pop(channel, None)
+
+    def cleanup(self, *args, **kwargs):
+        """同 GPIO.cleanup，被清理通道的影子电平失效"""
+        with self._lock:
+            self._gpio.cleanup(*args, **kwargs)
+        channels = args[0] if args else kwargs.get("channel")
+        self.invalidate(channels)
+
+    def stats(self):
+        """
+        写入统计。
+        :return: dict, real_writes/elided_writes/blocked_writes/output_calls/elided_ratio
+        """
+        total = self.real_writes + self.elided_writes
+        return {
+            "real_writes": self.real_writes,
+            "elided_writes": self.elided_writes,
+            "blocked_writes": self.blocked_writes,
+            "output_calls": self.output_calls,
+            "elided_ratio": round(self.elided_writes / total, 3) if total else 0.0
+        }
+
+    def reset_stats(self):
+        self.real_writes = 0
+        self.elided_writes = 0
+        self.blocked_writes = 0
+        self.output_calls = 0
+
+
+# 全部模块共用的 GPIO 实例
+GPIO = ShadowGPIO(load_backend())
+
+
+if __name__ == "__main__":
+    # 在模拟GPIO上重放一次振捣点位的指示灯切换序列，比较写入次数
+    # 用法（在 smart_vibrator 目录下）: python -m utils.gpio_shadow
+    from utils import mock_gpio
+
+    mock_gpio.setmode(mock_gpio.BCM)
+    mock_gpio.setup([17, 18], mock_gpio.OUT)
+    shadow = ShadowGPIO(mock_gpio)
+    states = {"off": {17: 1, 18: 0}, "green": {17: 1, 18: 1}, "red": {17: 0, 18: 0}}
+    for name, levels in states.items():
+        shadow.define_state(name, levels)
+
+    # control_devices 的调用顺序：每次切换前先 all_leds_off + buzzer_off
+    sequence = ["off", "green", "off", "red", "off", "green", "off"]
+    for name in sequence:
+        for state in ("off", name):
+            for channel, level in states[state].items():
+                mock_gpio.output(channel, level)
+        mock_gpio.output(17, 1 if name != "red" else 0)
+    direct = mock_gpio.write_count
+
+    mock_gpio.write_count = 0
+    for name in sequence:
+        shadow.set_state("off")
+        shadow.set_state(name)
+        shadow.output(17, 1 if name != "red" else 0)
+    print(f"逐管脚直接写入: {direct} 次")
+    print(f"影子寄存器: 实际写入 {mock_gpio.write_count} 次, {shadow.stats()}")
+    assert mock_gpio.levels == {17: 1, 18: 0}
+
+    # 两个线程（如两个振捣头，或振捣头与急停线程）同时向同一管脚写入相反电平，每轮结束后影子电平必须与管脚一致；
+    # 实际后端在写入的系统调用中释放 GIL，这里在写入后让出线程，重现管脚与影子电平更新之间的交错（不加锁时约3%的轮次不一致）
+    import time
+    from types import SimpleNamespace
+
+    def yielding_output(channels, values):
+        mock_gpio.output(channels, values)
+        time.sleep(0)
+
+    shadow = ShadowGPIO(SimpleNamespace(output=yielding_output))
+    rounds = 1000
+    barrier = threading.Barrier(2)
+    mismatched = []
+
+    def writer(level):
+        for _ in range(rounds):
+            barrier.wait()
+            shadow.output([17], [level])
+            if barrier.wait() == 0:
+                mismatched.append(shadow.level(17) != mock_gpio.levels[17])
+                shadow.invalidate()
+            barrier.wait()
+
+    threads = [threading.Thread(target=writer, args=(level,)) for level in (0, 1)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not any(mismatched), f"并发写入后影子电平与管脚不一致: {sum(mismatched)}/{rounds} 轮"
+    print(f"并发写入 {rounds} 轮，影子电平与管脚一致")
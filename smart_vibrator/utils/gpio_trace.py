@@ -0,0 +1,433 @@
+"""
+gpio_trace.py
+GPIO 写入跟踪模块
+启用后（配置 gpio_trace.enabled 或调用 start_trace），影子寄存器每次实际写入 GPIO 时，
+把 (时刻 monotonic_ns, 通道, 电平) 放入预先分配的环形缓冲区：写入线程只做一次时钟读取和几次列表元素赋值
+（不创建新的对象，不增加垃圾回收的负担），
+后台线程定期取出缓冲区中的记录，展开为定长二进制记录追加到跟踪文件。
+缓冲区写满（后台线程来不及取出）时覆盖最旧的记录，并统计丢失数。
+
+文件格式:
+    文件头 (HEADER, 24字节): 魔数 b"SVT1", 记录长度, 保留, 开始时刻 monotonic_ns, 开始时间 unix s
+    记录   (EVENT_DTYPE, 11字节): 时刻 int64 ns, 通道 uint16, 电平 uint8
+    同名 .json 文件记录各电机的管脚和指示灯状态定义，供离线分析使用
+
+离线分析（analyze_trace）：按电机管脚重建每一步的时刻，统计连续运行段的步进速率、
+每一相停留时间的分布，以及LED/蜂鸣器的状态时间线。
+用法（在 smart_vibrator 目录下）: python -m utils.gpio_trace [跟踪文件]
+"""
+import itertools
+import json
+import os
+import struct
+import threading
+import time
+
+import numpy as np
+
+from utils.config import get_config
+
+MAGIC = b"SVT1"
+HEADER = struct.Struct("<4sHHqd")
+EVENT_DTYPE = np.dtype([("t_ns", "<i8"), ("channel", "<u2"), ("level", "u1")])
+
+# 环形缓冲区默认容量（GPIO 写入调用次数，须为2的幂）
+DEFAULT_CAPACITY = 1 << 16
+
+# 两步之间的间隔超过该值 (ns) 时视为新的一段运行
+RUN_GAP_NS = 100_000_000
+
+
+class GPIOTracer:
+    """
+    GPIO 写入跟踪器。
+    :param path: 跟踪文件路径
+    :param capacity: 环形缓冲区容量（写入调用次数），向上取整为2的幂
+    :param flush_interval_s: 后台线程写文件的间隔 (s)
+    :param metadata: dict，写入同名 .json 文件（电机管脚 motors、指示灯状态 states 等）
+    """
+
+    def __init__(self, path, capacity=DEFAULT_CAPACITY, flush_interval_s=0.5, metadata=None):
+        self.path = path
+        capacity = 1 << max(1, int(capacity) - 1).bit_length()
+        self._mask = capacity - 1
+        # 环形缓冲区：各槽的序号、时刻、通道列表、电平列表（序号最后写入，表示该槽已写完）
+        self._seqs = [-1] * capacity
+        self._times = [0] * capacity
+        self._channels = [None] * capacity
+        self._levels = [None] * capacity
+        self._sequence = itertools.count()     # next() 在 CPython 中是原子操作，多个线程写入不会占用同一个槽
+        self._clock = time.monotonic_ns
+        self._next = 0                         # 后台线程下一次读取的序号
+        self.flush_interval_s = flush_interval_s
+        self.metadata = dict(metadata or {})
+        self.events = 0         # 已写入文件的记录数（按通道计）
+        self.dropped = 0        # 缓冲区溢出丢失的写入调用数
+        self._file = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def capacity(self):
+        return self._mask + 1
+
+    def record(self, channels, levels):
+        """
+        记录一次写入（由影子寄存器在实际写入后调用）。
+        :param channels: 通道列表
+        :param levels: 与通道一一对应的电平列表
+        """
+        seq = next(self._sequence)
+        slot = seq & self._mask
+        self._times[slot] = self._clock()
+        self._channels[slot] = channels
+        self._levels[slot] = levels
+        self._seqs[slot] = seq
+
+    def start(self, background=True):
+        """
+        创建跟踪文件并启动后台写文件线程。
+        :param background: 为 False 时不启动后台线程，由调用方调用 flush
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._file = open(self.path, "wb")
+        self._file.write(HEADER.pack(MAGIC, EVENT_DTYPE.itemsize, 0, time.monotonic_ns(), time.time()))
+        self.write_metadata()
+        self._stop.clear()
+        if background:
+            self._thread = threading.Thread(target=self._run, name="gpio-trace", daemon=True)
+            self._thread.start()
+        return self
+
+    def add_motors(self, motors):
+        """
+        补充电机管脚（如启动跟踪之后才初始化的振捣头），停止时写入 .json 文件。
+        :param motors: dict {电机名称: 管脚列表}
+        """
+        self.metadata.setdefault("motors", {}).update({name: list(pins) for name, pins in motors.items()})
+
+    def write_metadata(self):
+        with open(self.path + ".json", "w", encoding="utf-8") as f:
+            json.dump(self.metadata, f, ensure_ascii=False, indent=2)
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval_s):
+            self.flush()
+
+    def _drain(self):
+        """
+        取出缓冲区中尚未写入的记录（从下一个序号开始的连续序号）。
+        :return: tuple (时刻列表, 通道列表的列表, 电平列表的列表)
+        """
+        start = self._next & self._mask
+
+        def rotated(items):
+            return items[start:] + items[:start]
+
+        seqs = np.array(rotated(self._seqs), dtype=np.int64)
+        if seqs[0] < self._next:
+            return [], [], []
+        if seqs[0] > self._next:
+            # 写入方已绕过一圈，覆盖了未取出的记录
+            self.dropped += int(seqs[0]) - self._next
+            self._next = int(seqs[0])
+        valid = seqs == self._next + np.arange(len(seqs))
+        count = len(seqs) if valid.all() else int(np.argmin(valid))
+        self._next += count
+        return rotated(self._times)[:count], rotated(self._channels)[:count], rotated(self._levels)[:count]
+
+    def flush(self):
+        """
+        将缓冲区中的记录展开为每个通道一条，追加到跟踪文件。
+        :return: 写入的记录数
+        """
+        with self._lock:
+            if self._file is None:
+                return 0
+            times, channels, levels = self._drain()
+            if not times:
+                return 0
+            counts = np.fromiter(map(len, channels), np.int64, len(channels))
+            total = int(counts.sum())
+            records = np.empty(total, dtype=EVENT_DTYPE)
+            records["t_ns"] = np.repeat(np.array(times, dtype=np.int64), counts)
+            records["channel"] = np.fromiter(itertools.chain.from_iterable(channels), np.uint16, total)
+            records["level"] = np.fromiter(itertools.chain.from_iterable(levels), np.uint8, total)
+            records.tofile(self._file)
+            self._file.flush()
+            self.events += total
+            return total
+
+    def stop(self):
+        """停止后台线程，写入剩余记录并关闭文件"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+        with self._lock:
+            if self._file is not None:
+                self.metadata.update(events=self.events, dropped=self.dropped)
+                self.write_metadata()
+                os.fsync(self._file.fileno())
+                self._file.close()
+                self._file = None
+
+
+def default_trace_path():
+    """默认跟踪文件路径 <配置目录>/gpio_trace_<时间>.svt"""
+    config = get_config().get("gpio_trace", {})
+    directory = config.get("dir") or os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                                  "output")
+    return os.path.join(directory, time.strftime("gpio_trace_%Y%m%d_%H%M%S.svt"))
+
+
+def start_trace(gpio, path=None, motors=None):
+    """
+    开始跟踪影子寄存器 GPIO 的写入。
+    :param gpio: ShadowGPIO
+    :param path: 跟踪文件路径，None 时使用 default_trace_path()
+    :param motors: dict {电机名称: 管脚列表}，供离线分析重建步进
+    :return: GPIOTracer
+    """
+    if gpio.tracer is not None:
+        return gpio.tracer
+    config = get_config().get("gpio_trace", {})
+    metadata = {"motors": {name: list(pins) for name, pins in (motors or {}).items()},
+                "states": {name: {str(channel): level for channel, level in levels.items()}
+                           for name, levels in gpio.states().items()}}
+    tracer = GPIOTracer(path or default_trace_path(), config.get("capacity", DEFAULT_CAPACITY),
+                        config.get("flush_interval_s", 0.5), metadata).start()
+    # 开始时各通道的电平（影子寄存器中已知的部分）作为第一条记录，时间线从已知状态开始
+    levels = gpio.levels()
+    if levels:
+        tracer.record(list(levels), list(levels.values()))
+    gpio.tracer = tracer
+    return tracer
+
+
+def stop_trace(gpio):
+    """
+    停止跟踪并关闭跟踪文件。
+    :return: GPIOTracer 或 None（未在跟踪）
+    """
+    tracer, gpio.tracer = gpio.tracer, None
+    if tracer is not None:
+        tracer.stop()
+    return tracer
+
+
+def read_trace(path):
+    """
+    读取跟踪文件。
+    :return: tuple (dict 文件头信息与 .json 元数据, EVENT_DTYPE 记录数组)
+    """
+    with open(path, "rb") as f:
+        magic, record_size, _, start_ns, start_unix = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or record_size != EVENT_DTYPE.itemsize:
+            raise ValueError(f"不是有效的GPIO跟踪文件: {path}")
+        data = f.read()
+    records = np.frombuffer(data[:len(data) // record_size * record_size], dtype=EVENT_DTYPE)
+    info = {"start_ns": start_ns, "start_unix": start_unix, "motors": {}, "states": {}}
+    if os.path.exists(path + ".json"):
+        with open(path + ".json", "r", encoding="utf-8") as f:
+            info.update(json.load(f))
+    return info, records
+
+
+def channel_states(records, channels):
+    """
+    多个通道的组合电平随时间的变化。
+    :param records: 跟踪记录
+    :param channels: 通道列表
+    :return: tuple (时刻ns 数组, 各时刻之后的电平矩阵 (时刻数, 通道数)，未写入过的通道为 -1)
+    """
+    selected = records[np.isin(records["channel"], channels)]
+    times = np.unique(selected["t_ns"])
+    levels = np.full((len(times), len(channels)), -1, dtype=np.int8)
+    for column, channel in enumerate(channels):
+        events = selected[selected["channel"] == channel]
+        last = np.searchsorted(events["t_ns"], times, side="right") - 1
+        levels[:, column] = np.where(last >= 0, events["level"][np.maximum(last, 0)], -1)
+    return times, levels
+
+
+def motor_steps(records, pins):
+    """
+    按电机管脚重建每一步（相位变化）的时刻。
+    :return: int64 数组，每一相开始输出的时刻 (ns)
+    """
+    times, levels = channel_states(records, list(pins))
+    if not len(times):
+        return times
+    changed = np.concatenate(([True], (np.diff(levels, axis=0) != 0).any(axis=1)))
+    # 全部管脚置低（线圈断电）不算一步
+    energized = (levels > 0).any(axis=1)
+    return times[changed & energized]
+
+
+def step_runs(step_times, gap_ns=RUN_GAP_NS):
+    """
+    按间隔将步进时刻划分为连续运行段。
+    :return: 列表，每段一个 dict（start_ns/steps/duration_s/rate_hz）
+    """
+    if not len(step_times):
+        return []
+    breaks = np.flatnonzero(np.diff(step_times) > gap_ns) + 1
+    runs = []
+    for segment in np.split(step_times, breaks):
+        duration_ns = int(segment[-1] - segment[0])
+        runs.append({"start_ns": int(segment[0]), "steps": len(segment), "duration_s": duration_ns / 1e9,
+                     "rate_hz": (len(segment) - 1) * 1e9 / duration_ns if duration_ns > 0 else 0.0})
+    return runs
+
+
+def state_timeline(records, states):
+    """
+    指示灯/蜂鸣器的状态时间线。
+    :param states: dict {状态名: {通道: 电平}}（影子寄存器定义的命名状态）
+    :return: 列表 [(开始ns, 结束ns, 状态名)]，不符合任何命名状态时状态名为各通道电平
+    """
+    channels = sorted({int(channel) for levels in states.values() for channel in levels})
+    if not channels:
+        return []
+    names = {tuple(int(levels.get(str(c), levels.get(c, -1))) for c in channels): name
+             for name, levels in states.items()}
+    times, levels = channel_states(records, channels)
+    if not len(times):
+        return []
+    changed = np.concatenate(([True], (np.diff(levels, axis=0) != 0).any(axis=1)))
+    starts = times[changed]
+    codes = levels[changed]
+    ends = np.append(starts[1:], records["t_ns"][-1])
+    return [(int(start), int(end), names.get(tuple(code.tolist()), str(tuple(code.tolist()))))
+            for start, end, code in zip(starts, ends, codes)]
+
+
+def analyze_trace(info, records, gap_ns=RUN_GAP_NS):
+    """
+    分析跟踪记录。
+    :param info: read_trace 的文件头信息（motors/states）
+    :param records: 跟踪记录
+    :return: dict, motors（各电机的运行段和每相停留时间）/timeline/state_time_s
+    """
+    result = {"events": len(records), "duration_s": 0.0, "motors": {}, "timeline": [], "state_time_s": {}}
+    if not len(records):
+        return result
+    result["duration_s"] = (int(records["t_ns"][-1]) - int(records["t_ns"][0])) / 1e9
+    for name, pins in info.get("motors", {}).items():
+        steps = motor_steps(records, pins)
+        runs = step_runs(steps, gap_ns)
+        # 每相停留时间只统计运行段内的间隔
+        dwell = np.diff(steps)
+        dwell_us = dwell[dwell <= gap_ns] / 1000
+        result["motors"][name] = {"steps": len(steps), "runs": runs, "dwell_us": dwell_us}
+    timeline = state_timeline(records, info.get("states", {}))
+    result["timeline"] = timeline
+    for start, end, name in timeline:
+        result["state_time_s"][name] = result["state_time_s"].get(name, 0.0) + (end - start) / 1e9
+    return result
+
+
+def print_analysis(info, analysis, show=5, bins=10):
+    """打印分析结果"""
+    origin = info.get("start_ns", 0)
+    print(f"\n=== GPIO跟踪分析: {analysis['events']} 条记录, {analysis['duration_s']:.2f} 秒"
+          f"{', 丢失 %d 次写入' % info['dropped'] if info.get('dropped') else ''} ===")
+    for name, motor in analysis["motors"].items():
+        runs = motor["runs"]
+        print(f"[{name}] {motor['steps']} 步, {len(runs)} 段运行")
+        for run in runs[:show]:
+            print(f"  {(run['start_ns'] - origin) / 1e9:9.3f} s: {run['steps']} 步, {run['duration_s']:.3f} 秒, "
+                  f"{run['rate_hz']:.1f} 步/秒")
+        dwell = motor["dwell_us"]
+        if len(dwell):
+            print(f"  每相停留 p50/p99/max: {np.percentile(dwell, 50):.0f}/{np.percentile(dwell, 99):.0f}/"
+                  f"{dwell.max():.0f} us")
+            counts, edges = np.histogram(dwell, bins=bins)
+            width = max(counts.max(), 1)
+            for count, low, high in zip(counts, edges[:-1], edges[1:]):
+                print(f"    {low:9.0f} ~ {high:9.0f} us | {'#' * int(round(40 * count / width)):<40} {count}")
+    if analysis["timeline"]:
+        print("[指示灯/蜂鸣器] " + ", ".join(f"{name} {seconds:.2f} 秒"
+                                          for name, seconds in analysis["state_time_s"].items()))
+        for start, end, name in analysis["timeline"][:show * 2]:
+            print(f"  {(start - origin) / 1e9:9.3f} ~ {(end - origin) / 1e9:9.3f} s: {name}")
+
+
+if __name__ == "__main__":
+    # 指定文件时分析跟踪文件；否则在模拟GPIO上测量跟踪开销，并跟踪一段振捣和指示灯切换后检查分析结果
+    # 用法（在 smart_vibrator 目录下）: python -m utils.gpio_trace [跟踪文件]
+    import sys
+    import tempfile
+    from utils import mock_gpio
+    from utils.gpio_shadow import ShadowGPIO
+    from utils.step_scheduler import run_steps
+    from utils.stepper_driver import StepperDriver
+
+    if len(sys.argv) > 1:
+        trace_info, trace_records = read_trace(sys.argv[1])
+        print_analysis(trace_info, analyze_trace(trace_info, trace_records))
+        sys.exit(0)
+
+    mock_gpio.setmode(mock_gpio.BCM)
+    gpio = ShadowGPIO(mock_gpio)
+    driver = StepperDriver(gpio, (5, 6, 12, 13))
+    driver.setup()
+    gpio.setup([17, 27], gpio.OUT)
+    gpio.define_state("off", {17: 1, 27: 0})
+    gpio.define_state("green", {17: 1, 27: 1})
+    gpio.define_state("red", {17: 0, 27: 0})
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.svt")
+        step = driver.step_function('c')
+        count = 50_000
+
+        # 写入线程的开销：同一组相位写入在有无跟踪时的耗时差（取多次中的最小值，减少调度干扰）
+        def timed(tracer=None):
+            gpio.tracer = tracer
+            begin = time.perf_counter_ns()
+            for k in range(count):
+                step(k)
+            elapsed = time.perf_counter_ns() - begin
+            gpio.tracer = None
+            return elapsed
+
+        base_ns, record_ns, flush_ns, events = [], [], [], 0
+        for _ in range(9):
+            tracer = GPIOTracer(path, capacity=count)
+            base_ns.append(timed())
+            record_ns.append(timed(tracer.start(background=False)))
+            # 后台线程的开销：取出并写入文件
+            begin = time.perf_counter_ns()
+            events = tracer.flush()
+            flush_ns.append(time.perf_counter_ns() - begin)
+            tracer.stop()
+        # 每条记录为一个通道的一次电平变化（全步相序每一相有两个管脚变化）
+        record_per_event = (min(record_ns) - min(base_ns)) / events
+        flush_per_event = min(flush_ns) / events
+        print(f"跟踪开销: 写入线程 {record_per_event:.0f} ns/条, 后台写文件 {flush_per_event:.0f} ns/条 "
+              f"({events} 条记录)")
+
+        # 跟踪一段 500 步/秒的运行和指示灯切换，分析结果应与计划一致
+        driver.release()
+        start_trace(gpio, path, {"motor": driver.pins})
+        gpio.set_state("green")
+        run_steps(step, 500, 2_000_000)
+        time.sleep(0.2)
+        gpio.set_state("red")
+        run_steps(driver.step_function('a'), 250, 4_000_000)
+        driver.release()
+        gpio.set_state("off")
+        stop_trace(gpio)
+        trace_info, trace_records = read_trace(path)
+        analysis = analyze_trace(trace_info, trace_records)
+        print_analysis(trace_info, analysis)
+        runs = analysis["motors"]["motor"]["runs"]
+        assert [run["steps"] for run in runs] == [500, 250]
+        assert abs(runs[0]["rate_hz"] - 500) < 25 and abs(runs[1]["rate_hz"] - 250) < 12.5
+        assert [name for _, _, name in analysis["timeline"]] == ["green", "red", "off"]
+    # 写入线程（电机/指示灯控制）的开销须在 1 us 以内
+    assert record_per_event < 1000, f"跟踪开销 {record_per_event:.0f} ns 超过 1 us"
@@ -1,10 +1,17 @@
-import Jetson.GPIO as GPIO
 import time
 
+# 经影子寄存器写入，电平未变化的写入直接跳过
+from utils.gpio_shadow import GPIO
+
 # 修改为BCM模式下的引脚编号
 pin_R = 17  # 红色LED, BCM 17, 与蜂鸣器共享, 假设低电平亮
 pin_G = 18  # 绿色LED, BCM 18, 假设高电平亮
 
+# 指示灯状态：两个管脚一次切换到位（红灯低电平亮，绿灯高电平亮；红灯与蜂鸣器共用 BCM 17）
+GPIO.define_state("off", {pin_R: GPIO.HIGH, pin_G: GPIO.LOW})
+GPIO.define_state("green", {pin_R: GPIO.HIGH, pin_G: GPIO.HIGH})
+GPIO.define_state("red", {pin_R: GPIO.LOW, pin_G: GPIO.LOW})
+
 def setup_led():
     '''初始化双色LED引脚（适用于Jetson Nano）'''
     # GPIO模式应由主程序或更高级别的模块统一设置，这里不再重复设置
@@ -16,36 +23,27 @@ def setup_led():
     GPIO.setup(pin_R, GPIO.OUT)
     GPIO.setup(pin_G, GPIO.OUT)
     
-    # 初始状态：确保所有LED都关闭
-    # 红灯低电平亮，所以要输出高电平关闭
-    GPIO.output(pin_R, GPIO.HIGH)
-    # 绿灯高电平亮，所以要输出低电平关闭
-    GPIO.output(pin_G, GPIO.LOW)
+    # 初始状态：确保所有LED都关闭（红灯输出高电平关闭，绿灯输出低电平关闭）
+    GPIO.set_state("off")
     
     print(f"双色LED初始化完成（Jetson Nano模式）。红色: Pin BCM-{pin_R} (设为HIGH关闭), 绿色: Pin BCM-{pin_G} (设为LOW关闭)")
 
 def green_on():
     '''打开绿色LED，关闭红色LED'''
-    # 关闭红色LED (红灯低电平亮 -> HIGH关闭)
-    GPIO.output(pin_R, GPIO.HIGH)
-    # 打开绿色LED (绿灯高电平亮 -> HIGH打开)
-    GPIO.output(pin_G, GPIO.HIGH)
+    # 红色 HIGH 关闭，绿色 HIGH 打开
+    GPIO.set_state("green")
     # print("绿色LED亮起, 红色LED熄灭")
 
 def red_on(): # 这个函数现在同时意味着蜂鸣器响
     '''打开红色LED，关闭绿色LED'''
-    # 关闭绿色LED (绿灯高电平亮 -> LOW关闭)
-    GPIO.output(pin_G, GPIO.LOW)
-    # 打开红色LED (红灯低电平亮 -> LOW打开)
-    GPIO.output(pin_R, GPIO.LOW)
+    # 绿色 LOW 关闭，红色 LOW 打开
+    GPIO.set_state("red")
     # print("红色LED亮起, 绿色LED熄灭")
 
 def all_leds_off():
     '''关闭所有LED'''
-    # 关闭红色LED (红灯低电平亮 -> HIGH关闭)
-    GPIO.output(pin_R, GPIO.HIGH)
-    # 关闭绿色LED (绿灯高电平亮 -> LOW关闭)
-    GPIO.output(pin_G, GPIO.LOW)
+    # 红色 HIGH 关闭，绿色 LOW 关闭
+    GPIO.set_state("off")
     # print("所有LED已关闭")
 
 def cleanup_led():
@@ -55,6 +53,7 @@ def cleanup_led():
     print("LED GPIO已设置为关闭状态，等待主程序统一cleanup")
 
 if __name__ == "__main__":
+    # 用法（在 smart_vibrator 目录下）: python -m utils.led_control
     try:
         GPIO.setmode(GPIO.BCM) # __main__ 测试时需要设置模式
         setup_led()
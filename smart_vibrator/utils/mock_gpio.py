@@ -0,0 +1,167 @@
+"""
+mock_gpio.py
+内存模拟GPIO模块
+提供与 Jetson.GPIO 相同的常用接口（setmode/setup/output/input/cleanup），只在内存中记录各通道电平，
+用于无硬件环境下的测试和性能基准。output 与 Jetson.GPIO 一样支持单个通道或通道列表。
+trace 设为列表时，每次写入追加 (时刻ns, 通道, 电平)，时刻由 clock() 给出（模拟器替换为虚拟时钟）。
+边沿检测（add_event_detect）与 Jetson.GPIO 一样在独立的事件线程中调用回调；
+测试时用 set_input 改变输入通道的电平以产生边沿。
+"""
+import queue
+import threading
+import time
+
+BCM = 11
+BOARD = 10
+OUT = 0
+IN = 1
+HIGH = 1
+LOW = 0
+PUD_OFF = 20
+PUD_DOWN = 21
+PUD_UP = 22
+RISING = 31
+FALLING = 32
+BOTH = 33
+
+_mode = None
+_directions = {}
+_events = {}          # 通道 -> {"edge", "callbacks", "detected"}
+_event_queue = queue.SimpleQueue()
+_event_thread = None
+
+# 各通道当前电平
+levels = {}
+
+# 实际执行的单通道写入次数
+write_count = 0
+
+# 写入记录（None 表示不记录）及记录时刻使用的时钟
+trace = None
+clock = time.monotonic_ns
+
+
+def setmode(mode):
+    global _mode
+    _mode = mode
+
+
+def getmode():
+    return _mode
+
+
+def setwarnings(state):
+    pass
+
+
+def setup(channels, direction, initial=None, pull_up_down=None):
+    if not isinstance(channels, (list, tuple)):
+        channels = [channels]
+    for channel in channels:
+        _directions[channel] = direction
+        if direction == OUT and initial is not None:
+            levels[channel] = HIGH if initial else LOW
+        elif direction == IN and pull_up_down in (PUD_UP, PUD_DOWN):
+            levels[channel] = HIGH if pull_up_down == PUD_UP else LOW
+
+
+def output(channels, values):
+    """写入一个或多个通道；values 可为单个值（所有通道相同）或与通道一一对应的列表"""
+    global write_count
+    if not isinstance(channels, (list, tuple)):
+        channels = [channels]
+    if not isinstance(values, (list, tuple)):
+        values = [values] * len(channels)
+    elif len(values) != len(channels):
+        raise RuntimeError("通道数与电平数不一致")
+    for channel, value in zip(channels, values):
+        if _directions.get(channel) != OUT:
+            raise RuntimeError(f"通道 {channel} 未设置为输出模式")
+        levels[channel] = HIGH if value else LOW
+    write_count += len(channels)
+    if trace is not None:
+        now = clock()
+        trace.extend((now, channel, levels[channel]) for channel in channels)
+
+
+def input(channel):
+    if channel not in _directions:
+        raise RuntimeError(f"通道 {channel} 未初始化")
+    return levels.get(channel, LOW)
+
+
+def _dispatch_events():
+    while True:
+        channel = _event_queue.get()
+        event = _events.get(channel)
+        if event is not None:
+            for callback in list(event["callbacks"]):
+                callback(channel)
+
+
+def add_event_detect(channel, edge, callback=None, bouncetime=None):
+    global _event_thread
+    if _directions.get(channel) != IN:
+        raise RuntimeError(f"通道 {channel} 未设置为输入模式")
+    if channel in _events:
+        raise RuntimeError(f"通道 {channel} 已启用边沿检测")
+    _events[channel] = {"edge": edge, "callbacks": [callback] if callback else [], "detected": False}
+    if _event_thread is None:
+        _event_thread = threading.Thread(target=_dispatch_events, name="mock-gpio-events", daemon=True)
+        _event_thread.start()
+
+
+def add_event_callback(channel, callback):
+    if channel not in _events:
+        raise RuntimeError(f"通道 {channel} 未启用边沿检测")
+    _events[channel]["callbacks"].append(callback)
+
+
+def remove_event_detect(channel):
+    _events.pop(channel, None)
+
+
+def event_detected(channel):
+    event = _events.get(channel)
+    if event is None or not event["detected"]:
+        return False
+    event["detected"] = False
+    return True
+
+
+def set_input(channel, value):
+    """（测试用）设置输入通道的电平，符合边沿检测条件时在事件线程中调用回调"""
+    if _directions.get(channel) != IN:
+        raise RuntimeError(f"通道 {channel} 未设置为输入模式")
+    old = levels.get(channel, LOW)
+    new = HIGH if value else LOW
+    levels[channel] = new
+    event = _events.get(channel)
+    if event is None or old == new:
+        return
+    if event["edge"] == BOTH or event["edge"] == (RISING if new == HIGH else FALLING):
+        event["detected"] = True
+        _event_queue.put(channel)
+
+
+def cleanup(channels=None):
+    global _mode
+    if channels is None:
+        _directions.clear()
+        levels.clear()
+        _events.clear()
+        _mode = None
+        return
+    if not isinstance(channels, (list, tuple)):
+        channels = [channels]
+    for channel in channels:
+        _directions.pop(channel, None)
+        levels.pop(channel, None)
+        _events.pop(channel, None)
+
+
+def reset():
+    """清空全部状态和计数（测试用）"""
+    global write_count
+    cleanup()
+    write_count = 0
@@ -0,0 +1,118 @@
+"""
+motion_profile.py
+步进电机梯形加减速曲线模块
+按 David Austin 的步进间隔递推算法（"Generate stepper-motor speed profiles in real time"）预先计算每一步的间隔：
+    c0 = 0.676 * sqrt(2 / a)            （a 为加速度，单位 步/秒²）
+    cn = c(n-1) - 2 * c(n-1) / (4n + 1)
+电机从静止加速到巡航速度、匀速运行、再减速停止，避免从静止直接以高速起步而失步，
+从而可以使用更高的巡航速度。结果为每一步间隔 (ns) 的数组，可直接交给 step_scheduler.run_steps。
+"""
+import numpy as np
+
+# Austin 算法首步间隔的修正系数（补偿 c0 的近似误差）
+AUSTIN_C0_FACTOR = 0.676
+
+
+def rpm_to_rate(rpm, steps_per_revolution):
+    """转速 (RPM) 换算为步进速率 (步/秒)"""
+    return rpm * steps_per_revolution / 60
+
+
+def ramp_intervals(steps, accel, cruise_rate):
+    """
+    从静止开始加速的前 steps 步的间隔，不小于巡航间隔。
+    :param steps: 加速段步数
+    :param accel: 加速度 (步/秒²)
+    :param cruise_rate: 巡航速率 (步/秒)
+    :return: 每一步间隔 (ns) 的浮点数组
+    """
+    if steps <= 0:
+        return np.empty(0)
+    n = np.arange(1, steps)
+    # cn = c(n-1) * (4n - 1) / (4n + 1) 的累乘形式
+    factors = np.concatenate(([1.0], np.cumprod((4 * n - 1) / (4 * n + 1))))
+    c0 = AUSTIN_C0_FACTOR * np.sqrt(2 / accel) * 1e9
+    return np.maximum(c0 * factors, 1e9 / cruise_rate)
+
+
+def trapezoid_intervals(steps, cruise_rate, accel, decel=None):
+    """
+    总步数固定的梯形（步数不足时为三角形）速度曲线。
+    :param steps: 总步数
+    :param cruise_rate: 巡航速率 (步/秒)
+    :param accel: 加速度 (步/秒²)
+    :param decel: 减速度 (步/秒²)，默认与加速度相同
+    :return: 每一步间隔 (ns) 的 int64 数组
+    """
+    decel = decel or accel
+    steps = int(steps)
+    if steps <= 0:
+        return np.empty(0, dtype=np.int64)
+    # 加速到巡航速度所需步数 v²/(2a)
+    accel_steps = int(np.ceil(cruise_rate ** 2 / (2 * accel)))
+    decel_steps = int(np.ceil(cruise_rate ** 2 / (2 * decel)))
+    if accel_steps + decel_steps > steps:
+        # 达不到巡航速度：按加减速度之比分配步数
+        accel_steps = int(round(steps * decel / (accel + decel)))
+        decel_steps = steps - accel_steps
+    up = ramp_intervals(accel_steps, accel, cruise_rate)
+    down = ramp_intervals(decel_steps, decel, cruise_rate)[::-1]
+    cruise = np.full(steps - accel_steps - decel_steps, 1e9 / cruise_rate)
+    return np.round(np.concatenate((up, cruise, down))).astype(np.int64)
+
+
+def duration_intervals(duration_s, cruise_rate, accel, decel=None):
+    """
+    运行时间固定的速度曲线：在 duration_s 内完成加速、巡航和减速，返回总时长不超过 duration_s 的最多步数。
+    :param duration_s: 运行时间 (s)
+    其余参数同 trapezoid_intervals
+    :return: 每一步间隔 (ns) 的 int64 数组
+    """
+    budget_ns = duration_s * 1e9
+    if budget_ns <= 0:
+        return np.empty(0, dtype=np.int64)
+    decel = decel or accel
+    ramp_steps = int(np.ceil(cruise_rate ** 2 / (2 * accel))) + int(np.ceil(cruise_rate ** 2 / (2 * decel)))
+    full = trapezoid_intervals(ramp_steps, cruise_rate, accel, decel)
+    if full.sum() <= budget_ns:
+        # 能达到巡航速度：其余时间匀速运行
+        cruise_steps = int((budget_ns - full.sum()) * cruise_rate / 1e9)
+        return trapezoid_intervals(ramp_steps + cruise_steps, cruise_rate, accel, decel)
+    # 时间不足以加速到巡航速度：二分查找总时长不超过预算的最大步数
+    low, high = 0, ramp_steps
+    while low < high:
+        mid = (low + high + 1) // 2
+        if trapezoid_intervals(mid, cruise_rate, accel, decel).sum() <= budget_ns:
+            low = mid
+        else:
+            high = mid - 1
+    return trapezoid_intervals(low, cruise_rate, accel, decel)
+
+
+def profile_summary(intervals_ns):
+    """
+    速度曲线摘要。
+    :return: dict, steps/duration_s/peak_rate_hz/first_interval_ms
+    """
+    if len(intervals_ns) == 0:
+        return {"steps": 0, "duration_s": 0.0, "peak_rate_hz": 0.0, "first_interval_ms": 0.0}
+    return {
+        "steps": int(len(intervals_ns)),
+        "duration_s": round(float(np.sum(intervals_ns)) / 1e9, 4),
+        "peak_rate_hz": round(1e9 / float(np.min(intervals_ns)), 1),
+        "first_interval_ms": round(float(intervals_ns[0]) / 1e6, 3)
+    }
+
+
+if __name__ == "__main__":
+    steps_per_rev = 2048
+    accel = rpm_to_rate(60, steps_per_rev)  # 每秒加速 60 RPM
+    for rpm in (15, 30, 45):
+        rate = rpm_to_rate(rpm, steps_per_rev)
+        intervals = duration_intervals(10, rate, accel)
+        s = profile_summary(intervals)
+        print(f"{rpm} RPM 运行10秒: {s['steps']} 步, 时长 {s['duration_s']} s, "
+              f"峰值 {s['peak_rate_hz']} 步/秒, 首步间隔 {s['first_interval_ms']} ms")
+    # 短行程为三角形曲线
+    s = profile_summary(trapezoid_intervals(200, rpm_to_rate(45, steps_per_rev), accel))
+    print(f"200 步短行程: 时长 {s['duration_s']} s, 峰值 {s['peak_rate_hz']} 步/秒")
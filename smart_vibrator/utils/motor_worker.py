@@ -0,0 +1,228 @@
+"""
+motor_worker.py
+实时电机工作线程模块
+步进脉冲在独立的工作线程中产生：线程在权限允许时切换为 SCHED_FIFO 实时调度、绑定到隔离的CPU核心，
+并通过 mlockall 锁定内存避免缺页。主流程通过无锁命令队列（collections.deque 的 append/popleft
+在 CPython 中是原子操作）向工作线程提交旋转命令，日志输出、绘图等工作留在主线程，不再打断脉冲输出。
+每条命令记录每一步的实际输出时刻，统计步间隔抖动（p50/p99/max）。
+"""
+import ctypes
+import ctypes.util
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+from utils.step_scheduler import run_steps, SPIN_THRESHOLD_NS
+
+# 实时调度优先级（SCHED_FIFO 1~99）
+RT_PRIORITY = 80
+
+# mlockall 标志（<sys/mman.h>）
+MCL_CURRENT = 1
+MCL_FUTURE = 2
+
+# 实时调度下的忙等区间 (ns)：SCHED_FIFO 线程从 sleep 唤醒的延迟很小，只需短暂忙等；
+# 忙等过长会使实时线程持续占满CPU，触发内核的实时限流（默认每秒暂停50ms）
+RT_SPIN_NS = 100_000
+
+# 工作线程运行期间的解释器线程切换间隔 (s)，缩短其他线程持有 GIL 造成的延迟
+SWITCH_INTERVAL_S = 0.0005
+
+
+def isolated_cpu():
+    """
+    选择电机线程使用的CPU核心：优先使用内核参数 isolcpus 隔离的核心，否则使用当前可用的最后一个核心。
+    :return: int 或 None
+    """
+    try:
+        with open("/sys/devices/system/cpu/isolated", "r") as f:
+            text = f.read().strip()
+        if text:
+            first = text.split(",")[0]
+            return int(first.split("-")[0])
+    except (OSError, ValueError):
+        pass
+    try:
+        return max(os.sched_getaffinity(0))
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def apply_realtime_settings(cpu=None, priority=RT_PRIORITY):
+    """
+    对调用线程应用实时设置，无权限或平台不支持的项跳过。
+    :param cpu: 绑定的CPU核心，None 表示自动选择
+    :param priority: SCHED_FIFO 优先级
+    :return: dict, 各项设置是否成功 {"sched_fifo", "cpu", "mlockall"}
+    """
+    result = {"sched_fifo": False, "cpu": None, "mlockall": False}
+    try:
+        os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(priority))
+        result["sched_fifo"] = True
+    except (AttributeError, PermissionError, OSError):
+        pass
+
+    cpu = isolated_cpu() if cpu is None else cpu
+    if cpu is not None:
+        try:
+            os.sched_setaffinity(0, {cpu})
+            result["cpu"] = cpu
+        except (AttributeError, OSError):
+            pass
+
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        result["mlockall"] = libc.mlockall(MCL_CURRENT | MCL_FUTURE) == 0
+    except (OSError, AttributeError):
+        pass
+    return result
+
+
+def jitter_stats(timestamps_ns, interval_ns):
+    """
+    步间隔抖动统计：实际步间隔与目标步进间隔之差的绝对值。
+    :param timestamps_ns: 每一步的实际输出时刻 (ns)
+    :param interval_ns: 目标步进间隔 (ns)，固定值或每一步的间隔数组
+    :return: dict, p50_us/p99_us/max_us
+    """
+    if len(timestamps_ns) < 2:
+        return {"p50_us": 0.0, "p99_us": 0.0, "max_us": 0.0}
+    if np.ndim(interval_ns):
+        interval_ns = np.asarray(interval_ns, dtype=np.int64)[:len(timestamps_ns) - 1]
+    jitter = np.abs(np.diff(np.asarray(timestamps_ns, dtype=np.int64)) - interval_ns) / 1000
+    return {
+        "p50_us": round(float(np.percentile(jitter, 50)), 1),
+        "p99_us": round(float(np.percentile(jitter, 99)), 1),
+        "max_us": round(float(jitter.max()), 1)
+    }
+
+
+def timed_rotation(driver, direction, interval_ns, slots, spin_ns=SPIN_THRESHOLD_NS, stop=None):
+    """
+    执行一次旋转并记录每一步的实际输出时刻。
+    :param spin_ns: 忙等区间长度 (ns)
+    :param stop: 停止事件（threading.Event），置位后立即停止输出
+    :return: dict, run_steps 的统计结果，附加 jitter（抖动统计）
+    """
+    write_phase = driver.step_function(direction)
+    stamps = np.zeros(max(1, slots), dtype=np.int64)
+    clock = time.monotonic_ns
+
+    def step(k):
+        write_phase(k)
+        stamps[k] = clock()
+
+    stats = run_steps(step, slots, interval_ns, spin_ns=spin_ns, stop=stop)
+    if stats["stopped"]:
+        driver.release(force=True)  # 急停后再次强制置低
+    stats["jitter"] = jitter_stats(stamps[:stats["steps"]], interval_ns)
+    return stats
+
+
+class MotorWorker(threading.Thread):
+    """
+    电机工作线程。
+    :param driver: StepperDriver
+    :param cpu: 绑定的CPU核心，None 表示自动选择
+    :param realtime: 是否尝试应用实时设置
+    """
+
+    def __init__(self, driver, cpu=None, realtime=True):
+        super().__init__(name="motor-worker", daemon=True)
+        self.driver = driver
+        self.cpu = cpu
+        self.realtime = realtime
+        self.settings = {}
+        self._commands = deque()
+        self._wakeup = threading.Event()
+        self._ready = threading.Event()
+        self._running = True
+        self._switch_interval = None  # 启动前的线程切换间隔，stop() 时恢复
+
+    def run(self):
+        if self.realtime:
+            self.settings = apply_realtime_settings(self.cpu)
+        spin_ns = RT_SPIN_NS if self.settings.get("sched_fifo") else SPIN_THRESHOLD_NS
+        self._ready.set()
+        while self._running:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            while self._commands:
+                future, direction, interval_ns, slots, stop = self._commands.popleft()
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    future.set_result(timed_rotation(self.driver, direction, interval_ns, slots, spin_ns, stop))
+                except BaseException as e:
+                    future.set_exception(e)
+
+    def start(self):
+        super().start()
+        self._ready.wait()
+        self._switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(SWITCH_INTERVAL_S)
+        return self
+
+    def rotate(self, direction, interval_ns, slots, stop=None):
+        """
+        提交旋转命令（不阻塞）。
+        :param direction: 'a' 逆时针 / 'c' 顺时针
+        :param interval_ns: 步进间隔 (ns)，固定值或每一步的间隔数组（加减速曲线）
+        :param slots: 节拍数
+        :param stop: 停止事件（threading.Event），置位后立即停止输出
+        :return: Future，结果为 timed_rotation 的统计
+        """
+        future = Future()
+        self._commands.append((future, direction, interval_ns, int(slots), stop))
+        self._wakeup.set()
+        return future
+
+    def stop(self, timeout=None):
+        """等待已提交的命令执行完毕后退出线程，恢复启动前的线程切换间隔"""
+        self._running = False
+        self._wakeup.set()
+        self.join(timeout)
+        if self._switch_interval is not None:
+            sys.setswitchinterval(self._switch_interval)
+            self._switch_interval = None
+
+
+if __name__ == "__main__":
+    # 对比主线程内联输出与工作线程输出的步间隔抖动（模拟GPIO，另一线程同时进行计算以模拟日志/绘图负载）
+    # 用法（在 smart_vibrator 目录下）: python -m utils.motor_worker
+    from utils import mock_gpio
+    from utils.stepper_driver import StepperDriver
+
+    mock_gpio.setmode(mock_gpio.BCM)
+    driver = StepperDriver(mock_gpio)
+    driver.setup()
+    interval_ns = int(60 / 30 / 2048 * 1e9)
+    slots = 2048
+
+    def background_load(stop):
+        # 模拟日志输出、绘图等占用解释器的工作
+        while not stop.is_set():
+            sum(i * i for i in range(20000))
+
+    stop = threading.Event()
+    loader = threading.Thread(target=background_load, args=(stop,), daemon=True)
+    loader.start()
+
+    inline = timed_rotation(driver, 'c', interval_ns, slots)
+    switch_interval = sys.getswitchinterval()
+    worker = MotorWorker(driver).start()
+    threaded = worker.rotate('c', interval_ns, slots).result()
+    stop.set()
+    worker.stop()
+    assert sys.getswitchinterval() == switch_interval, "工作线程退出后未恢复线程切换间隔"
+
+    print(f"实时设置: {worker.settings}")
+    for name, stats in (("主线程内联", inline), ("工作线程", threaded)):
+        j = stats["jitter"]
+        print(f"{name}: 步进速率 {stats['achieved_rate_hz']:.1f}/{stats['target_rate_hz']:.1f} 步/秒, "
+              f"抖动 p50 {j['p50_us']} us, p99 {j['p99_us']} us, max {j['max_us']} us, 跳过 {stats['skipped']}")
@@ -1,18 +1,28 @@
 """
 sensor_interface.py
 传感器接口模块，封装环境参数传感器的读取函数。
-温度传感器使用真实PCF8591模块读取，其他参数仍为模拟数据。
-直接使用simulatedTemperatureSensorExperiment.ipynb中的代码实现。
+温度、湿度、坍落度、钢筋分布密度传感器按配置 pcf8591.channels 接在PCF8591模块的 AIN0-AIN3 上，
+模块不可用或未接的传感器返回模拟数据。PCF8591 每次读出的是上一次读取时启动的转换结果，
+ADC.read()/ADC.read_all() 都丢弃第1个字节，返回的是本次读取时的值，没有一个采样的滞后。
+温度换算直接使用simulatedTemperatureSensorExperiment.ipynb中的代码实现。
+SensorSampler 在后台线程中按 sensor_refresh_interval 持续采集全部传感器，
+采样存入固定长度的环形缓冲区，latest()/mean()/median() 立即返回，不必等待逐次读取。
 """
 import random
+import threading
 import time
 import os
 import sys
 import math
 
+import numpy as np
+
+from utils.config import get_config
+
 # 尝试导入必要模块
 try:
-    import RPi.GPIO as GPIO
+    # 与其他模块共用同一个GPIO后端（见 utils/gpio_backend.py）
+    from utils.gpio_shadow import GPIO
     GPIO_AVAILABLE = True
     # 设置 GPIO 模式
     GPIO.setmode(GPIO.BCM)
@@ -40,9 +50,23 @@ else:
 # 温度传感器配置
 glodon_DO = 17  # 温度传感器Do管脚，根据实际连接调整
 
+# PCF8591 配置：地址、{传感器: AIN通道}、各传感器量程
+ADC_CONFIG = get_config().get("pcf8591", {})
+ADC_CHANNELS = {name: ain for name, ain in ADC_CONFIG.get("channels", {}).items() if ain is not None}
+ADC_RANGES = ADC_CONFIG.get("ranges", {})
+
 # 初始化标志
 ADC_INITIALIZED = False
 
+# 采样器的通道顺序，与 read_sensors() 的返回值一一对应
+SENSOR_CHANNELS = ("temperature", "humidity", "slump", "rebar_density")
+
+# 各通道输出时保留的小数位数
+SENSOR_DECIMALS = {"temperature": 1, "humidity": 1, "slump": 0, "rebar_density": 2}
+
+# 传感器不可用时模拟数据的范围
+SIMULATED_RANGES = {"temperature": (15, 35), "humidity": (50, 80), "slump": (140, 220), "rebar_density": (0.2, 0.5)}
+
 # 初始化设置
 def glodon_setup():
     """初始化温度传感器设置"""
@@ -52,7 +76,7 @@ def glodon_setup():
         return False
     
     try:
-        ADC.setup(0x48)  # 设置PCF8591模块地址
+        ADC.setup(ADC_CONFIG.get("address", 0x48))  # 设置PCF8591模块地址
         if GPIO_AVAILABLE:
             GPIO.setup(glodon_DO, GPIO.IN)  # 温度传感器DO端口设置为输入模式
         ADC_INITIALIZED = True
@@ -67,65 +91,94 @@ def glodon_setup():
 if USING_OFFICIAL_MODULE:
     glodon_setup()
 
-def read_temperature():
+def simulated_value(name):
+    """传感器 name 的模拟数据"""
+    low, high = SIMULATED_RANGES[name]
+    return round(random.uniform(low, high), SENSOR_DECIMALS[name])
+
+def adc_to_temperature(glodon_analogVal):
+    """
+    将PCF8591读数（0-255）换算为温度（°C），NTC热敏电阻（10kΩ, B=3950）与10kΩ电阻分压
+    计算异常时返回默认室温 25°C
+    """
+    # 转换到 5V 范围
+    glodon_Vr = 5 * float(glodon_analogVal) / 255
+    
+    # 检查分母是否为零
+    if (5 - glodon_Vr) <= 0:
+        print(f"警告: 电压计算异常(Vr={glodon_Vr}), 使用备用方法")
+        # 使用简化的计算方法
+        glodon_temp = 25.0  # 默认室温
+    else:
+        # 计算电阻值
+        glodon_Rt = 10000 * glodon_Vr / (5 - glodon_Vr)
+        
+        # 检查对数参数
+        if glodon_Rt <= 0:
+            print(f"警告: 电阻值异常(Rt={glodon_Rt}), 使用备用方法")
+            glodon_temp = 25.0  # 默认室温
+        else:
+            try:
+                # 使用NTC热敷电阻公式计算温度
+                glodon_temp = 1/(((math.log(glodon_Rt / 10000)) / 3950) + (1 / (273.15+25)))
+                glodon_temp = glodon_temp - 273.15  # 转换为摄氏度
+            except Exception as e:
+                print(f"温度计算错误: {e}")
+                glodon_temp = 25.0  # 默认室温
+    
+    # 限制在合理范围内
+    glodon_temp = max(min(glodon_temp, 50), -10)
+    return glodon_temp
+
+def adc_to_range(value, low, high):
+    """将PCF8591读数（0-255）线性换算到量程 [low, high]"""
+    return low + (high - low) * float(value) / 255
+
+def adc_available(name):
+    """传感器 name 是否接在已初始化的PCF8591上"""
+    return USING_OFFICIAL_MODULE and ADC_INITIALIZED and name in ADC_CHANNELS
+
+def adc_to_value(name, value):
+    """将传感器 name 的PCF8591读数换算为物理量"""
+    if name == "temperature":
+        return adc_to_temperature(value)
+    return adc_to_range(value, *ADC_RANGES[name])
+
+def read_temperature(verbose=True):
     """
     读取温度传感器数据（°C）
     使用simulatedTemperatureSensorExperiment.ipynb中的代码实现
     如果传感器不可用，则返回模拟数据
+    :param verbose: 是否打印温度状态和DO端口状态（后台采样时关闭，计算异常仍会打印）
     """
-    # 如果官方模块不可用或未初始化，返回模拟数据
-    if not USING_OFFICIAL_MODULE or not ADC_INITIALIZED:
-        print("模块未初始化，返回模拟数据")
-        return round(random.uniform(15, 35), 1)
+    # 如果官方模块不可用、未初始化或未接温度传感器，返回模拟数据
+    if not adc_available("temperature"):
+        if verbose:
+            print("模块未初始化，返回模拟数据")
+        return simulated_value("temperature")
     
     try:
         # 直接使用simulatedTemperatureSensorExperiment.ipynb中的代码
-        glodon_analogVal = ADC.read(0)  # 读取AIN0上的模拟值
-        
-        # 转换到 5V 范围
-        glodon_Vr = 5 * float(glodon_analogVal) / 255
+        glodon_analogVal = ADC.read(ADC_CHANNELS["temperature"])  # 读取温度传感器通道（默认AIN0）上的模拟值
         
-        # 检查分母是否为零
-        if (5 - glodon_Vr) <= 0:
-            print(f"警告: 电压计算异常(Vr={glodon_Vr}), 使用备用方法")
-            # 使用简化的计算方法
-            glodon_temp = 25.0  # 默认室温
-        else:
-            # 计算电阻值
-            glodon_Rt = 10000 * glodon_Vr / (5 - glodon_Vr)
-            
-            # 检查对数参数
-            if glodon_Rt <= 0:
-                print(f"警告: 电阻值异常(Rt={glodon_Rt}), 使用备用方法")
-                glodon_temp = 25.0  # 默认室温
-            else:
-                try:
-                    # 使用NTC热敷电阻公式计算温度
-                    glodon_temp = 1/(((math.log(glodon_Rt / 10000)) / 3950) + (1 / (273.15+25)))
-                    glodon_temp = glodon_temp - 273.15  # 转换为摄氏度
-                except Exception as e:
-                    print(f"温度计算错误: {e}")
-                    glodon_temp = 25.0  # 默认室温
-        
-        # 限制在合理范围内
-        glodon_temp = max(min(glodon_temp, 50), -10)
+        glodon_temp = adc_to_temperature(glodon_analogVal)
         
         # 根据实际温度值和DO端口状态判断温度状态
         # 设置温度阈值为30度，超过这个温度就认为“太热了”
         TEMP_THRESHOLD = 30.0
         
         # 优先使用实际温度值判断
-        if glodon_temp > TEMP_THRESHOLD:
+        if verbose and glodon_temp > TEMP_THRESHOLD:
             print('\n************')
             print('* It is Too Hot! *')
             print('************\n')
-        else:
+        elif verbose:
             print('\n***********')
             print('* Just right \uff0cBetter~ *')
             print('***********\n')
             
         # 如果GPIO可用，也读取DO端口状态（仅用于调试）
-        if GPIO_AVAILABLE:
+        if GPIO_AVAILABLE and verbose:
             try:
                 glodon_tmp = GPIO.input(glodon_DO)
                 print(f"DO端口状态: {'High(1)' if glodon_tmp == 1 else 'Low(0)'}")
@@ -138,22 +191,190 @@ def read_temperature():
     except Exception as e:
         print(f"读取温度传感器错误: {e}")
         # 出错时返回模拟数据
-        return round(random.uniform(15, 35), 1)
+        return simulated_value("temperature")
+
+def read_adc_sensor(name):
+    """读取接在PCF8591上的传感器 name，未接传感器或读取失败时返回模拟数据"""
+    if adc_available(name):
+        try:
+            return round(adc_to_value(name, ADC.read(ADC_CHANNELS[name])), SENSOR_DECIMALS[name])
+        except Exception as e:
+            print(f"读取传感器错误: {e}")
+    return simulated_value(name)
 
 def read_humidity():
-    """模拟读取湿度传感器（%）"""
-    return round(random.uniform(50, 80), 1)
+    """读取湿度传感器（%），未接传感器时返回模拟数据"""
+    return read_adc_sensor("humidity")
 
 def read_slump():
-    """模拟读取混凝土坍落度传感器（mm）"""
-    return round(random.uniform(140, 220), 0)
+    """读取混凝土坍落度传感器（mm），未接传感器时返回模拟数据"""
+    return read_adc_sensor("slump")
 
 def read_rebar_density():
-    """模拟读取钢筋分布密度传感器（0~1）"""
-    return round(random.uniform(0.2, 0.5), 2)
+    """读取钢筋分布密度传感器（0~1），未接传感器时返回模拟数据"""
+    return read_adc_sensor("rebar_density")
+
+
+def read_sensors():
+    """
+    读取一次全部传感器（不打印温度状态）。
+    接在PCF8591上的传感器通过 ADC.read_all() 在一次I2C传输中同时读出，其余传感器返回模拟数据；
+    与 read_temperature() 相同，读取失败（如模块无应答）时也返回模拟数据。
+    :return: tuple，按 SENSOR_CHANNELS 顺序
+    """
+    raw = None
+    if any(adc_available(name) for name in SENSOR_CHANNELS):
+        try:
+            raw = ADC.read_all()
+        except Exception as e:
+            print(f"读取传感器错误: {e}，返回模拟数据")
+    return tuple(adc_to_value(name, raw[ADC_CHANNELS[name]]) if raw is not None and adc_available(name)
+                 else simulated_value(name) for name in SENSOR_CHANNELS)
+
+
+class SensorSampler:
+    """
+    后台传感器采样器。
+    采样线程每隔 interval_s 读取一次全部通道，写入 capacity 行的环形缓冲区（numpy 数组，预先分配）；
+    读取快照只在锁内复制最近的若干行，不会等待传感器。
+    :param interval_s: 采样间隔 (s)，None 表示使用配置中的 sensor_refresh_interval
+    :param capacity: 环形缓冲区保留的采样数
+    :param read: 读取一次全部通道的函数，返回值按 channels 顺序
+    :param channels: 通道名
+    """
+
+    def __init__(self, interval_s=None, capacity=64, read=read_sensors, channels=SENSOR_CHANNELS):
+        if interval_s is None:
+            interval_s = get_config().get("sensor_refresh_interval", 2)
+        if capacity < 1:
+            raise ValueError(f"环形缓冲区容量必须大于0: {capacity}")
+        self.interval_s = float(interval_s)
+        self.capacity = int(capacity)
+        self.read = read
+        self.channels = tuple(channels)
+        self._values = np.full((self.capacity, len(self.channels)), np.nan)
+        self._times = np.zeros(self.capacity)
+        self._count = 0  # 累计采样数，写入位置为 _count % capacity
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.errors = 0
+
+    @property
+    def count(self):
+        """缓冲区中的有效采样数"""
+        return min(self._count, self.capacity)
+
+    def sample(self):
+        """
+        立即采样一次并写入缓冲区。
+        :return: 是否采样成功
+        """
+        try:
+            row = self.read()
+        except Exception as e:
+            self.errors += 1
+            print(f"[传感器] 采样失败: {e}")
+            return False
+        with self._lock:
+            index = self._count % self.capacity
+            self._values[index] = row
+            self._times[index] = time.monotonic()
+            self._count += 1
+        return True
+
+    def start(self, prime=1):
+        """
+        启动后台采样线程。
+        :param prime: 启动前连续采样的次数，使快照立即可用（只占用传感器读取时间，不等待采样间隔）
+        """
+        if self._thread is not None:
+            return self
+        for _ in range(prime):
+            self.sample()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sensor-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            self.sample()
+
+    def stop(self):
+        """停止后台采样线程"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def window(self, window=None):
+        """
+        最近的采样（按时间先后）。
+        :param window: 采样数，None 表示缓冲区中全部采样
+        :return: tuple (数组 [采样数, 通道数], 采样时刻数组)
+        """
+        with self._lock:
+            count = min(self._count, self.capacity)
+            n = count if window is None else max(0, min(int(window), count))
+            indices = np.arange(self._count - n, self._count) % self.capacity
+            return self._values[indices], self._times[indices]
+
+    def _snapshot(self, values):
+        return {name: round(float(v), SENSOR_DECIMALS.get(name, 3)) for name, v in zip(self.channels, values)}
+
+    def latest(self):
+        """最近一次采样，dict {通道: 数值}；尚无采样时返回 None"""
+        values, _ = self.window(1)
+        return self._snapshot(values[0]) if len(values) else None
+
+    def mean(self, window=10):
+        """最近 window 次采样的平均值，dict {通道: 数值}；尚无采样时返回 None"""
+        values, _ = self.window(window)
+        return self._snapshot(np.nanmean(values, axis=0)) if len(values) else None
+
+    def median(self, window=10):
+        """最近 window 次采样的中位数，dict {通道: 数值}；尚无采样时返回 None"""
+        values, _ = self.window(window)
+        return self._snapshot(np.nanmedian(values, axis=0)) if len(values) else None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
 
 if __name__ == "__main__":
     print("温度:", read_temperature())
     print("湿度:", read_humidity())
     print("坍落度:", read_slump())
     print("钢筋分布密度:", read_rebar_density())
+
+    # 采样器自检：用计数器代替传感器，检查环形缓冲区回绕后的窗口和统计值
+    ticks = iter(range(1000))
+
+    def fake_read():
+        v = next(ticks)
+        return v, v * 2, v * 3, v * 4
+
+    sampler = SensorSampler(interval_s=0.01, capacity=8, read=fake_read)
+    for _ in range(20):
+        sampler.sample()
+    values, times = sampler.window(4)
+    assert sampler.count == 8 and values[:, 0].tolist() == [16, 17, 18, 19]
+    assert np.all(np.diff(times) >= 0)
+    assert sampler.latest()["temperature"] == 19
+    assert sampler.mean(4)["humidity"] == 35.0 and sampler.median(3)["slump"] == 54
+    assert sampler.mean(100)["temperature"] == 15.5  # 窗口大于缓冲区时取全部有效采样
+    assert SensorSampler(read=fake_read).latest() is None
+
+    # 后台采样：启动后快照立即可用，之后按间隔持续更新
+    with SensorSampler(interval_s=0.05, capacity=16) as sampler:
+        t0 = time.perf_counter()
+        first = sampler.mean(10)
+        print(f"启动后首个快照耗时 {(time.perf_counter() - t0) * 1e3:.3f} ms: {first}")
+        time.sleep(0.3)
+        print(f"0.3 秒后共 {sampler.count} 次采样，最近10次平均 {sampler.mean(10)}，中位数 {sampler.median(10)}")
+    assert sampler.count >= 4
+    print("采样器自检通过")
@@ -0,0 +1,153 @@
+"""
+step_scheduler.py
+步进脉冲定时调度模块
+以 time.monotonic_ns() 的绝对截止时间安排每一相的输出：第 k 相的截止时间为 起始时刻 + k * 步进间隔，
+sleep 的超时不会逐步累积，也不受系统时间跳变影响。距截止时间不足 SPIN_THRESHOLD_NS 时改为忙等，
+以消除 sleep 在亚毫秒级的唤醒误差。
+落后于计划时：落后不超过 MAX_CATCHUP_STEPS 步则立即补发（追赶）；落后更多则跳过错过的节拍，
+以当前时刻重新对齐，保证总运行时间不变。
+步进间隔可以是固定值，也可以是每一步一个间隔的数组（如 motion_profile 生成的加减速曲线）。
+传入停止事件（threading.Event）时，每一相输出前检查该事件，等待中的 sleep 也会被立即唤醒（急停）。
+"""
+import time
+
+# 距截止时间不足该值 (ns) 时不再 sleep，改为忙等
+SPIN_THRESHOLD_NS = 1_000_000
+
+# 落后不超过该步数时立即补发，否则跳过错过的节拍
+MAX_CATCHUP_STEPS = 8
+
+# 实际步进速率与目标速率允许的相对偏差
+RATE_TOLERANCE = 0.005
+
+
+def wait_until_ns(deadline_ns, spin_ns=SPIN_THRESHOLD_NS, stop=None):
+    """
+    等待到 monotonic 时钟的绝对时刻 deadline_ns：先 sleep 到截止前 spin_ns，再忙等到截止时刻。
+    :param deadline_ns: 截止时刻 (time.monotonic_ns)
+    :param spin_ns: 忙等区间长度 (ns)
+    :param stop: 停止事件（threading.Event），置位时立即返回
+    :return: bool, 是否因停止事件而提前返回
+    """
+    remaining = deadline_ns - time.monotonic_ns()
+    if stop is None:
+        if remaining > spin_ns:
+            time.sleep((remaining - spin_ns) / 1e9)
+        while time.monotonic_ns() < deadline_ns:
+            pass
+        return False
+    if remaining > spin_ns and stop.wait((remaining - spin_ns) / 1e9):
+        return True
+    while time.monotonic_ns() < deadline_ns:
+        if stop.is_set():
+            return True
+    return stop.is_set()
+
+
+def run_steps(step, slots, interval_ns, max_catchup=MAX_CATCHUP_STEPS, spin_ns=SPIN_THRESHOLD_NS, stop=None):
+    """
+    按绝对截止时间执行步进输出。
+    :param step: 每一步调用的函数 step(k)，k 为已执行的步数（从0开始，跳过的节拍不计）
+    :param slots: 节拍总数，总运行时间约为 slots * interval_ns（间隔为数组时为数组之和）
+    :param interval_ns: 步进间隔 (ns)，固定值或长度不小于 slots 的数组（第 k 个节拍之后的间隔）
+    :param max_catchup: 落后不超过该步数时立即补发，否则跳过错过的节拍
+    :param spin_ns: 忙等区间长度 (ns)
+    :param stop: 停止事件（threading.Event），置位后不再输出下一相
+    :return: dict, 执行统计：steps/skipped/late_steps/max_late_ns/elapsed_ns/target_rate_hz/achieved_rate_hz/stopped
+    """
+    if not hasattr(interval_ns, "__len__"):
+        intervals = None
+        interval = int(interval_ns)
+        planned_ns = interval * slots
+    else:
+        intervals = [int(v) for v in interval_ns[:slots]]
+        slots = len(intervals)
+        planned_ns = sum(intervals)
+    start_ns = time.monotonic_ns()
+    deadline = start_ns
+    steps = 0
+    skipped = 0
+    late_steps = 0
+    max_late_ns = 0
+    stopped = False
+    slot = 0
+    while slot < slots:
+        if intervals is not None:
+            interval = intervals[slot]
+        now = time.monotonic_ns()
+        late = now - deadline
+        if late < 0:
+            if wait_until_ns(deadline, spin_ns, stop):
+                stopped = True
+                break
+        elif late > 0:
+            late_steps += 1
+            max_late_ns = max(max_late_ns, late)
+            if late > max_catchup * interval:
+                # 落后太多：跳过错过的节拍，从当前时刻重新对齐
+                while slot < slots - 1 and deadline + interval <= now:
+                    deadline += interval
+                    slot += 1
+                    skipped += 1
+                    if intervals is not None:
+                        interval = intervals[slot]
+        if stop is not None and stop.is_set():
+            stopped = True
+            break
+        step(steps)
+        steps += 1
+        slot += 1
+        deadline += interval
+    # 最后一步之后仍需等待一个步进间隔，保证总时长与计划一致
+    if slots > 0 and not stopped:
+        stopped = wait_until_ns(deadline, spin_ns, stop)
+
+    elapsed_ns = time.monotonic_ns() - start_ns
+    return {
+        "steps": steps,
+        "skipped": skipped,
+        "late_steps": late_steps,
+        "max_late_ns": max_late_ns,
+        "elapsed_ns": elapsed_ns,
+        "target_rate_hz": slots * 1e9 / planned_ns if planned_ns > 0 else 0.0,
+        "achieved_rate_hz": steps * 1e9 / elapsed_ns if elapsed_ns > 0 else 0.0,
+        "stopped": stopped
+    }
+
+
+def slots_for_duration(duration_s, interval_ns):
+    """运行 duration_s 秒所需的节拍数"""
+    return max(0, int(round(duration_s * 1e9 / interval_ns)))
+
+
+if __name__ == "__main__":
+    # 无硬件的定时测试：以 30RPM x 2048步/转 对应的步进速率空跑，比较逐步 sleep 与绝对截止时间调度
+    rpm = 30
+    steps_per_rev = 2048
+    duration_s = 2.0
+    interval_s = 60 / rpm / steps_per_rev
+    interval_ns = int(round(interval_s * 1e9))
+    target = 1e9 / interval_ns
+
+    def noop(k):
+        pass
+
+    # 原有方式：每步 sleep 一个步进间隔，按 time.time() 判断结束
+    start = time.time()
+    end = start + duration_s
+    naive_steps = 0
+    while time.time() < end:
+        noop(naive_steps)
+        time.sleep(interval_s)
+        naive_steps += 1
+    naive_rate = naive_steps / (time.time() - start)
+
+    stats = run_steps(noop, slots_for_duration(duration_s, interval_ns), interval_ns)
+    error = abs(stats["achieved_rate_hz"] - target) / target
+
+    print(f"目标步进速率: {target:.1f} 步/秒 ({rpm} RPM)")
+    print(f"逐步sleep: {naive_rate:.1f} 步/秒 (偏差 {abs(naive_rate - target) / target * 100:.2f}%)")
+    print(f"截止时间调度: {stats['achieved_rate_hz']:.1f} 步/秒 (偏差 {error * 100:.3f}%, "
+          f"允许 {RATE_TOLERANCE * 100:.1f}%), 延迟步数 {stats['late_steps']}, 跳过 {stats['skipped']}, "
+          f"最大延迟 {stats['max_late_ns'] / 1000:.1f} us")
+    assert error <= RATE_TOLERANCE, "实际步进速率超出允许偏差"
@@ -0,0 +1,162 @@
+"""
+stepper_driver.py
+步进电机驱动模块（28BYJ-48 + ULN2003）
+各方向的相序表在模块加载时一次性算好，每一相只需查表并以通道列表形式一次写入全部电机管脚，
+不再在每一步重复计算位运算并逐个管脚调用 GPIO.output。
+支持三种驱动方式:
+    wave  单相励磁，4相/周期，每转2048步，功耗和转矩最小
+    full  双相励磁（官方示例的相序），4相/周期，每转2048步
+    half  单双相交替（8相），每转4096步，转矩更平稳，适合较高步进速率
+"""
+import time
+
+# 步进电机管脚（与 device_control.glodon_motorPin 一致）
+DEFAULT_MOTOR_PINS = (18, 23, 24, 25)
+
+
+def _phase_table(direction):
+    """
+    按官方示例（StepperMotorSensor.ipynb）的位运算生成一个方向的相序表。
+    :param direction: 'a' 逆时针 / 'c' 顺时针
+    :return: tuple，每一相为4个管脚的电平 (0/1)
+    """
+    if direction == 'a':
+        return tuple(tuple(1 if 0x99 >> j & (0x08 >> i) else 0 for i in range(4)) for j in range(4))
+    return tuple(tuple(1 if 0x99 << j & (0x80 >> i) else 0 for i in range(4)) for j in range(4))
+
+
+def _half_step_table(full_table):
+    """在相邻两个双相励磁相之间插入两者共有的单相，得到8相半步相序"""
+    table = []
+    for k, phase in enumerate(full_table):
+        following = full_table[(k + 1) % len(full_table)]
+        table.append(phase)
+        table.append(tuple(a & b for a, b in zip(phase, following)))
+    return tuple(table)
+
+
+# 驱动方式
+DRIVE_MODES = ("wave", "full", "half")
+DEFAULT_DRIVE_MODE = "full"
+
+# 各驱动方式每转步数（28BYJ-48 减速比约 1:64）
+STEPS_PER_REVOLUTION = {"wave": 2048, "full": 2048, "half": 4096}
+
+# 全步（双相励磁）相序表
+PHASE_TABLES = {direction: _phase_table(direction) for direction in ('a', 'c')}
+
+# 各驱动方式、各方向的相序表
+MODE_TABLES = {
+    "full": PHASE_TABLES,
+    "half": {direction: _half_step_table(table) for direction, table in PHASE_TABLES.items()},
+    "wave": {direction: _half_step_table(table)[1::2] for direction, table in PHASE_TABLES.items()},
+}
+
+
+class StepperDriver:
+    """
+    四线步进电机驱动。
+    :param gpio: GPIO 模块（Jetson.GPIO 或接口相同的模块）
+    :param pins: 电机管脚
+    :param mode: 驱动方式，见 DRIVE_MODES
+    """
+
+    def __init__(self, gpio, pins=DEFAULT_MOTOR_PINS, mode=DEFAULT_DRIVE_MODE):
+        if mode not in MODE_TABLES:
+            raise ValueError(f"未知的驱动方式: {mode}，可选: {DRIVE_MODES}")
+        self.gpio = gpio
+        self.pins = list(pins)
+        self.mode = mode
+        # 每一相预先转换为列表，写入时直接作为 GPIO.output 的电平列表
+        self._tables = {direction: [list(phase) for phase in table]
+                        for direction, table in MODE_TABLES[mode].items()}
+
+    @property
+    def steps_per_revolution(self):
+        """当前驱动方式下每转步数"""
+        return STEPS_PER_REVOLUTION[self.mode]
+
+    def setup(self):
+        """将电机管脚一次设置为输出模式（gpiod 后端只申请一次 line request）"""
+        self.gpio.setup(self.pins, self.gpio.OUT)
+
+    def step_function(self, direction):
+        """
+        返回写入第 k 相的函数 step(k)，供 step_scheduler.run_steps 调用。
+        :param direction: 'a' 逆时针 / 'c' 顺时针
+        """
+        table = self._tables[direction]
+        count = len(table)
+        output = self.gpio.output
+        pins = self.pins
+
+        def step(k):
+            output(pins, table[k % count])
+        return step
+
+    def release(self, force=False):
+        """
+        所有电机管脚置低电平，线圈断电。
+        :param force: 经影子寄存器时忽略影子电平强制写入（急停后再次置低）
+        """
+        kwargs = {"force": True} if force and hasattr(self.gpio, "invalidate") else {}
+        self.gpio.output(self.pins, [self.gpio.LOW] * len(self.pins), **kwargs)
+
+
+def _legacy_step_function(gpio, pins, direction):
+    """原有实现：每一相重新计算位运算并逐个管脚写入（用于基准对比）"""
+    def step(k):
+        j = k % 4
+        if direction == 'a':
+            for i in range(4):
+                gpio.output(pins[i], 0x99 >> j & (0x08 >> i))
+        else:
+            for i in range(4):
+                gpio.output(pins[i], 0x99 << j & (0x80 >> i))
+    return step
+
+
+def benchmark(step, steps=200_000):
+    """不加延时连续执行 steps 步，返回步进速率上限 (步/秒)"""
+    start = time.perf_counter()
+    for k in range(steps):
+        step(k)
+    return steps / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    # 微基准：在模拟GPIO上比较两种实现的步进速率上限
+    # 用法（在 smart_vibrator 目录下）: python -m utils.stepper_driver
+    from utils import mock_gpio
+
+    mock_gpio.setmode(mock_gpio.BCM)
+    driver = StepperDriver(mock_gpio)
+    driver.setup()
+
+    for direction in ('c', 'a'):
+        legacy = _legacy_step_function(mock_gpio, driver.pins, direction)
+        # 两种实现写出的电平序列必须一致
+        for k in range(8):
+            legacy(k)
+            expected = [mock_gpio.levels[p] for p in driver.pins]
+            driver.step_function(direction)(k)
+            assert [mock_gpio.levels[p] for p in driver.pins] == expected
+
+        before = benchmark(legacy)
+        after = benchmark(driver.step_function(direction))
+        print(f"方向 {direction}: 原实现 {before:,.0f} 步/秒, 查表+批量写入 {after:,.0f} 步/秒 "
+              f"(提升 {after / before:.2f} 倍)")
+    need = 30 / 60 * 2048
+    print(f"30 RPM x 2048 步/转 需要 {need:.0f} 步/秒")
+    driver.release()
+
+    # 各驱动方式的相序与可达转速（模拟GPIO上的软件上限，实际转速还受电机转矩限制）
+    print()
+    for mode in DRIVE_MODES:
+        driver = StepperDriver(mock_gpio, mode=mode)
+        phases = ["".join(map(str, phase)) for phase in MODE_TABLES[mode]['c']]
+        rate = benchmark(driver.step_function('c'))
+        rpm = rate / driver.steps_per_revolution * 60
+        print(f"{mode:>4}: 相序(c) {' '.join(phases)}, 每转 {driver.steps_per_revolution} 步, "
+              f"{rate:,.0f} 步/秒, 软件上限约 {rpm:,.0f} RPM")
+    driver.release()
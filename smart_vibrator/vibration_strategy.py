@@ -3,25 +3,35 @@ vibration_strategy.py
 振捣策略生成模块
 根据环境参数和混凝土配料信息输出振捣策略（频率、时间、深度、点位布局）。
 """
+import functools
+
 import numpy as np  # 添加numpy库的导入
 
-def freq_to_radius(freq_hz, power_kw=None, slump_mm=None, aggregate_size_mm=None, viscosity_pas=None, temperature=None):
+from strategy_cache import cache_key, load_cached_strategy, store_cached_strategy
+from strategy_store import PointView, point_columns, strategy_points
+
+# 振捣频率的有效范围 (Hz)，点位频率均为该范围内的整数
+FREQ_MIN_HZ = 120
+FREQ_MAX_HZ = 220
+
+# 六边形布局中同一行相邻点位的间距与有效半径之比（√3 时半径圆恰好无缝覆盖）
+HEX_SPACING_FACTOR = np.sqrt(3)
+
+# 点位布局方式: grid=方格布局(间距1.8倍半径), hex=六边形交错布局
+LAYOUT_MODES = ("grid", "hex")
+
+# 半径查找表的最大缓存数量（每组材料/环境/功率参数对应一张表，超出后按LRU淘汰）
+RADIUS_TABLE_CACHE_SIZE = 32
+
+# 策略计算公式版本号，修改半径公式、基础参数或点位布局计算时递增，使旧的策略缓存失效
+STRATEGY_FORMULA_VERSION = 1
+
+
+def prompt_missing_radius_params(power_kw=None, slump_mm=None, aggregate_size_mm=None, viscosity_pas=None):
     """
-    频率与有效振捣半径之间的拟合函数
-    基于公式: R = K * (P^0.4 * S^0.3 * f^0.2) / (d^0.1 * μ^0.2)
-    
-    参数:
-    - freq_hz: 振动频率 (Hz), 范围100~200 Hz
-    - power_kw: 振捣棒功率 (kW), 范围1.0~3.0 kW, 如果为None则提示用户输入
-    - slump_mm: 混凝土坍落度 (mm), 范围50~180 mm, 如果为None则提示用户输入
-    - aggregate_size_mm: 骨料最大粒径 (mm), 范围5~40 mm, 如果为None则提示用户输入
-    - viscosity_pas: 混凝土黏度系数 (Pa·s), 范围10~100 Pa·s, 如果为None则提示用户输入
-    - temperature: 环境温度 (°C), 用于调整K值
-    
-    返回:
-    - 有效振捣半径 (cm), 范围20~60 cm
+    交互式补全 freq_to_radius 缺失的参数，仅在参数为None时提示用户输入。
+    :return: tuple (power_kw, slump_mm, aggregate_size_mm, viscosity_pas)
     """
-    # 如果缺少参数，提示用户输入
     if power_kw is None:
         try:
             power_kw = float(input("请输入振捣棒功率(kW, 范围1.0~3.0): "))
@@ -54,6 +64,15 @@ def freq_to_radius(freq_hz, power_kw=None, slump_mm=None, aggregate_size_mm=None
             print("输入无效，使用默认值50 Pa·s")
             viscosity_pas = 50
     
+    return power_kw, slump_mm, aggregate_size_mm, viscosity_pas
+
+
+def temperature_to_k(temperature=None):
+    """
+    根据环境温度确定半径公式中的修正系数K（按温度分档）。
+    :param temperature: 环境温度 (°C)，为None时使用默认值
+    :return: float, 修正系数K
+    """
     # 基础修正系数K
     K = 2.0  # 调整为更合理的默认值
     
@@ -67,7 +86,11 @@ def freq_to_radius(freq_hz, power_kw=None, slump_mm=None, aggregate_size_mm=None
             K = 2.0  # 中温
         else:  # > 30
             K = 1.8   # 高温环境，混凝土流动性增加，振捣效果提高
-    
+    return K
+
+
+def _radius_formula(freq_hz, power_kw, slump_mm, aggregate_size_mm, viscosity_pas, K):
+    """半径公式本体（未限幅），freq_hz 可以是标量或NumPy数组"""
     # 应用修改后的公式，大幅提高参数对结果的影响
     # 原公式: R = K * (P^0.4 * S^0.3 * f^0.2) / (d^0.1 * μ^0.2)
     # 新公式: R = K * (P^0.7 * S^0.6 * f^0.4) / (d^0.5 * μ^0.4)
@@ -78,7 +101,39 @@ def freq_to_radius(freq_hz, power_kw=None, slump_mm=None, aggregate_size_mm=None
     # 增大分母的指数，使负相关参数影响更明显
     denominator = (aggregate_size_mm ** 0.5) * (viscosity_pas ** 0.4)
     
-    radius_cm = K * (numerator / denominator)
+    return K * (numerator / denominator)
+
+
+def freq_to_radius(freq_hz, power_kw=None, slump_mm=None, aggregate_size_mm=None, viscosity_pas=None, temperature=None):
+    """
+    频率与有效振捣半径之间的拟合函数
+    基于公式: R = K * (P^0.7 * S^0.6 * f^0.4) / (d^0.5 * μ^0.4)
+    
+    参数:
+    - freq_hz: 振动频率 (Hz), 范围100~200 Hz, 可以是标量或NumPy数组
+    - power_kw: 振捣棒功率 (kW), 范围1.0~3.0 kW, 如果为None则提示用户输入
+    - slump_mm: 混凝土坍落度 (mm), 范围50~180 mm, 如果为None则提示用户输入
+    - aggregate_size_mm: 骨料最大粒径 (mm), 范围5~40 mm, 如果为None则提示用户输入
+    - viscosity_pas: 混凝土黏度系数 (Pa·s), 范围10~100 Pa·s, 如果为None则提示用户输入
+    - temperature: 环境温度 (°C), 用于调整K值
+    
+    返回:
+    - 有效振捣半径 (cm), 范围20~60 cm; freq_hz 为数组时返回同形状的数组
+    """
+    # 如果缺少参数，提示用户输入
+    if None in (power_kw, slump_mm, aggregate_size_mm, viscosity_pas):
+        power_kw, slump_mm, aggregate_size_mm, viscosity_pas = prompt_missing_radius_params(
+            power_kw, slump_mm, aggregate_size_mm, viscosity_pas)
+    
+    K = temperature_to_k(temperature)
+    
+    # 数组输入：整体计算并限幅
+    if np.ndim(freq_hz) > 0:
+        radius_cm = _radius_formula(np.asarray(freq_hz, dtype=float), power_kw, slump_mm,
+                                    aggregate_size_mm, viscosity_pas, K)
+        return np.clip(radius_cm, 20, 60)
+    
+    radius_cm = _radius_formula(freq_hz, power_kw, slump_mm, aggregate_size_mm, viscosity_pas, K)
     
     # 限制在有效范围内
     radius_cm = max(20, min(60, radius_cm))
@@ -91,34 +146,218 @@ def freq_to_radius(freq_hz, power_kw=None, slump_mm=None, aggregate_size_mm=None
     return radius_cm
 
 
-def generate_strategy(material_params, env_params):
+@functools.lru_cache(maxsize=RADIUS_TABLE_CACHE_SIZE)
+def radius_table(power_kw, slump_mm, aggregate_size_mm, viscosity_pas, K):
     """
-    根据材料参数和环境参数生成振捣策略。
-    :param material_params: dict, 混凝土材料参数
-    :param env_params: dict, 环境参数
-    :return: dict, 详细的振捣策略
+    生成并缓存一组固定参数下所有整数频率的有效半径查找表。
+    同一策略内只有频率变化，因此点位半径可直接按 table[freq_hz - FREQ_MIN_HZ] 取值。
+    :param K: 温度修正系数，由 temperature_to_k 得到（同一温度档位共用一张表）
+    :return: 只读 numpy 数组，长度为 FREQ_MAX_HZ - FREQ_MIN_HZ + 1
     """
-    print("\n正在生成振捣策略...")
-    
-    # 检查必要的环境参数，缺失则提示用户输入
-    required_env_params = ["temperature", "humidity", "slump", "rebar_density"]
-    param_names = {
-        "temperature": "温度(°C)",
-        "humidity": "湿度(%)",
-        "slump": "坍落度(mm)",
-        "rebar_density": "钢筋密度(0-1)"
-    }
-    defaults = {"temperature": 25, "humidity": 60, "slump": 180, "rebar_density": 0.3}
+    # 逐个整数频率按标量公式计算，保证与 freq_to_radius 的结果完全一致
+    table = np.array([
+        max(20, min(60, _radius_formula(f, power_kw, slump_mm, aggregate_size_mm, viscosity_pas, K)))
+        for f in range(FREQ_MIN_HZ, FREQ_MAX_HZ + 1)
+    ], dtype=float)
+    table.flags.writeable = False  # 缓存对象在多个策略间共享，禁止修改
+    return table
+
+
+def grid_layout(rows, cols, spacing):
+    """
+    方格布局的点位坐标（行优先顺序）。
+    :param rows: 行数
+    :param cols: 列数
+    :param spacing: 点位间距 (m)
+    :return: tuple (x, y, edge)，edge 为边缘点位掩码
+    """
+    # 行优先展开的行列索引，与逐点循环 for i in rows: for j in cols 的顺序一致
+    i = np.repeat(np.arange(rows), cols)
+    j = np.tile(np.arange(cols), rows)
     
-    for param in required_env_params:
-        if param not in env_params or env_params[param] is None:
-            try:
-                value = float(input(f"\n请输入{param_names.get(param, param)}: "))
-                env_params[param] = value
-            except ValueError:
-                print(f"\n输入无效，使用默认值 {defaults[param]}")
-                env_params[param] = defaults[param]
+    # 点位坐标
+    x = j * spacing
+    y = i * spacing
     
+    # 边缘点位掩码
+    edge = (i == 0) | (i == rows - 1) | (j == 0) | (j == cols - 1)
+    return x, y, edge
+
+
+def hex_layout(board_width, board_length, radius_m):
+    """
+    六边形交错布局的点位坐标，点位裁剪在板内并覆盖到板的四条边。
+    相邻点间距为 HEX_SPACING_FACTOR * 半径、行距为 1.5 * 半径时，半径圆恰好无缝覆盖平面；
+    为使首末行/列落在板边上，实际间距按板尺寸向下微调（只会更密，不会留空隙）。
+    :param board_width: 板宽 (m)
+    :param board_length: 板长 (m)
+    :param radius_m: 用于确定间距的有效半径 (m)
+    :return: tuple (x, y, edge, rows)，edge 为边缘点位掩码，rows 为行数
+    """
+    rows = max(2, int(np.ceil(board_length / (1.5 * radius_m))) + 1)
+    cols = max(2, int(np.ceil(board_width / (HEX_SPACING_FACTOR * radius_m))) + 1)
+    x, y, edge = hex_lattice(board_width, board_length, rows, cols)
+    return x, y, edge, rows
+
+
+def hex_lattice(board_width, board_length, rows, cols):
+    """
+    给定行数和偶数行点数时的六边形交错点位坐标（首末行/列落在板边上）。
+    :return: tuple (x, y, edge)
+    """
+    row_y = np.linspace(0, board_length, rows)
+    col_x = np.linspace(0, board_width, cols)
+    pitch_x = col_x[1] - col_x[0]
+    
+    # 偶数行 cols 个点，从板边开始；奇数行 cols-1 个点，错开半个间距
+    row_sizes = np.where(np.arange(rows) % 2 == 0, cols, cols - 1)
+    i = np.repeat(np.arange(rows), row_sizes)
+    starts = np.cumsum(row_sizes) - row_sizes
+    j = np.arange(len(i)) - np.repeat(starts, row_sizes)
+    
+    x = j * pitch_x + np.where(i % 2 == 1, pitch_x / 2, 0.0)
+    y = row_y[i]
+    
+    # 边缘点位：首末行以及每行的首末点
+    edge = (i == 0) | (i == rows - 1) | (j == 0) | (j == row_sizes[i] - 1)
+    return x, y, edge
+
+
+def square_cover_layout(board_width, board_length, radius_m):
+    """
+    能使半径圆无缝覆盖整块板的方格布局（间距不超过 √2 * 半径，首末行/列落在板边上），
+    作为六边形布局在相同覆盖率下的对比基准。
+    :param board_width: 板宽 (m)
+    :param board_length: 板长 (m)
+    :param radius_m: 有效半径 (m)
+    :return: tuple (x, y, edge)
+    """
+    rows = max(2, int(np.ceil(board_length / (np.sqrt(2) * radius_m))) + 1)
+    cols = max(2, int(np.ceil(board_width / (np.sqrt(2) * radius_m))) + 1)
+    i = np.repeat(np.arange(rows), cols)
+    j = np.tile(np.arange(cols), rows)
+    x = np.linspace(0, board_width, cols)[j]
+    y = np.linspace(0, board_length, rows)[i]
+    edge = (i == 0) | (i == rows - 1) | (j == 0) | (j == cols - 1)
+    return x, y, edge
+
+
+def compute_point_params(x, y, edge, board_width, board_length, board_thickness,
+                         base_freq, base_time, base_depth, radius_lookup):
+    """
+    以NumPy数组方式计算给定点位坐标处的振捣参数。
+    :param x: 点位x坐标数组 (m)
+    :param y: 点位y坐标数组 (m)
+    :param edge: 边缘点位掩码
+    :param board_width: 板宽 (m)
+    :param board_length: 板长 (m)
+    :param board_thickness: 板厚 (cm)
+    :param base_freq: 基础频率 (Hz)
+    :param base_time: 基础振捣时间 (s)
+    :param base_depth: 基础振捣深度 (cm)
+    :param radius_lookup: radius_table 生成的半径查找表
+    :return: dict, 键为 id/x/y/freq_hz/time_s/depth_cm/radius_cm，值为等长数组
+    """
+    # 到板中心的距离比例
+    center_x = board_width / 2
+    center_y = board_length / 2
+    dist_to_center = np.sqrt(((x - center_x) / board_width) ** 2 + ((y - center_y) / board_length) ** 2)
+    
+    # 1. 频率调整：边缘点位频率更高，中心点位略低，中间区域按正弦波动并随距离增加
+    wave = np.trunc(np.sin(x * 5) * 10 + np.cos(y * 3) * 10) + np.trunc(dist_to_center * 30)
+    freq_adjustment = np.where(edge, 20, np.where(dist_to_center < 0.2, -15, wave)).astype(np.int64)
+    point_freq = np.clip(base_freq + freq_adjustment, FREQ_MIN_HZ, FREQ_MAX_HZ)
+    
+    # 2. 时间调整：边缘点位时间略长
+    point_time = np.minimum(20, base_time + np.where(edge, 2, 0))
+    
+    # 3. 深度调整：根据板厚度调整，保留底部安全距离（所有点位相同）
+    point_depth = np.full(len(x), min(board_thickness - 5, base_depth))
+    
+    # 4. 振捣半径：按频率直接查表
+    point_radius = radius_lookup[point_freq - FREQ_MIN_HZ]
+    
+    return {
+        "id": np.arange(1, len(x) + 1),
+        "x": np.round(x, 2),
+        "y": np.round(y, 2),
+        "freq_hz": point_freq,
+        "time_s": point_time,
+        "depth_cm": point_depth,
+        "radius_cm": point_radius
+    }
+
+
+def compute_point_arrays(rows, cols, spacing, board_width, board_length, board_thickness,
+                         base_freq, base_time, base_depth, radius_lookup):
+    """
+    以NumPy数组方式计算方格布局下全部点位的坐标与振捣参数。
+    :param rows: 行数
+    :param cols: 列数
+    :param spacing: 点位间距 (m)
+    其余参数同 compute_point_params
+    :return: dict, 键为 id/x/y/freq_hz/time_s/depth_cm/radius_cm，值为等长数组（行优先顺序）
+    """
+    x, y, edge = grid_layout(rows, cols, spacing)
+    return compute_point_params(x, y, edge, board_width, board_length, board_thickness,
+                                base_freq, base_time, base_depth, radius_lookup)
+
+
+def compute_hex_point_arrays(board_width, board_length, board_thickness,
+                             base_freq, base_time, base_depth, base_radius, radius_lookup):
+    """
+    以NumPy数组方式计算六边形交错布局下全部点位的坐标与振捣参数。
+    点位半径随频率变化，因此以布局中最小的点位半径确定间距，保证所有半径圆覆盖整块板。
+    :param base_radius: 基础振捣半径 (cm)，作为间距的初始估计
+    其余参数同 compute_point_params
+    :return: tuple (point_arrays, rows, radius_cm)，radius_cm 为确定间距所用的半径
+    """
+    radius_cm = base_radius
+    for _ in range(5):
+        x, y, edge, rows = hex_layout(board_width, board_length, radius_cm / 100)
+        point_arrays = compute_point_params(x, y, edge, board_width, board_length, board_thickness,
+                                            base_freq, base_time, base_depth, radius_lookup)
+        min_radius = float(point_arrays["radius_cm"].min())
+        if min_radius >= radius_cm:
+            break
+        radius_cm = min_radius
+    return point_arrays, rows, radius_cm
+
+
+def points_from_arrays(point_arrays):
+    """
+    将 compute_point_arrays 的数组结果转换为点位字典列表（策略JSON中的 points 格式）。
+    :param point_arrays: dict, 点位参数数组
+    :return: list[dict]
+    """
+    keys = ("id", "x", "y", "freq_hz", "time_s", "depth_cm", "radius_cm")
+    columns = [point_arrays[k].tolist() for k in keys]
+    return [dict(zip(keys, values)) for values in zip(*columns)]
+
+
+# 策略所需的环境参数、提示名称及默认值
+REQUIRED_ENV_PARAMS = ["temperature", "humidity", "slump", "rebar_density"]
+ENV_PARAM_NAMES = {
+    "temperature": "温度(°C)",
+    "humidity": "湿度(%)",
+    "slump": "坍落度(mm)",
+    "rebar_density": "钢筋密度(0-1)"
+}
+ENV_DEFAULTS = {"temperature": 25, "humidity": 60, "slump": 180, "rebar_density": 0.3}
+
+# 振捣棒功率与混凝板尺寸默认值
+DEFAULT_POWER_KW = 2.0  # 默认振捣棒功率
+DEFAULT_BOARD_WIDTH_M = 3.0  # 默认宽度 3 米
+DEFAULT_BOARD_LENGTH_M = 4.0  # 默认长度 4 米
+DEFAULT_BOARD_THICKNESS_CM = 30  # 默认厚度 30 厘米
+
+
+def extract_material_info(material_params):
+    """
+    从材料参数中提取策略计算所需的材料信息。
+    :param material_params: dict, 混凝土材料参数
+    :return: dict, 包含 aggregate_type/water_cement_ratio/aggregate_size_mm/viscosity_pas
+    """
     # 从材料参数中提取骨料类型和水灰比
     aggregate_type = material_params.get("aggregate_type", "碎石")
     water_cement_ratio = material_params.get("water_cement_ratio", 0.5)
@@ -134,16 +373,6 @@ def generate_strategy(material_params, env_params):
         except (ValueError, IndexError):
             pass
     
-    # 提取振捣棒功率
-    power_kw = 2.0  # 默认振捣棒功率
-    try:
-        power_input = input("\n请输入振捣棒功率(kW, 范围1.0~3.0): ")
-        if power_input.strip():
-            power_kw = float(power_input)
-            power_kw = max(1.0, min(3.0, power_kw))  # 限制在有效范围内
-    except ValueError:
-        print(f"\n输入无效，使用默认值 {power_kw} kW")
-    
     # 估计混凝土黏度系数
     viscosity_pas = 50  # 默认值
     if water_cement_ratio < 0.4:
@@ -155,9 +384,38 @@ def generate_strategy(material_params, env_params):
     else:
         viscosity_pas = 30
     
+    return {
+        "aggregate_type": aggregate_type,
+        "water_cement_ratio": water_cement_ratio,
+        "aggregate_size_mm": aggregate_size_mm,
+        "viscosity_pas": viscosity_pas
+    }
+
+
+def complete_env_params(env_params):
+    """
+    补全缺失的环境参数（使用 ENV_DEFAULTS 中的默认值），不修改传入的字典。
+    :param env_params: dict, 环境参数
+    :return: dict, 完整的环境参数；无缺失时返回原字典
+    """
+    missing = [p for p in REQUIRED_ENV_PARAMS if env_params.get(p) is None]
+    if missing:
+        env_params = dict(env_params)
+        for param in missing:
+            env_params[param] = ENV_DEFAULTS[param]
+    return env_params
+
+
+def compute_base_params(material_info, env_params):
+    """
+    根据材料信息和环境参数计算基础振捣频率、时间和深度。
+    :param material_info: dict, extract_material_info 的结果
+    :param env_params: dict, 完整的环境参数
+    :return: tuple (base_freq, base_time, base_depth)
+    """
     # 计算基础振捣频率
     base_freq = 180  # 基础频率
-    if aggregate_type == "卵石":
+    if material_info["aggregate_type"] == "卵石":
         base_freq -= 10
     if env_params["slump"] < 160:
         base_freq += 10
@@ -165,7 +423,7 @@ def generate_strategy(material_params, env_params):
         base_freq -= 10
     if env_params["rebar_density"] > 0.4:
         base_freq += 5
-    base_freq = max(120, min(220, base_freq))
+    base_freq = max(FREQ_MIN_HZ, min(FREQ_MAX_HZ, base_freq))
     
     # 计算基础振捣时间
     base_time = 10
@@ -173,7 +431,7 @@ def generate_strategy(material_params, env_params):
         base_time += 4
     if env_params["slump"] > 200:
         base_time -= 2
-    if water_cement_ratio < 0.42:
+    if material_info["water_cement_ratio"] < 0.42:
         base_time += 2
     base_time = max(6, min(20, base_time))
     
@@ -185,36 +443,95 @@ def generate_strategy(material_params, env_params):
         base_depth -= 3
     base_depth = max(20, min(60, base_depth))
     
-    # 计算基础振捣半径
-    base_radius = freq_to_radius(
-        freq_hz=base_freq,
-        power_kw=power_kw,
-        slump_mm=env_params["slump"],
-        aggregate_size_mm=aggregate_size_mm,
-        viscosity_pas=viscosity_pas,
-        temperature=env_params["temperature"]
+    return base_freq, base_time, base_depth
+
+
+def print_strategy_summary(strategy, layout_desc):
+    """
+    打印振捣策略摘要。
+    :param strategy: dict, 振捣策略
+    :param layout_desc: str, 点位布局描述
+    """
+    board = strategy["board_info"]
+    params = strategy["vibration_params"]
+    print(f"\n生成的振捣策略:")
+    print(f"  - 板尺寸: {board['width_m']}m x {board['length_m']}m x {board['thickness_cm']}cm")
+    print(f"  - 振捣点数: {strategy['total_points']} 点 ({layout_desc})")
+    print(f"  - 基础频率: {params['base_freq_hz']} Hz")
+    print(f"  - 基础时间: {params['base_time_s']} 秒/点")
+    print(f"  - 基础深度: {params['base_depth_cm']} cm")
+    print(f"  - 基础半径: {params['base_radius_cm']:.2f} cm")
+    print(f"  - 估计总时间: {strategy['estimated_time_min']} 分钟")
+    if "layout_comparison" in strategy:
+        grid_info = strategy["layout_comparison"]["grid"]
+        cover_info = strategy["layout_comparison"]["grid_full_coverage"]
+        print(f"  - 方格布局对比: {grid_info['total_points']} 点, 估计 {grid_info['estimated_time_min']} 分钟"
+              f" (1.8倍半径间距，板边和格心存在未覆盖区域)")
+        print(f"  - 无缝覆盖方格布局对比: {cover_info['total_points']} 点, "
+              f"估计 {cover_info['estimated_time_min']} 分钟")
+
+
+def plan_strategy(material_params, env_params, power_kw=DEFAULT_POWER_KW,
+                  board_width=DEFAULT_BOARD_WIDTH_M, board_length=DEFAULT_BOARD_LENGTH_M,
+                  board_thickness=DEFAULT_BOARD_THICKNESS_CM, layout="grid", as_arrays=False, verbose=True,
+                  use_cache=False, cache_dir=None):
+    """
+    非交互式生成振捣策略，所有输入均由参数给出，不会调用 input()。
+    缺失的环境参数使用 ENV_DEFAULTS 中的默认值。
+    :param material_params: dict, 混凝土材料参数
+    :param env_params: dict, 环境参数
+    :param power_kw: float, 振捣棒功率 (kW)，限制在1.0~3.0
+    :param board_width: float, 混凝板宽度 (m)
+    :param board_length: float, 混凝板长度 (m)
+    :param board_thickness: float, 混凝板厚度 (cm)
+    :param layout: str, 点位布局方式，"grid"(方格) 或 "hex"(六边形交错)；
+                   hex 布局的策略中会附带与方格布局对比的 layout_comparison
+    :param as_arrays: bool, 为True时以 point_arrays（NumPy数组）代替 points 字典列表返回
+    :param verbose: bool, 是否打印策略摘要
+    :param use_cache: bool, 是否使用磁盘策略缓存（见 strategy_cache），命中时直接返回缓存结果
+    :param cache_dir: str, 缓存目录，默认为 output/strategy_cache/
+    :return: dict, 详细的振捣策略
+    """
+    env_params = complete_env_params(env_params)
+    power_kw = max(1.0, min(3.0, power_kw))  # 限制在有效范围内
+    
+    material_info = extract_material_info(material_params)
+    base_freq, base_time, base_depth = compute_base_params(material_info, env_params)
+    K = temperature_to_k(env_params["temperature"])
+    
+    if layout not in LAYOUT_MODES:
+        raise ValueError(f"未知的点位布局方式: {layout}，可选: {LAYOUT_MODES}")
+    
+    if use_cache:
+        # 温度只通过K值影响结果，湿度、钢筋密度只通过基础参数影响结果，因此按有效输入计算缓存键
+        key = cache_key({
+            "material_info": material_info,
+            "slump": float(env_params["slump"]),
+            "K": K,
+            "base_params": [base_freq, base_time, base_depth],
+            "power_kw": float(power_kw),
+            "board": [float(board_width), float(board_length), float(board_thickness)],
+            "layout": layout
+        }, STRATEGY_FORMULA_VERSION)
+        cached = load_cached_strategy(key, STRATEGY_FORMULA_VERSION, cache_dir, as_arrays=as_arrays)
+        if cached is not None:
+            strategy, info = cached
+            strategy["environment_info"] = env_params
+            if verbose:
+                print_strategy_summary(strategy, info.get("layout_desc", "") + ", 来自缓存")
+            return strategy
+    
+    # 获取本组参数的半径查找表
+    radius_lookup = radius_table(
+        power_kw,
+        env_params["slump"],
+        material_info["aggregate_size_mm"],
+        material_info["viscosity_pas"],
+        K
     )
     
-    # 混凝板尺寸默认值
-    board_width = 3.0  # 默认宽度 3 米
-    board_length = 4.0  # 默认长度 4 米
-    board_thickness = 30  # 默认厚度 30 厘米
-    
-    # 计算混凝板尺寸
-    try:
-        width_input = input("\n请输入混凝板宽度(m): ")
-        if width_input.strip():
-            board_width = float(width_input)
-        
-        length_input = input("\n请输入混凝板长度(m): ")
-        if length_input.strip():
-            board_length = float(length_input)
-        
-        thickness_input = input("\n请输入混凝板厚度(cm): ")
-        if thickness_input.strip():
-            board_thickness = float(thickness_input)
-    except ValueError:
-        print(f"\n输入无效，使用默认值 {board_width}m x {board_length}m x {board_thickness}cm")
+    # 计算基础振捣半径
+    base_radius = float(radius_lookup[base_freq - FREQ_MIN_HZ])
     
     # 根据板尺寸和振捣半径计算最佳点位布局
     spacing = base_radius * 1.8 / 100  # 转换为米，使用1.8倍半径作为间距
@@ -223,70 +540,41 @@ def generate_strategy(material_params, env_params):
     rows = max(2, int(board_length / spacing))
     cols = max(2, int(board_width / spacing))
     
-    # 生成点位布局
-    points = []
-    for i in range(rows):
-        for j in range(cols):
-            # 计算当前点位的坐标
-            x = j * spacing
-            y = i * spacing
-            
-            # 根据位置调整振捣参数
-            # 1. 调整频率 - 增加更多变化
-            
-            # 计算到板中心的距离比例
-            center_x = board_width / 2
-            center_y = board_length / 2
-            dist_to_center = np.sqrt(((x - center_x) / board_width) ** 2 + ((y - center_y) / board_length) ** 2)
-            
-            # 边缘点位频率更高
-            if i == 0 or i == rows-1 or j == 0 or j == cols-1:
-                freq_adjustment = 20
-            # 中心点位频率略低
-            elif dist_to_center < 0.2:
-                freq_adjustment = -15
-            # 中间区域频率有波动
-            else:
-                # 使用正弦波产生频率波动，模拟不同区域的频率需求
-                wave_x = np.sin(x * 5) * 10
-                wave_y = np.cos(y * 3) * 10
-                freq_adjustment = int(wave_x + wave_y)
-                
-                # 根据到中心的距离再进行调整
-                freq_adjustment += int((dist_to_center * 30))
-            
-            # 限制频率范围
-            point_freq = max(120, min(220, base_freq + freq_adjustment))
-            
-            # 2. 调整时间 - 边缘点位时间略长
-            time_adjustment = 0
-            if i == 0 or i == rows-1 or j == 0 or j == cols-1:
-                time_adjustment = 2
-            point_time = min(20, base_time + time_adjustment)
-            
-            # 3. 调整深度 - 根据板厚度调整
-            point_depth = min(board_thickness - 5, base_depth)  # 保留底部安全距离
-            
-            # 4. 计算点位的振捣半径
-            point_radius = freq_to_radius(
-                freq_hz=point_freq,
-                power_kw=power_kw,
-                slump_mm=env_params["slump"],
-                aggregate_size_mm=aggregate_size_mm,
-                viscosity_pas=viscosity_pas,
-                temperature=env_params["temperature"]
-            )
-            
-            # 添加点位信息
-            points.append({
-                "id": len(points) + 1,
-                "x": round(x, 2),
-                "y": round(y, 2),
-                "freq_hz": point_freq,
-                "time_s": point_time,
-                "depth_cm": point_depth,
-                "radius_cm": point_radius
-            })
+    # 以数组方式一次性计算全部点位参数
+    point_arrays = compute_point_arrays(
+        rows, cols, spacing, board_width, board_length, board_thickness,
+        base_freq, base_time, base_depth, radius_lookup
+    )
+    layout_desc = f"{cols} 列 x {rows} 行"
+    
+    layout_comparison = None
+    if layout == "hex":
+        # 六边形交错布局，并保留方格布局结果作为对比基准
+        grid_arrays = point_arrays
+        point_arrays, hex_rows, hex_radius = compute_hex_point_arrays(
+            board_width, board_length, board_thickness,
+            base_freq, base_time, base_depth, base_radius, radius_lookup
+        )
+        layout_desc = f"六边形交错布局, {hex_rows} 行"
+        # 同样保证无缝覆盖的方格布局，用于比较相同覆盖率下的点位数
+        cover_x, cover_y, cover_edge = square_cover_layout(board_width, board_length, hex_radius / 100)
+        cover_arrays = compute_point_params(cover_x, cover_y, cover_edge, board_width, board_length,
+                                            board_thickness, base_freq, base_time, base_depth, radius_lookup)
+        layout_comparison = {
+            name: {
+                "total_points": len(arrays["id"]),
+                "estimated_time_min": round(int(arrays["time_s"].sum()) / 60, 1)
+            }
+            for name, arrays in (("hex", point_arrays), ("grid", grid_arrays),
+                                 ("grid_full_coverage", cover_arrays))
+        }
+    total_points = len(point_arrays["id"])
+    
+    # 调用方要求数组时直接返回数组，否则在最后一步转换为点位字典列表
+    if as_arrays:
+        points_key, points_value = "point_arrays", point_arrays
+    else:
+        points_key, points_value = "points", points_from_arrays(point_arrays)
     
     # 生成最终策略
     strategy = {
@@ -295,12 +583,7 @@ def generate_strategy(material_params, env_params):
             "length_m": board_length,
             "thickness_cm": board_thickness
         },
-        "material_info": {
-            "aggregate_type": aggregate_type,
-            "water_cement_ratio": water_cement_ratio,
-            "aggregate_size_mm": aggregate_size_mm,
-            "viscosity_pas": viscosity_pas
-        },
+        "material_info": material_info,
         "environment_info": env_params,
         "vibration_params": {
             "power_kw": power_kw,
@@ -309,23 +592,231 @@ def generate_strategy(material_params, env_params):
             "base_depth_cm": base_depth,
             "base_radius_cm": base_radius
         },
-        "points": points,
-        "total_points": len(points),
-        "estimated_time_min": round(sum(p["time_s"] for p in points) / 60, 1)  # 估计总时间(分钟)
+        points_key: points_value,
+        "total_points": total_points,
+        "estimated_time_min": round(int(point_arrays["time_s"].sum()) / 60, 1)  # 估计总时间(分钟)
     }
+    if layout_comparison is not None:
+        strategy["layout"] = layout
+        strategy["layout_comparison"] = layout_comparison
     
-    # 打印策略摘要
-    print(f"\n生成的振捣策略:")
-    print(f"  - 板尺寸: {board_width}m x {board_length}m x {board_thickness}cm")
-    print(f"  - 振捣点数: {len(points)} 点 ({cols} 列 x {rows} 行)")
-    print(f"  - 基础频率: {base_freq} Hz")
-    print(f"  - 基础时间: {base_time} 秒/点")
-    print(f"  - 基础深度: {base_depth} cm")
-    print(f"  - 基础半径: {base_radius:.2f} cm")
-    print(f"  - 估计总时间: {strategy['estimated_time_min']} 分钟")
+    if use_cache:
+        store_cached_strategy(key, STRATEGY_FORMULA_VERSION, strategy, cache_dir, layout_desc=layout_desc)
+    
+    if verbose:
+        print_strategy_summary(strategy, layout_desc)
     
     return strategy
 
+
+def generate_strategy(material_params, env_params, as_arrays=False, layout="grid", use_cache=True):
+    """
+    根据材料参数和环境参数生成振捣策略（交互式，缺失的参数提示用户输入）。
+    非交互场景请使用 plan_strategy 或 batch_planner。
+    :param material_params: dict, 混凝土材料参数
+    :param env_params: dict, 环境参数
+    :param as_arrays: bool, 为True时以 point_arrays（NumPy数组）代替 points 字典列表返回
+    :param layout: str, 点位布局方式，"grid"(方格) 或 "hex"(六边形交错)
+    :param use_cache: bool, 是否使用磁盘策略缓存，相同有效输入的策略直接从 output/strategy_cache/ 读取
+    :return: dict, 详细的振捣策略
+    """
+    print("\n正在生成振捣策略...")
+    
+    # 检查必要的环境参数，缺失则提示用户输入
+    for param in REQUIRED_ENV_PARAMS:
+        if param not in env_params or env_params[param] is None:
+            try:
+                value = float(input(f"\n请输入{ENV_PARAM_NAMES.get(param, param)}: "))
+                env_params[param] = value
+            except ValueError:
+                print(f"\n输入无效，使用默认值 {ENV_DEFAULTS[param]}")
+                env_params[param] = ENV_DEFAULTS[param]
+    
+    # 提取振捣棒功率
+    power_kw = DEFAULT_POWER_KW
+    try:
+        power_input = input("\n请输入振捣棒功率(kW, 范围1.0~3.0): ")
+        if power_input.strip():
+            power_kw = float(power_input)
+    except ValueError:
+        print(f"\n输入无效，使用默认值 {power_kw} kW")
+    
+    # 混凝板尺寸默认值
+    board_width = DEFAULT_BOARD_WIDTH_M
+    board_length = DEFAULT_BOARD_LENGTH_M
+    board_thickness = DEFAULT_BOARD_THICKNESS_CM
+    
+    # 计算混凝板尺寸
+    try:
+        width_input = input("\n请输入混凝板宽度(m): ")
+        if width_input.strip():
+            board_width = float(width_input)
+        
+        length_input = input("\n请输入混凝板长度(m): ")
+        if length_input.strip():
+            board_length = float(length_input)
+        
+        thickness_input = input("\n请输入混凝板厚度(cm): ")
+        if thickness_input.strip():
+            board_thickness = float(thickness_input)
+    except ValueError:
+        print(f"\n输入无效，使用默认值 {board_width}m x {board_length}m x {board_thickness}cm")
+    
+    return plan_strategy(material_params, env_params, power_kw,
+                         board_width, board_length, board_thickness,
+                         layout=layout, as_arrays=as_arrays, use_cache=use_cache)
+
+def point_geometry(strategy):
+    """
+    还原策略中点位的布局几何（未取整的坐标和边缘掩码），顺序与策略中的点位顺序一致。
+    按策略记录的布局方式和间距重建布局并以 id 对应；重建结果与点位坐标不符时（如外部导入的策略），
+    直接使用点位坐标，并按行判断边缘点位。
+    :param strategy: dict, 振捣策略
+    :return: tuple (ids, x, y, edge)
+    """
+    board_width = strategy["board_info"]["width_m"]
+    board_length = strategy["board_info"]["length_m"]
+    ids, px, py = point_columns(strategy_points(strategy), "id", "x", "y")
+    ids = ids.astype(np.int64)
+    px = px.astype(float)
+    py = py.astype(float)
+    
+    layout = None
+    if strategy.get("layout", "grid") == "hex":
+        row_y = np.unique(py)
+        cols = int(np.count_nonzero(py == row_y[0])) if len(row_y) else 0
+        if len(row_y) >= 2 and cols >= 2:
+            layout = hex_lattice(board_width, board_length, len(row_y), cols)
+    else:
+        params = strategy["vibration_params"]
+        spacing = params.get("layout_radius_cm", params["base_radius_cm"]) * 1.8 / 100
+        rows = max(2, int(board_length / spacing))
+        cols = max(2, int(board_width / spacing))
+        layout = grid_layout(rows, cols, spacing)
+    
+    if layout is not None:
+        x, y, edge = layout
+        index = ids - 1
+        if (len(x) == len(ids) and len(ids) and index.min() >= 0 and index.max() < len(x)
+                and np.array_equal(np.round(x[index], 2), px) and np.array_equal(np.round(y[index], 2), py)):
+            return ids, x[index], y[index], edge[index]
+    
+    # 无法重建布局：同一y坐标的点位视为一行，首末行及每行首末点为边缘点位
+    _, row = np.unique(py, return_inverse=True)
+    row = row.ravel()
+    row_count = int(row.max()) + 1 if len(row) else 0
+    row_min = np.full(row_count, np.inf)
+    row_max = np.full(row_count, -np.inf)
+    np.minimum.at(row_min, row, px)
+    np.maximum.at(row_max, row, px)
+    edge = (row == 0) | (row == row_count - 1) | (px == row_min[row]) | (px == row_max[row])
+    return ids, px, py, edge
+
+
+def replan_strategy(strategy, executed_ids, env_params):
+    """
+    环境参数变化时增量重新规划：保持点位布局不变，只为尚未执行的点位重新计算振捣参数，
+    返回参数有变化的点位（差异），可用 apply_strategy_diff 在执行过程中直接应用。
+    :param strategy: dict, 当前振捣策略（points、point_arrays 或列式存储的点位视图）
+    :param executed_ids: 已执行点位的 id 集合
+    :param env_params: dict, 新的环境参数，缺失项使用默认值
+    :return: dict, 包含 environment_info/vibration_params/changed_points/remaining_points/
+             estimated_time_min/remaining_time_min
+    """
+    env_params = complete_env_params(env_params)
+    material_info = strategy["material_info"]
+    board = strategy["board_info"]
+    old_params = strategy["vibration_params"]
+    power_kw = old_params["power_kw"]
+    
+    base_freq, base_time, base_depth = compute_base_params(material_info, env_params)
+    radius_lookup = radius_table(
+        power_kw,
+        env_params["slump"],
+        material_info["aggregate_size_mm"],
+        material_info["viscosity_pas"],
+        temperature_to_k(env_params["temperature"])
+    )
+    
+    ids, x, y, edge = point_geometry(strategy)
+    remaining = ~np.isin(ids, np.fromiter(executed_ids, dtype=np.int64))
+    new = compute_point_params(x[remaining], y[remaining], edge[remaining],
+                               board["width_m"], board["length_m"], board["thickness_cm"],
+                               base_freq, base_time, base_depth, radius_lookup)
+    
+    points = strategy_points(strategy)
+    px, py, freq, time_s, depth, radius = point_columns(
+        points, "x", "y", "freq_hz", "time_s", "depth_cm", "radius_cm")
+    changed = ((new["freq_hz"] != freq[remaining]) | (new["time_s"] != time_s[remaining])
+               | ~np.isclose(new["depth_cm"], depth[remaining], rtol=0, atol=1e-9)
+               | ~np.isclose(new["radius_cm"], radius[remaining], rtol=0, atol=1e-9))
+    
+    changed_points = points_from_arrays({
+        "id": ids[remaining][changed],
+        "x": px[remaining][changed],
+        "y": py[remaining][changed],
+        "freq_hz": new["freq_hz"][changed],
+        "time_s": new["time_s"][changed],
+        "depth_cm": new["depth_cm"][changed],
+        "radius_cm": new["radius_cm"][changed]
+    })
+    
+    remaining_time = int(new["time_s"].sum())
+    total_time = int(time_s[~remaining].sum()) + remaining_time
+    return {
+        "environment_info": env_params,
+        "vibration_params": {
+            "power_kw": power_kw,
+            "base_freq_hz": base_freq,
+            "base_time_s": base_time,
+            "base_depth_cm": base_depth,
+            "base_radius_cm": float(radius_lookup[base_freq - FREQ_MIN_HZ]),
+            # 布局间距仍由原始半径确定，保留以便再次增量规划时重建布局
+            "layout_radius_cm": old_params.get("layout_radius_cm", old_params["base_radius_cm"])
+        },
+        "changed_points": changed_points,
+        "remaining_points": int(remaining.sum()),
+        "estimated_time_min": round(total_time / 60, 1),
+        "remaining_time_min": round(remaining_time / 60, 1)
+    }
+
+
+def apply_strategy_diff(strategy, diff):
+    """
+    将 replan_strategy 返回的差异应用到策略（原地修改），点位按 id 对应。
+    列式存储加载的只读点位视图会复制为内存中的数组后再修改。
+    :param strategy: dict, 振捣策略
+    :param diff: dict, replan_strategy 的结果
+    :return: int, 更新的点位数
+    """
+    strategy["environment_info"] = diff["environment_info"]
+    strategy["vibration_params"] = diff["vibration_params"]
+    strategy["estimated_time_min"] = diff["estimated_time_min"]
+    
+    changed = diff["changed_points"]
+    if not changed:
+        return 0
+    points = strategy_points(strategy)
+    ids = point_columns(points, "id")[0]
+    sorter = np.argsort(ids)
+    changed_ids = np.array([p["id"] for p in changed])
+    positions = sorter[np.searchsorted(ids, changed_ids, sorter=sorter)].tolist()
+    fields = ("freq_hz", "time_s", "depth_cm", "radius_cm")
+    
+    if isinstance(points, dict):
+        for field in fields:
+            points[field][positions] = [p[field] for p in changed]
+    elif isinstance(points, PointView):
+        records = np.array(points.records)
+        for field in fields:
+            records[field][positions] = [p[field] for p in changed]
+        strategy["points"] = PointView(records)
+    else:
+        for pos, point in zip(positions, changed):
+            points[pos].update({field: point[field] for field in fields})
+    return len(changed)
+
+
 if __name__ == "__main__":
     # 测试振捣策略生成函数
     print("\n=== 测试振捣策略生成 ===")
@@ -356,3 +847,12 @@ if __name__ == "__main__":
     
     if len(strategy["points"]) > 5:
         print(f"... 共 {len(strategy['points'])} 个点位")
+    
+    # 测试增量重新规划：前10个点位已执行，环境温度和坍落度发生变化
+    print("\n=== 测试增量重新规划 ===")
+    new_env = dict(env_params, temperature=12, slump=150)
+    diff = replan_strategy(strategy, range(1, 11), new_env)
+    print(f"剩余 {diff['remaining_points']} 个点位, 参数变化 {len(diff['changed_points'])} 个, "
+          f"剩余时间 {diff['remaining_time_min']} 分钟")
+    apply_strategy_diff(strategy, diff)
+    print(f"更新后估计总时间: {strategy['estimated_time_min']} 分钟")
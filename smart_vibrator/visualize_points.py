@@ -15,6 +15,7 @@ import os
 import matplotlib
 import pandas as pd  # 导入pandas用于生成Excel文件
 from vibration_strategy import generate_strategy
+from strategy_store import load_strategy, point_columns, strategy_points
 
 # 设置matplotlib支持中文
 # Ubuntu字体设置
@@ -59,27 +60,25 @@ def generate_vibration_excel(strategy, save_path=None):
         # 提取板厚度
         board_thickness = strategy['board_info']['thickness_cm'] / 100  # 转换为米
         
-        # 提取点位信息
-        points = strategy['points']
+        # 按列提取点位信息（兼容点位字典列表与列式存储的点位视图）
+        ids, xs, ys, times, depths, freqs, radii = point_columns(
+            strategy_points(strategy), 'id', 'x', 'y', 'time_s', 'depth_cm', 'freq_hz', 'radius_cm')
         
-        # 创建数据列表
-        data = []
-        for point in points:
-            # 计算z坐标（从板顶面向下的深度）
-            z = board_thickness - point['depth_cm'] / 200  # 取插入深度的一半作为振捣点的z坐标
-            
-            # 添加点位数据
-            data.append({
-                '振捣编号': point['id'],
-                '振捣点位 (x,y,z)': f"({point['x']:.2f}, {point['y']:.2f}, {z:.2f})",
-                'x': point['x'],
-                'y': point['y'],
-                'z': z,
-                '振捣时间 (s)': point['time_s'],
-                '插入深度 (m)': point['depth_cm'] / 100,  # 转换为米
-                '振捣频率 (hz)': point['freq_hz'],
-                '振捣半径 (cm)': point['radius_cm']
-            })
+        # 计算z坐标（从板顶面向下的深度）
+        zs = board_thickness - depths / 200  # 取插入深度的一半作为振捣点的z坐标
+        
+        # 创建数据列
+        data = {
+            '振捣编号': ids,
+            '振捣点位 (x,y,z)': [f"({x:.2f}, {y:.2f}, {z:.2f})" for x, y, z in zip(xs.tolist(), ys.tolist(), zs.tolist())],
+            'x': xs,
+            'y': ys,
+            'z': zs,
+            '振捣时间 (s)': times,
+            '插入深度 (m)': depths / 100,  # 转换为米
+            '振捣频率 (hz)': freqs,
+            '振捣半径 (cm)': radii
+        }
         
         # 创建DataFrame
         df = pd.DataFrame(data)
@@ -136,8 +135,9 @@ def visualize_vibration_points(strategy, save_path=None):
     
     print(f"\n板厚: {board_thickness*100:.1f}cm, 分为{num_layers}层, 每层约{actual_layer_height*100:.1f}cm")
     
-    # 提取点位信息
-    points = strategy['points']
+    # 按列提取点位信息（兼容点位字典列表与列式存储的点位视图）
+    point_x, point_y, point_depth, point_freq, point_radius = point_columns(
+        strategy_points(strategy), 'x', 'y', 'depth_cm', 'freq_hz', 'radius_cm')
     
     # 创建图形
     fig = plt.figure(figsize=(14, 10))
@@ -148,9 +148,8 @@ def visualize_vibration_points(strategy, save_path=None):
     cm = LinearSegmentedColormap.from_list(cmap_name, colors, N=100)
     
     # 提取频率范围
-    frequencies = [p['freq_hz'] for p in points]
-    min_freq = min(frequencies)
-    max_freq = max(frequencies)
+    min_freq = point_freq.min()
+    max_freq = point_freq.max()
     
     # 创建子图网格以显示不同层次
     if num_layers <= 2:
@@ -216,48 +215,34 @@ def visualize_vibration_points(strategy, save_path=None):
             xx = np.ones(yy.shape) * board_width
             ax.plot_surface(xx, yy, zz, alpha=0.2, color='gray')
             
-            # 筛选当前层的振捣点
-            layer_points = []
-            for point in points:
-                # 计算振捣棒插入深度
-                vibration_depth = point['depth_cm'] / 100  # 转换为米
-                
-                # 振捣棒顶部和底部的位置
-                rod_top = board_thickness
-                rod_bottom = board_thickness - vibration_depth
-                
-                # 如果振捣棒与当前层相交，则包含该点
-                if (rod_bottom <= z_max and rod_bottom >= z_min) or \
-                   (rod_top <= z_max and rod_top >= z_min) or \
-                   (rod_bottom <= z_min and rod_top >= z_max):
-                    layer_points.append(point)
+            # 筛选当前层的振捣点：振捣棒顶部和底部的位置
+            rod_top = board_thickness
+            rod_bottom = board_thickness - point_depth / 100  # 转换为米
+            
+            # 如果振捣棒与当前层相交，则包含该点
+            in_layer = ((rod_bottom <= z_max) & (rod_bottom >= z_min)) | \
+                       ((rod_top <= z_max) & (rod_top >= z_min)) | \
+                       ((rod_bottom <= z_min) & (rod_top >= z_max))
+            layer_count = int(np.count_nonzero(in_layer))
             
-            if layer_points:
+            if layer_count:
                 # 提取当前层点位的坐标和属性
-                x_coords = [p['x'] for p in layer_points]
-                y_coords = [p['y'] for p in layer_points]
+                x_coords = point_x[in_layer]
+                y_coords = point_y[in_layer]
                 
                 # 计算振捣棒在当前层的z坐标 (与层中点对齐)
-                z_coords = [(z_min + z_max) / 2 for _ in layer_points]
-                
-                # 提取频率作为颜色
-                frequencies = [p['freq_hz'] for p in layer_points]
-                
-                # 提取半径作为点大小
-                radii = [p['radius_cm'] / 5 for p in layer_points]  # 缩小点大小以便显示
+                z_coords = np.full(layer_count, (z_min + z_max) / 2)
                 
-                # 绘制散点图
+                # 绘制散点图：频率作为颜色，半径作为点大小
                 sc = ax.scatter(x_coords, y_coords, z_coords, 
-                                c=frequencies, cmap=cm, 
-                                s=radii, alpha=0.8, 
+                                c=point_freq[in_layer], cmap=cm, 
+                                s=point_radius[in_layer] / 5, alpha=0.8,  # 缩小点大小以便显示
                                 vmin=min_freq, vmax=max_freq)
                 
-                # 绘制振捣棒
-                for i, point in enumerate(layer_points):
-                    x, y = point['x'], point['y']
-                    # 计算振捣棒与当前层的交点
-                    z_top = min(z_max, board_thickness)
-                    z_bottom = max(z_min, board_thickness - point['depth_cm'] / 100)
+                # 绘制振捣棒，计算振捣棒与当前层的交点
+                z_top = min(z_max, board_thickness)
+                z_bottoms = np.maximum(z_min, rod_bottom[in_layer])
+                for x, y, z_bottom in zip(x_coords.tolist(), y_coords.tolist(), z_bottoms.tolist()):
                     ax.plot([x, x], [y, y], [z_top, z_bottom], 'k-', linewidth=1.5)
             
             # 设置轴标签和范围
@@ -271,8 +256,8 @@ def visualize_vibration_points(strategy, save_path=None):
             
             # 设置标题
             layer_title = f'层 {layer_idx+1}/{num_layers} (Z: {z_min*100:.1f}-{z_max*100:.1f}cm)'
-            if layer_points:
-                layer_title += f', {len(layer_points)}个点位'
+            if layer_count:
+                layer_title += f', {layer_count}个点位'
             else:
                 layer_title += ', 无点位'
             ax.set_title(layer_title)
@@ -295,7 +280,7 @@ def visualize_vibration_points(strategy, save_path=None):
         info_text = (
             f"板尺寸: {board_width}m × {board_length}m × {board_thickness*100:.1f}cm\n"
             f"分层数: {num_layers}层 (每层约{actual_layer_height*100:.1f}cm)\n"
-            f"点位数量: {strategy['total_points']} ({len(set([p['x'] for p in points]))} × {len(set([p['y'] for p in points]))})\n"
+            f"点位数量: {strategy['total_points']} ({len(np.unique(point_x))} × {len(np.unique(point_y))})\n"
             f"基础频率: {strategy['vibration_params']['base_freq_hz']} Hz\n"
             f"基础半径: {strategy['vibration_params']['base_radius_cm']:.2f} cm\n"
             f"估计总时间: {strategy['estimated_time_min']:.1f} 分钟"
@@ -329,8 +314,8 @@ def main():
     if len(sys.argv) > 1:
         strategy_file = sys.argv[1]
         try:
-            with open(strategy_file, 'r', encoding='utf-8') as f:
-                strategy = json.load(f)
+            # 支持普通JSON策略文件和列式存储的策略（.header.json）
+            strategy = load_strategy(strategy_file)
             visualize_vibration_points(strategy)
         except Exception as e:
             print(f"读取策略文件时出错: {e}")
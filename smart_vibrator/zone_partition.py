@@ -0,0 +1,154 @@
+"""
+zone_partition.py
+多振捣头分区模块
+将策略点位划分为 N 个空间上连续的条带分区，每个振捣头负责一个分区:
+    - 条带沿点位范围较长的坐标轴（主轴）切分，分区边界只落在相邻两排点位之间，同一排点位属于同一个分区
+    - 按点位权重（振捣时间 + 固定开销 + 移动时间，单位秒）的累计和切分，再逐个微调边界，使最大分区用时最小
+    - 各分区内按相同方向沿主轴推进（排内蛇形往返），相邻振捣头处于各自分区的相同进度时，
+      两者沿主轴的距离约为一个分区宽度；分区宽度小于最小间距时不能分区
+"""
+import numpy as np
+
+# 主轴坐标相差小于该值 (m) 的点位视为同一排
+ROW_TOLERANCE_M = 1e-3
+
+
+def major_axis(x, y):
+    """点位范围较长的坐标轴：0 为 x，1 为 y"""
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    if not x.size:
+        return 0
+    return 0 if np.ptp(x) >= np.ptp(y) else 1
+
+
+def point_rows(major, tolerance=ROW_TOLERANCE_M):
+    """
+    按主轴坐标将点位分排。
+    :return: tuple (各点位的排号, 各排的主轴坐标)，排号按坐标从小到大
+    """
+    keys = np.round(np.asarray(major, dtype=float) / tolerance).astype(np.int64)
+    unique_keys, rows = np.unique(keys, return_inverse=True)
+    return rows, unique_keys * tolerance
+
+
+def sweep_order(x, y):
+    """
+    沿主轴推进、排内蛇形往返的点位顺序。
+    :return: 点位下标数组
+    """
+    axis = major_axis(x, y)
+    major = np.asarray(y if axis else x, dtype=float)
+    minor = np.asarray(x if axis else y, dtype=float)
+    rows, _ = point_rows(major)
+    # 奇数排反向，相邻两排首尾相接
+    return np.lexsort((np.where(rows % 2, -minor, minor), rows))
+
+
+def _balance_boundaries(loads, heads):
+    """
+    按累计负载切分排，再逐个微调边界使最大分区负载最小。
+    :param loads: 各排负载
+    :return: 边界数组 [0, b1, ..., len(loads)]，第 k 个分区为 [b_k, b_k+1) 排
+    """
+    count = len(loads)
+    cumulative = np.concatenate(([0.0], np.cumsum(loads)))
+    total = cumulative[-1]
+    bounds = [0]
+    for k in range(1, heads):
+        b = int(np.searchsorted(cumulative, total * k / heads))
+        # 取累计负载更接近目标的一侧，并为其余分区各留至少一排
+        if b > 0 and abs(cumulative[b - 1] - total * k / heads) <= abs(cumulative[min(b, count)] - total * k / heads):
+            b -= 1
+        bounds.append(min(max(b, bounds[-1] + 1), count - (heads - k)))
+    bounds.append(count)
+    bounds = np.array(bounds)
+
+    def makespan(b):
+        return float(np.max(np.diff(cumulative[b])))
+
+    improved = True
+    while improved:
+        improved = False
+        for k in range(1, heads):
+            for shift in (-1, 1):
+                candidate = bounds.copy()
+                candidate[k] += shift
+                if candidate[k - 1] < candidate[k] < candidate[k + 1] and makespan(candidate) < makespan(bounds):
+                    bounds = candidate
+                    improved = True
+    return bounds
+
+
+def partition_zones(x, y, weights, heads, min_separation_m=0.0):
+    """
+    将点位划分为 heads 个条带分区。
+    :param x: 点位 x 坐标 (m)
+    :param y: 点位 y 坐标 (m)
+    :param weights: 点位权重 (s)
+    :param heads: 分区数（振捣头数）
+    :param min_separation_m: 振捣头之间的最小间距 (m)，各分区沿主轴的宽度不得小于该值
+    :return: 分区列表，每个分区为按执行顺序排列的点位下标数组
+    """
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    weights = np.asarray(weights, dtype=float)
+    heads = int(heads)
+    if heads < 1:
+        raise ValueError(f"振捣头数必须大于0: {heads}")
+    order = sweep_order(x, y)
+    if heads == 1:
+        return [order]
+    axis = major_axis(x, y)
+    rows, row_coords = point_rows(y if axis else x)
+    if len(row_coords) < heads:
+        raise ValueError(f"点位只有 {len(row_coords)} 排，不能划分为 {heads} 个分区")
+    bounds = _balance_boundaries(np.bincount(rows, weights=weights, minlength=len(row_coords)), heads)
+
+    # 分区宽度：首末两排的距离加一个排距（分区各占半个排距的边缘）
+    pitch = float(np.median(np.diff(row_coords))) if len(row_coords) > 1 else 0.0
+    widths = row_coords[bounds[1:] - 1] - row_coords[bounds[:-1]] + pitch
+    narrow = np.flatnonzero(widths < min_separation_m)
+    if narrow.size:
+        k = int(narrow[0])
+        raise ValueError(f"分区 {k + 1} 宽度 {widths[k]:.2f} m 小于最小间距 {min_separation_m} m，"
+                         f"请减少振捣头数")
+
+    zone_of_row = np.searchsorted(bounds, np.arange(len(row_coords)), side="right") - 1
+    zone_of_point = zone_of_row[rows[order]]
+    return [order[zone_of_point == k] for k in range(heads)]
+
+
+def zone_summary(zones, x, y, weights):
+    """
+    各分区的点位数、负载和主轴范围。
+    :return: 列表，每个分区一个 dict（points/load_s/start_m/end_m）
+    """
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    weights = np.asarray(weights, dtype=float)
+    major = y if major_axis(x, y) else x
+    summary = []
+    for zone in zones:
+        coords = major[zone]
+        summary.append({
+            "points": len(zone),
+            "load_s": float(weights[zone].sum()),
+            "start_m": float(coords.min()) if len(zone) else 0.0,
+            "end_m": float(coords.max()) if len(zone) else 0.0
+        })
+    return summary
+
+
+if __name__ == "__main__":
+    # 用法: python zone_partition.py [策略文件] [振捣头数]   打印各分区的点位数和负载
+    import os
+    import sys
+    from strategy_store import as_point_sequence, load_strategy, point_columns, strategy_points
+
+    path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "output", "vibration_strategy.json")
+    heads = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    x, y, time_s = point_columns(as_point_sequence(strategy_points(load_strategy(path))), "x", "y", "time_s")
+    zones = partition_zones(x, y, time_s, heads)
+    assert sorted(np.concatenate(zones).tolist()) == list(range(len(x)))
+    for k, info in enumerate(zone_summary(zones, x, y, time_s)):
+        print(f"分区 {k + 1}: {info['points']} 个点位, 振捣 {info['load_s']:.0f} 秒, "
+              f"主轴 {info['start_m']:.2f} ~ {info['end_m']:.2f} m")